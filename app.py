@@ -24,12 +24,12 @@ sys.path.append(str(backend_path))
 def start_backend():
     """Start the FastAPI backend server"""
     try:
-        os.chdir("backend")
+        # Same working directory for migrations and server, so relative database paths agree
+        subprocess.run([sys.executable, "-m", "backend.migrations", "upgrade"], check=True)
         subprocess.Popen([
-            "python", "-m", "uvicorn", "main:app", 
+            sys.executable, "-m", "uvicorn", "backend.main:app",
             "--host", "0.0.0.0", "--port", "8000"
         ])
-        os.chdir("..")
         time.sleep(3)  # Give server time to start
     except Exception as e:
         st.error(f"Error starting backend: {e}")
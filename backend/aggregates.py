@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .models import DailyLog, DailyLogTotals, MealEntry
+
+def empty_summary() -> Dict[str, Any]:
+    """Totals for a day without any meals"""
+    return {
+        "total_calories": 0,
+        "total_protein": 0,
+        "total_carbohydrates": 0,
+        "total_fats": 0,
+        "meal_count": 0
+    }
+
+def _rollup_or_scan(field: str):
+    """A log's rollup value, or a scan of its meals when no rollup row exists yet"""
+    fallback = (
+        select(func.count(MealEntry.id) if field == "meal_count" else func.sum(getattr(MealEntry, field)))
+        .where(MealEntry.log_id == DailyLog.id)
+        .scalar_subquery()
+    )
+    return func.coalesce(getattr(DailyLogTotals, field), fallback, 0)
+
+def day_meals_statement(user_id: int, target_date: date):
+    """A user's meals for one day, in the order they were logged"""
+    return (
+        select(MealEntry)
+        .join(DailyLog, MealEntry.log_id == DailyLog.id)
+        .where(DailyLog.user_id == user_id, DailyLog.date == target_date)
+        .order_by(MealEntry.created_at, MealEntry.id)
+    )
+
+def daily_totals_statement(user_id: int, start_date: date, end_date: date):
+    """One GROUP BY query returning per-day totals for the days that have a log.
+
+    Totals are read from the daily_log_totals rollups, so the cost grows with
+    the number of days rather than the number of meals.
+    """
+    return (
+        select(
+            DailyLog.date,
+            func.sum(_rollup_or_scan("calories")),
+            func.sum(_rollup_or_scan("protein")),
+            func.sum(_rollup_or_scan("carbohydrates")),
+            func.sum(_rollup_or_scan("fats")),
+            func.sum(_rollup_or_scan("meal_count"))
+        )
+        .select_from(DailyLog)
+        .outerjoin(DailyLogTotals, DailyLogTotals.log_id == DailyLog.id)
+        .where(
+            DailyLog.user_id == user_id,
+            DailyLog.date >= start_date,
+            DailyLog.date <= end_date
+        )
+        .group_by(DailyLog.date)
+    )
+
+def log_totals_statement(log_ids: Iterable[int]):
+    """Owner, date and totals of specific daily logs, one row per log"""
+    return (
+        select(
+            DailyLog.id,
+            DailyLog.user_id,
+            DailyLog.date,
+            _rollup_or_scan("calories"),
+            _rollup_or_scan("protein"),
+            _rollup_or_scan("carbohydrates"),
+            _rollup_or_scan("fats"),
+            _rollup_or_scan("meal_count")
+        )
+        .select_from(DailyLog)
+        .outerjoin(DailyLogTotals, DailyLogTotals.log_id == DailyLog.id)
+        .where(DailyLog.id.in_(list(log_ids)))
+    )
+
+def fill_daily_totals(rows: Iterable, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """Turn aggregate rows into one summary per day, filling days without data"""
+    by_date = {
+        row[0]: {
+            "total_calories": row[1],
+            "total_protein": row[2],
+            "total_carbohydrates": row[3],
+            "total_fats": row[4],
+            "meal_count": row[5]
+        }
+        for row in rows
+    }
+    days = []
+    for offset in range((end_date - start_date).days + 1):
+        day = start_date + timedelta(days=offset)
+        days.append({"date": day, **by_date.get(day, empty_summary())})
+    return days
+
+def get_daily_totals(user_id: int, start_date: date, end_date: date, db: Session) -> List[Dict[str, Any]]:
+    """Get per-day nutrition totals for every day in [start_date, end_date]"""
+    rows = db.execute(daily_totals_statement(user_id, start_date, end_date))
+    return fill_daily_totals(rows, start_date, end_date)
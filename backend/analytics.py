@@ -0,0 +1,182 @@
+"""
+Date-range analytics: daily series, rolling averages, goal adherence and
+downsampled buckets.
+
+Per-day totals come from one GROUP BY over the daily rollups
+(aggregates.daily_totals_statement), fetched for the range plus the
+ROLLING_WINDOWS lead-in so the first days of the range have full rolling
+windows. Everything after that is a single pass over at most a few
+thousand day rows, whatever the number of meals.
+"""
+import os
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from .aggregates import get_daily_totals
+
+load_dotenv()
+
+# Longest range a single request may cover
+ANALYTICS_MAX_DAYS = int(os.getenv("ANALYTICS_MAX_DAYS", "1830"))
+# A logged day counts as on target when its calories are within this fraction of the goal
+GOAL_ADHERENCE_TOLERANCE = float(os.getenv("GOAL_ADHERENCE_TOLERANCE", "0.1"))
+
+ROLLING_WINDOWS = (7, 30)
+BUCKETS = ("day", "week", "month")
+NUTRIENT_KEYS = {
+    "calories": "total_calories",
+    "protein": "total_protein",
+    "carbs": "total_carbohydrates",
+    "fats": "total_fats",
+}
+
+def choose_bucket(start_date: date, end_date: date) -> str:
+    """Pick a bucket size that keeps a chart at a readable number of points"""
+    days = (end_date - start_date).days + 1
+    if days <= 62:
+        return "day"
+    if days <= 366:
+        return "week"
+    return "month"
+
+def _bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())  # Monday
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+def history_start(start_date: date) -> date:
+    """First day that must be loaded so every rolling window in the range is complete"""
+    return start_date - timedelta(days=max(ROLLING_WINDOWS) - 1)
+
+def _average(days: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Average nutrients over the days that have meals logged"""
+    logged = [day for day in days if day["meal_count"]]
+    if not logged:
+        return {name: 0 for name in NUTRIENT_KEYS}
+    return {name: round(sum(day[key] for day in logged) / len(logged), 1) for name, key in NUTRIENT_KEYS.items()}
+
+def _rolling_averages(days: List[Dict[str, Any]], window: int) -> List[Optional[float]]:
+    """Average calories over the logged days in each trailing window, or None when none were logged"""
+    averages = []
+    recent = deque()
+    calories = logged = 0
+    for day in days:
+        recent.append(day)
+        calories += day["total_calories"]
+        logged += 1 if day["meal_count"] else 0
+        if len(recent) > window:
+            dropped = recent.popleft()
+            calories -= dropped["total_calories"]
+            logged -= 1 if dropped["meal_count"] else 0
+        averages.append(round(calories / logged, 1) if logged else None)
+    return averages
+
+def _goal_adherence(days: List[Dict[str, Any]], user_profile) -> Dict[str, Any]:
+    logged = [day for day in days if day["meal_count"]]
+    calorie_goal = user_profile.daily_calorie_goal
+    protein_goal = user_profile.daily_protein_goal
+    on_target = [
+        day for day in logged
+        if calorie_goal and abs(day["total_calories"] - calorie_goal) <= calorie_goal * GOAL_ADHERENCE_TOLERANCE
+    ]
+    protein_met = [day for day in logged if protein_goal and day["total_protein"] >= protein_goal]
+    average_calories = _average(days)["calories"]
+    return {
+        "days_in_range": len(days),
+        "days_logged": len(logged),
+        "days_on_calorie_target": len(on_target),
+        "days_protein_goal_met": len(protein_met),
+        "calorie_adherence_rate": round(len(on_target) / len(logged), 3) if logged else 0,
+        "protein_adherence_rate": round(len(protein_met) / len(logged), 3) if logged else 0,
+        "average_calories_pct_of_goal": round(average_calories / calorie_goal * 100, 1) if calorie_goal else 0,
+        "tolerance": GOAL_ADHERENCE_TOLERANCE,
+    }
+
+def _buckets(days: List[Dict[str, Any]], bucket: str) -> List[Dict[str, Any]]:
+    """Downsample the daily series; each bucket reports per-logged-day averages"""
+    groups: Dict[date, List[Dict[str, Any]]] = {}
+    for day in days:
+        groups.setdefault(_bucket_start(day["date"], bucket), []).append(day)
+    return [
+        {
+            "date": start.isoformat(),
+            "end_date": group[-1]["date"].isoformat(),
+            "days_logged": sum(1 for day in group if day["meal_count"]),
+            "meal_count": sum(day["meal_count"] for day in group),
+            **_average(group),
+        }
+        for start, group in groups.items()
+    ]
+
+def summarize_range(user_profile, history: List[Dict[str, Any]], start_date: date, end_date: date,
+                    bucket: Optional[str] = None) -> Dict[str, Any]:
+    """Build range analytics from per-day totals covering [history_start(start_date), end_date]"""
+    bucket = bucket or choose_bucket(start_date, end_date)
+    offset = (start_date - history[0]["date"]).days
+    days = history[offset:]
+    rolling = {window: _rolling_averages(history, window)[offset:] for window in ROLLING_WINDOWS}
+
+    daily = [
+        {
+            "date": day["date"].isoformat(),
+            "calories": day["total_calories"],
+            "protein": day["total_protein"],
+            "carbs": day["total_carbohydrates"],
+            "fats": day["total_fats"],
+            "meal_count": day["meal_count"],
+            **{f"rolling_{window}d_calories": rolling[window][index] for window in ROLLING_WINDOWS},
+        }
+        for index, day in enumerate(days)
+    ]
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "bucket": bucket,
+        "series": daily if bucket == "day" else _buckets(days, bucket),
+        "daily": daily if bucket == "day" else None,
+        "averages": _average(days),
+        "rolling_averages": {
+            f"{window}d": rolling[window][-1] if days else None for window in ROLLING_WINDOWS
+        },
+        "goal_adherence": _goal_adherence(days, user_profile),
+    }
+
+def get_range_analytics(user_id: int, user_profile, start_date: date, end_date: date, db: Session,
+                        bucket: Optional[str] = None) -> Dict[str, Any]:
+    """Range analytics for a user, computed from one aggregate query"""
+    history = get_daily_totals(user_id, history_start(start_date), end_date, db)
+    return summarize_range(user_profile, history, start_date, end_date, bucket)
+
+def resolve_range(start_date: Optional[str], end_date: Optional[str], bucket: Optional[str] = None,
+                  default_days: int = 30) -> Tuple[date, date, Optional[str]]:
+    """Parse and check YYYY-MM-DD range parameters; raises ValueError with a user-facing message"""
+    try:
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else date.today()
+        start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else end - timedelta(days=default_days - 1)
+    except ValueError:
+        raise ValueError("Dates must use the YYYY-MM-DD format")
+    if end < start:
+        raise ValueError("end_date must not be before start_date")
+    if (end - start).days + 1 > ANALYTICS_MAX_DAYS:
+        raise ValueError(f"Date range cannot exceed {ANALYTICS_MAX_DAYS} days")
+    if bucket is not None and bucket not in BUCKETS:
+        raise ValueError(f"Invalid bucket. Choose one of: {', '.join(BUCKETS)}")
+    return start, end, bucket
+
+def dashboard_range_fields(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """The chart fields the dashboard adds for a requested range"""
+    achieved = min(summary["goal_adherence"]["average_calories_pct_of_goal"], 100)
+    averages = summary["averages"]
+    return {
+        "analytics": summary,
+        "daily_data": summary["series"],
+        "macro_data": {"protein": averages["protein"], "carbs": averages["carbs"], "fats": averages["fats"]},
+        "goal_progress": {"achieved": achieved, "remaining": round(100 - achieved, 1)},
+    }
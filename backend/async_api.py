@@ -0,0 +1,180 @@
+"""Async versions of the busiest routes, served when DB_ASYNC is enabled.
+
+The router is included ahead of the sync one in main.py, so these
+handlers shadow their sync counterparts path for path. Reads use the
+same statement builders as the sync code over an AsyncSession; writes
+reuse the sync service functions through AsyncSession.run_sync, so the
+rollup and cache bookkeeping lives in one place.
+"""
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .aggregates import daily_totals_statement, day_meals_statement, fill_daily_totals
+from .analytics import dashboard_range_fields, history_start, resolve_range, summarize_range
+from .authentication import authenticate
+from .cache import AuthenticatedUser
+from .database import get_async_db
+from .live_updates import publish_meal_changes, publish_meal_deleted
+from .meal_analysis import MEAL_ANALYSIS_ASYNC, analysis_workers
+from .meal_history import build_history_page, meal_history_statement, parse_history_params
+from .models import DailyLog, MealEntry, UserProfile
+from .schemas import (
+    DailyLogResponse, MealHistoryPage, MealLogCreate, MealLogResponse, ProfileCreate, ProfileResponse
+)
+from .services import (
+    build_dashboard, delete_meal_entry, get_meal_nutrition_async, lookup_known_nutrition_async, parse_log_date,
+    save_meal_entry, save_profile
+)
+
+async_router = APIRouter(prefix="/api")
+security = HTTPBearer()
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> AuthenticatedUser:
+    """Async get_current_user: the same authenticate(), run on the AsyncSession's connection"""
+    user, _ = await db.run_sync(authenticate, credentials.credentials)
+    return user
+
+async def _get_user_profile(db: AsyncSession, user_id: int):
+    return await db.scalar(select(UserProfile).where(UserProfile.user_id == user_id))
+
+async def _get_daily_totals(db: AsyncSession, user_id: int, start_date: date, end_date: date):
+    rows = (await db.execute(daily_totals_statement(user_id, start_date, end_date))).all()
+    return fill_daily_totals(rows, start_date, end_date)
+
+@async_router.get("/profile", response_model=ProfileResponse)
+async def get_profile(current_user: AuthenticatedUser = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    """Get user profile"""
+    profile = await _get_user_profile(db, current_user.id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return profile
+
+@async_router.put("/profile", response_model=ProfileResponse)
+async def create_or_update_profile(
+    profile_data: ProfileCreate,
+    current_user: AuthenticatedUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create or update user profile"""
+    return await db.run_sync(save_profile, current_user.id, profile_data.model_dump())
+
+@async_router.post("/logs/meals", response_model=MealLogResponse)
+async def log_meal(
+    meal_data: MealLogCreate,
+    current_user: AuthenticatedUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Log a new meal for a specific date"""
+    try:
+        target_date = parse_log_date(meal_data.date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    if MEAL_ANALYSIS_ASYNC:
+        # Meals that need the model are stored pending and analyzed in the background
+        nutritional_data = await lookup_known_nutrition_async(meal_data.description)
+    else:
+        nutritional_data = await get_meal_nutrition_async(meal_data.description)
+    meal = await db.run_sync(save_meal_entry, current_user.id, target_date, meal_data.description, nutritional_data)
+    if nutritional_data is None:
+        analysis_workers.notify()
+    await db.run_sync(publish_meal_changes, "meal_added", [meal])
+    return meal
+
+@async_router.get("/logs/meals", response_model=MealHistoryPage)
+async def get_meal_history(
+    cursor: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    q: Optional[str] = None,
+    limit: Optional[int] = None,
+    current_user: AuthenticatedUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Page through meal history, newest first; pass next_cursor back to continue"""
+    try:
+        after, start, end, limit = parse_history_params(cursor, start_date, end_date, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    rows = (await db.execute(meal_history_statement(current_user.id, limit, after, start, end, q))).all()
+    return build_history_page(rows, limit)
+
+@async_router.get("/logs/{date}", response_model=DailyLogResponse)
+async def get_daily_log(
+    date: str,
+    current_user: AuthenticatedUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all meal entries and summary for a specific date"""
+    try:
+        target_date = datetime.strptime(date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    meals = (await db.scalars(day_meals_statement(current_user.id, target_date))).all()
+    summary = (await _get_daily_totals(db, current_user.id, target_date, target_date))[0]
+    
+    return DailyLogResponse(
+        date=target_date, meals=meals, total_calories=summary["total_calories"],
+        total_protein=summary["total_protein"], total_carbohydrates=summary["total_carbohydrates"],
+        total_fats=summary["total_fats"]
+    )
+
+@async_router.delete("/logs/meals/{meal_id}")
+async def delete_meal(
+    meal_id: int,
+    current_user: AuthenticatedUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a meal entry"""
+    meal = await db.scalar(
+        select(MealEntry).join(DailyLog, MealEntry.log_id == DailyLog.id).where(
+            MealEntry.id == meal_id,
+            DailyLog.user_id == current_user.id
+        )
+    )
+    
+    if not meal:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meal not found")
+    
+    log_id = meal.log_id
+    await db.run_sync(delete_meal_entry, meal, current_user.id)
+    await db.run_sync(publish_meal_deleted, current_user.id, meal_id, log_id)
+    return {"message": "Meal deleted successfully"}
+
+@async_router.get("/dashboard")
+async def get_dashboard_data(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    bucket: Optional[str] = None,
+    current_user: AuthenticatedUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get dashboard data including goals, current day summary and optional range charts"""
+    profile = await _get_user_profile(db, current_user.id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found. Please complete your profile setup.")
+    
+    today = date.today()
+    week = await _get_daily_totals(db, current_user.id, today - timedelta(days=6), today)
+    dashboard = build_dashboard(profile, week)
+    if start_date or end_date:
+        try:
+            start, end, bucket = resolve_range(start_date, end_date, bucket)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        history = await _get_daily_totals(db, current_user.id, history_start(start), end)
+        dashboard.update(dashboard_range_fields(summarize_range(profile, history, start, end, bucket)))
+    return dashboard
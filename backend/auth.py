@@ -1,5 +1,11 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
@@ -11,9 +17,30 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+# Rotated or logged-out refresh tokens are kept this long so their reuse is still detected
+REFRESH_TOKEN_REVOKED_RETENTION_DAYS = int(os.getenv("REFRESH_TOKEN_REVOKED_RETENTION_DAYS", "7"))
+# A token rotated this recently hands out its successor again instead of counting as reuse (tabs refreshing together)
+REFRESH_TOKEN_REUSE_GRACE_SECONDS = int(os.getenv("REFRESH_TOKEN_REUSE_GRACE_SECONDS", "30"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Processes dedicated to bcrypt; 0 hashes in the default threadpool instead
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash/verify jobs allowed to run or wait before new ones are rejected
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing; hashes below the configured cost are upgraded on the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS
+)
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify jobs are already queued"""
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending_jobs = 0
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -23,6 +50,43 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password, also returning a new hash when the stored one is outdated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    """Get the process pool used for bcrypt, created on first use"""
+    global _executor
+    if _executor is None and PASSWORD_HASH_WORKERS > 0:
+        _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+    return _executor
+
+async def _run_password_job(func, *args):
+    """Run a CPU-bound password job off the event loop, rejecting it when the queue is full"""
+    global _pending_jobs
+    if _pending_jobs >= PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHasherBusy("Too many authentication requests in progress")
+    _pending_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), func, *args)
+    finally:
+        _pending_jobs -= 1
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the password hashing pool"""
+    return await _run_password_job(get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password in the password hashing pool (see verify_and_update_password)"""
+    return await _run_password_job(verify_and_update_password, plain_password, hashed_password)
+
+def shutdown_password_hasher() -> None:
+    """Stop the password hashing processes"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -35,6 +99,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def generate_refresh_token() -> str:
+    """Create an opaque, URL-safe refresh token"""
+    return secrets.token_urlsafe(32)
+
+def successor_refresh_token(token: str) -> str:
+    """The token a refresh token rotates into, so a retried refresh can be answered with the same one"""
+    digest = hmac.new(SECRET_KEY.encode("utf-8"), b"refresh-successor:" + token.encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+def hash_refresh_token(token: str) -> str:
+    """Digest under which a refresh token is stored"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
 def verify_token(token: str) -> Optional[dict]:
     """Verify and decode a JWT token"""
     try:
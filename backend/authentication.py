@@ -0,0 +1,47 @@
+"""
+Access token authentication shared by the sync and async routers.
+
+Verified tokens and resolved users are cached briefly (auth_cache), so most
+requests authenticate without decoding the JWT again or querying the
+database. On a miss the token's login must still be live: access tokens
+carry their refresh family as the session id (`sid`), so logging out or a
+revoked family ends them. The async router runs the same code through
+AsyncSession.run_sync.
+"""
+from typing import Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from .auth import verify_token
+from .cache import AuthenticatedUser, auth_cache
+from .models import User
+from .refresh_tokens import session_is_active
+
+def authenticate(db: Session, token: str) -> Tuple[AuthenticatedUser, dict]:
+    """Resolve an access token to its user and verified payload, or raise 401"""
+    payload = auth_cache.get_token(token)
+    if payload is None:
+        payload = verify_token(token)
+        if payload is None or ("sid" in payload and not session_is_active(db, payload["sid"])):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid authentication credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        auth_cache.set_token(token, payload)
+    return load_user(db, payload.get("sub")), payload
+
+def load_user(db: Session, user_id) -> AuthenticatedUser:
+    """The cached user, loading it on a miss; raises 401 when the user no longer exists"""
+    user = auth_cache.get_user(user_id)
+    if user is None:
+        db_user = db.query(User).filter(User.id == user_id).first()
+        if db_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        user = auth_cache.set_user(db_user)
+    return user
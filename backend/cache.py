@@ -0,0 +1,296 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from dotenv import load_dotenv
+
+from .database import SessionLocal
+from .models import MealAnalysisCacheEntry
+from .text_utils import normalize_meal_description, normalize_question
+
+load_dotenv()
+
+# Configuration
+MEAL_CACHE_MAX_ENTRIES = int(os.getenv("MEAL_CACHE_MAX_ENTRIES", "5000"))
+MEAL_CACHE_TTL_SECONDS = float(os.getenv("MEAL_CACHE_TTL_SECONDS", "86400"))
+MEAL_CACHE_PERSIST_TTL_DAYS = int(os.getenv("MEAL_CACHE_PERSIST_TTL_DAYS", "30"))
+ADVICE_CACHE_MAX_ENTRIES = int(os.getenv("ADVICE_CACHE_MAX_ENTRIES", "2000"))
+ADVICE_CACHE_TTL_SECONDS = float(os.getenv("ADVICE_CACHE_TTL_SECONDS", "21600"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+
+# Profile fields that go into the advice prompt; goals are rounded the way the prompt shows them
+ADVICE_PROFILE_FIELDS = ("age", "weight", "height", "gender", "activity_level", "fitness_goal")
+ADVICE_PROFILE_GOALS = ("daily_calorie_goal", "daily_protein_goal", "daily_carb_goal", "daily_fat_goal")
+
+_MISSING = object()
+
+class TTLCache:
+    """Thread-safe in-process LRU cache with a per-entry time to live"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a live entry and mark it recently used"""
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store an entry, evicting the least recently used ones past max_entries"""
+        expires_at = time.monotonic() + (ttl_seconds or self.ttl_seconds)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches, returning how many were dropped"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+class MealAnalysisCache:
+    """Two-tier cache of meal nutrition keyed on the normalized description.
+
+    Lookups hit the in-process LRU first and fall back to the
+    meal_analysis_cache table, which survives restarts and is shared by all
+    workers. Persistent lookups open their own short-lived session so cache
+    writes never interfere with the caller's transaction.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, persist_ttl_days: int):
+        self.memory = TTLCache(max_entries, ttl_seconds)
+        self.persist_ttl = timedelta(days=persist_ttl_days)
+        self.persistent_hits = 0
+        self.persistent_misses = 0
+
+    @staticmethod
+    def make_key(description: str) -> str:
+        """Cache key for a meal description"""
+        return normalize_meal_description(description)
+
+    def get_memory(self, key: str) -> Optional[Dict[str, float]]:
+        """Look up the in-process tier only (never touches the database)"""
+        return self.memory.get(key)
+
+    def get_persistent(self, key: str) -> Optional[Dict[str, float]]:
+        """Look up the database tier, promoting hits into memory"""
+        db = SessionLocal()
+        try:
+            entry = db.get(MealAnalysisCacheEntry, key)
+            if entry is None or entry.created_at < datetime.utcnow() - self.persist_ttl:
+                self.persistent_misses += 1
+                return None
+            result = entry.to_nutrition()
+        finally:
+            db.close()
+        self.persistent_hits += 1
+        self.memory.set(key, result)
+        return result
+
+    def get(self, key: str) -> Optional[Dict[str, float]]:
+        """Look up both tiers"""
+        result = self.get_memory(key)
+        if result is None:
+            result = self.get_persistent(key)
+        return result
+
+    def set(self, key: str, nutritional_data: Dict[str, float]) -> None:
+        """Store an analysis in both tiers"""
+        self.memory.set(key, nutritional_data)
+        db = SessionLocal()
+        try:
+            db.merge(MealAnalysisCacheEntry(
+                key=key,
+                calories=nutritional_data["calories"],
+                protein=nutritional_data["protein"],
+                carbohydrates=nutritional_data["carbohydrates"],
+                fats=nutritional_data["fats"],
+                created_at=datetime.utcnow()
+            ))
+            db.commit()
+        except Exception as e:
+            # Another worker may have stored the same key first; the memory tier still has it
+            db.rollback()
+            print(f"Error persisting meal analysis cache entry: {e}")
+        finally:
+            db.close()
+
+    def clear(self) -> None:
+        """Drop the in-process tier (persisted rows expire on their own)"""
+        self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Combined hit/miss counters for both tiers"""
+        memory_stats = self.memory.stats()
+        misses = self.persistent_misses
+        hits = memory_stats["hits"] + self.persistent_hits
+        return {
+            "memory": memory_stats,
+            "persistent_hits": self.persistent_hits,
+            "persistent_misses": self.persistent_misses,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+
+class AdviceCache:
+    """In-process cache of nutritionist answers.
+
+    Keys combine the normalized question with a fingerprint of the profile
+    fields the prompt is built from, so users with matching profiles share
+    answers and a profile edit never reads an answer written for the old
+    profile.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.memory = TTLCache(max_entries, ttl_seconds)
+
+    @staticmethod
+    def fingerprint(user_profile=None) -> str:
+        """Stable digest of the profile values that shape the advice prompt"""
+        if user_profile is None:
+            return "anonymous"
+        values = [str(getattr(user_profile, name)) for name in ADVICE_PROFILE_FIELDS]
+        values += [f"{getattr(user_profile, name):.0f}" for name in ADVICE_PROFILE_GOALS]
+        return hashlib.sha256("|".join(values).encode("utf-8")).hexdigest()[:16]
+
+    def make_key(self, question: str, user_profile=None) -> tuple:
+        """Cache key for a question asked with a given profile"""
+        return (self.fingerprint(user_profile), normalize_question(question))
+
+    def get(self, key: tuple) -> Optional[str]:
+        """Look up a cached answer"""
+        return self.memory.get(key)
+
+    def set(self, key: tuple, answer: str) -> None:
+        """Store an answer"""
+        self.memory.set(key, answer)
+
+    def invalidate_profile(self, user_profile) -> int:
+        """Drop the answers cached for a profile's current values"""
+        fingerprint = self.fingerprint(user_profile)
+        return self.memory.invalidate_where(lambda key: key[0] == fingerprint)
+
+    def clear(self) -> None:
+        """Drop every answer"""
+        self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        return self.memory.stats()
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """Snapshot of the user columns request handlers need, safe to share across sessions"""
+    id: int
+    email: str
+    full_name: str
+
+class AuthCache:
+    """Short-lived caches of verified tokens and the users they resolve to.
+
+    Entries live for at most AUTH_CACHE_TTL_SECONDS, and tokens never outlive
+    their own expiry, so revocations and account changes made on another
+    worker take effect within one TTL even without explicit invalidation.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.tokens = TTLCache(max_entries, ttl_seconds)
+        self.users = TTLCache(max_entries, ttl_seconds)
+
+    def get_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """Look up the decoded payload of a previously verified token"""
+        return self.tokens.get(token)
+
+    def set_token(self, token: str, payload: Dict[str, Any]) -> None:
+        """Remember a verified token until the TTL or its own expiry, whichever is first"""
+        ttl = self.ttl_seconds
+        if "exp" in payload:
+            ttl = min(ttl, payload["exp"] - time.time())
+        if ttl > 0:
+            self.tokens.set(token, payload, ttl)
+
+    def get_user(self, user_id: Any) -> Optional[AuthenticatedUser]:
+        """Look up a resolved user"""
+        return self.users.get(str(user_id))
+
+    def set_user(self, user) -> AuthenticatedUser:
+        """Store a snapshot of a User row and return it"""
+        snapshot = AuthenticatedUser(id=user.id, email=user.email, full_name=user.full_name)
+        self.users.set(str(user.id), snapshot)
+        return snapshot
+
+    def invalidate_user(self, user_id: Any) -> None:
+        """Drop a user after their account changes"""
+        self.users.invalidate(str(user_id))
+
+    def invalidate_token(self, token: str) -> None:
+        """Drop a token after it is revoked"""
+        self.tokens.invalidate(token)
+
+    def clear(self) -> None:
+        """Drop every token and user"""
+        self.tokens.clear()
+        self.users.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        return {"tokens": self.tokens.stats(), "users": self.users.stats()}
+
+meal_cache = MealAnalysisCache(MEAL_CACHE_MAX_ENTRIES, MEAL_CACHE_TTL_SECONDS, MEAL_CACHE_PERSIST_TTL_DAYS)
+advice_cache = AdviceCache(ADVICE_CACHE_MAX_ENTRIES, ADVICE_CACHE_TTL_SECONDS)
+auth_cache = AuthCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
@@ -1,23 +1,111 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
 import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Database URL from environment variable
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./calorie_tracker.db")
+# Database URL from environment variable; the default SQLite file lives in this package's
+# directory, so the server and the migrations find the same file whatever directory they run from
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calorie_tracker.db")
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DEFAULT_SQLITE_PATH}")
+
+# Connection pool presets; any DB_* variable below overrides the chosen profile
+ENGINE_PROFILES = {
+    "development": {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30, "pool_recycle": -1, "pool_pre_ping": False},
+    "production": {"pool_size": 20, "max_overflow": 30, "pool_timeout": 10, "pool_recycle": 1800, "pool_pre_ping": True},
+}
+DB_PROFILE = os.getenv("DB_PROFILE", "development")
+if DB_PROFILE not in ENGINE_PROFILES:
+    raise ValueError(f"Unknown DB_PROFILE '{DB_PROFILE}'. Choose one of: {', '.join(ENGINE_PROFILES)}")
+
+_profile = ENGINE_PROFILES[DB_PROFILE]
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", _profile["pool_size"])),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", _profile["max_overflow"])),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", _profile["pool_timeout"])),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", _profile["pool_recycle"])),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", str(_profile["pool_pre_ping"])).lower() in ("1", "true", "yes"),
+}
+
+# SQLite settings applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+def _is_sqlite_memory(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune each new SQLite connection for concurrent reads and writes"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")  # negative means KiB, not pages
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    finally:
+        cursor.close()
 
 # Create engine
 if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    if _is_sqlite_memory(DATABASE_URL):
+        # An in-memory database lives inside one connection, so every thread shares that connection
+        engine = create_engine(DATABASE_URL, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(DATABASE_URL, connect_args=connect_args, poolclass=QueuePool, **POOL_SETTINGS)
+    event.listen(engine, "connect", _set_sqlite_pragmas)
 else:
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(DATABASE_URL, **POOL_SETTINGS)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional async mode: serves the hot read/write routes through SQLAlchemy's async engine
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+
+def _async_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its async counterpart"""
+    scheme, _, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{dialect}' databases")
+    return f"{ASYNC_DRIVERS[dialect]}://{rest}"
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+    if ASYNC_DATABASE_URL.startswith("sqlite"):
+        async_connect_args = {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if _is_sqlite_memory(ASYNC_DATABASE_URL):
+            async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=async_connect_args)
+        else:
+            async_engine = create_async_engine(
+                ASYNC_DATABASE_URL, connect_args=async_connect_args, poolclass=AsyncAdaptedQueuePool, **POOL_SETTINGS
+            )
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    else:
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, **POOL_SETTINGS)
+    # Objects stay readable after commit; lazy refreshes are not possible without a greenlet
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create base class for models
 Base = declarative_base()
 
@@ -28,3 +116,159 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """Dependency to get an async database session (requires DB_ASYNC)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_pool_stats() -> dict:
+    """Current connection pool usage and the settings it was created with"""
+    pool = engine.pool
+    stats = {
+        "profile": DB_PROFILE,
+        "dialect": engine.dialect.name,
+        "pool_class": type(pool).__name__,
+        "status": pool.status(),
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "settings": POOL_SETTINGS,
+        })
+    if async_engine is not None:
+        stats["async_pool"] = async_engine.pool.status()
+    return stats
+
+# Query profiling: per-request statement counts and timings, and N+1 detection
+SQL_PROFILE = os.getenv("SQL_PROFILE", "false").lower() in ("1", "true", "yes")
+SQL_PROFILE_REPEAT_THRESHOLD = int(os.getenv("SQL_PROFILE_REPEAT_THRESHOLD", "5"))
+
+_IN_LIST_RE = re.compile(r"\(\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+|:\w+))*\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def statement_shape(statement: str) -> str:
+    """A statement with whitespace and the length of expanded IN lists normalized away"""
+    shape = _WHITESPACE_RE.sub(" ", statement).strip()
+    return _IN_LIST_RE.sub("(?)", shape)
+
+class QueryProfile:
+    """Statements seen while the profile was active"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float) -> None:
+        shape = statement_shape(statement)
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            self.shapes[shape] += 1
+
+    def repeated(self, threshold: int = SQL_PROFILE_REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        """Statement shapes run at least `threshold` times: likely N+1 queries"""
+        with self._lock:
+            return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def summary(self, threshold: int = SQL_PROFILE_REPEAT_THRESHOLD) -> str:
+        lines = [f"{self.count} queries in {self.seconds * 1000:.1f} ms"]
+        lines += [f"  repeated {count}x: {shape[:200]}" for shape, count in self.repeated(threshold)]
+        return "\n".join(lines)
+
+# The profile of the request being served, and profiles capturing every statement (test helpers)
+_request_profile: ContextVar[Optional[QueryProfile]] = ContextVar("request_query_profile", default=None)
+_global_profiles: List[QueryProfile] = []
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["profile_query_start"].pop()
+    profile = _request_profile.get()
+    if profile is not None:
+        profile.record(statement, elapsed)
+    for profile in _global_profiles:
+        profile.record(statement, elapsed)
+
+def _discard_query_start(exception_context):
+    starts = exception_context.connection.info.get("profile_query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+for _engine in (engine, async_engine.sync_engine if async_engine is not None else None):
+    if _engine is not None:
+        event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(_engine, "handle_error", _discard_query_start)
+
+@contextmanager
+def profile_queries() -> Iterator[QueryProfile]:
+    """Capture every statement run on any thread or task until the block exits"""
+    profile = QueryProfile()
+    _global_profiles.append(profile)
+    try:
+        yield profile
+    finally:
+        _global_profiles.remove(profile)
+
+@contextmanager
+def assert_max_queries(max_queries: int, max_repeats: Optional[int] = None) -> Iterator[QueryProfile]:
+    """Fail when the block runs more than `max_queries` statements, or (optionally) any
+    statement shape more than `max_repeats` times. For tests:
+
+        with assert_max_queries(8):
+            client.get("/api/dashboard", headers=auth_headers)
+    """
+    with profile_queries() as profile:
+        yield profile
+    problems = []
+    if profile.count > max_queries:
+        problems.append(f"expected at most {max_queries} queries")
+    if max_repeats is not None and profile.repeated(max_repeats + 1):
+        problems.append(f"expected no statement repeated more than {max_repeats} times")
+    if problems:
+        raise AssertionError(f"{'; '.join(problems)}, got {profile.summary(max_repeats + 1 if max_repeats is not None else 2)}")
+
+class QueryProfilerMiddleware:
+    """ASGI middleware (SQL_PROFILE) that profiles the statements of each request.
+
+    Totals go into X-DB-Query-Count, X-DB-Query-Time-Ms and
+    X-DB-Repeated-Queries response headers and a log line. Headers are sent
+    before a streamed body, so they only cover statements run until then;
+    the log line covers the whole request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers += [
+                    (b"x-db-query-count", str(profile.count).encode()),
+                    (b"x-db-query-time-ms", f"{profile.seconds * 1000:.1f}".encode()),
+                    (b"x-db-repeated-queries", str(len(profile.repeated())).encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _request_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_profile.reset(token)
+            if profile.count:
+                flag = "⚠️  possible N+1 " if profile.repeated() else ""
+                print(f"🔎 {flag}SQL {scope['method']} {scope['path']}: {profile.summary()}")
@@ -0,0 +1,367 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .text_utils import tokenize
+
+load_dotenv()
+
+# Configuration
+FOOD_DB_MIN_CONFIDENCE = float(os.getenv("FOOD_DB_MIN_CONFIDENCE", "1.0"))
+FOOD_DB_MAX_ITEM_GRAMS = float(os.getenv("FOOD_DB_MAX_ITEM_GRAMS", "2000"))  # Larger amounts are clamped
+
+@dataclass(frozen=True)
+class Food:
+    """A food with nutrients per 100 g (or 100 ml) and its common serving sizes"""
+    name: str
+    calories: float
+    protein: float
+    carbohydrates: float
+    fats: float
+    default_unit: str
+    units: Dict[str, float]  # unit -> grams per unit
+    synonyms: Tuple[str, ...] = field(default_factory=tuple)
+
+# Nutrients are per 100 g (per 100 ml for drinks). Serving weights are chosen
+# so one default serving matches the reference values used in the AI prompt.
+FOODS = [
+    Food("banana", 89, 1.1, 22.8, 0.34, "piece", {"piece": 118},
+         ("banana", "kela", "केला", "کیلا")),
+    Food("apple", 52, 0.26, 13.7, 0.17, "piece", {"piece": 182},
+         ("apple", "seb", "saib", "सेब", "سیب")),
+    Food("peach", 39, 0.7, 10, 0.27, "piece", {"piece": 150},
+         ("peach", "aaru", "aru", "آڑو")),
+    Food("orange", 47, 0.9, 11.8, 0.1, "piece", {"piece": 130},
+         ("orange", "santra", "malta", "kinnow", "kinno", "संतरा", "مالٹا", "کینو")),
+    Food("mango", 60, 0.8, 15, 0.4, "piece", {"piece": 200, "cup": 165},
+         ("mango", "aam", "आम", "آم")),
+    Food("fruit", 52, 0.3, 13.7, 0.2, "piece", {"piece": 182, "cup": 150, "bowl": 200, "plate": 250},
+         ("fruit", "fruits", "phal", "fruit chaat", "फल", "پھل")),
+    Food("dates", 282, 2.5, 75, 0.4, "piece", {"piece": 8},
+         ("date", "dates", "khajoor", "khajur", "खजूर", "کھجور")),
+    Food("almonds", 579, 21, 22, 50, "piece", {"piece": 1.2, "cup": 143},
+         ("almond", "almonds", "badam", "baadam", "बादाम", "بادام")),
+    Food("daal", 116, 9.1, 20.1, 0.4, "cup", {"cup": 198, "bowl": 198, "plate": 300},
+         ("daal", "lentil", "lentils", "masoor", "moong", "daal mash", "दाल", "دال")),
+    Food("chana", 164, 8.9, 27.4, 2.6, "cup", {"cup": 164, "bowl": 200, "plate": 300},
+         ("chana", "chanay", "channay", "chole", "chholay", "chickpea", "chickpeas", "छोले", "چنے")),
+    Food("roti", 300, 7.5, 50, 5, "piece", {"piece": 40},
+         ("roti", "chapati", "phulka", "रोटी", "चपाती", "روٹی", "چپاتی")),
+    Food("naan", 290, 9, 50, 5.7, "piece", {"piece": 90},
+         ("naan", "nan", "नान", "نان")),
+    Food("paratha", 326, 6.4, 45, 13, "piece", {"piece": 80},
+         ("paratha", "पराठा", "پراٹھا")),
+    Food("bread", 267, 10, 50, 3.3, "slice", {"slice": 30, "piece": 30},
+         ("bread", "double roti", "toast", "ब्रेड", "ڈبل روٹی", "بریڈ")),
+    Food("rice", 127, 2.5, 28.5, 0.3, "cup", {"cup": 158, "bowl": 200, "plate": 300},
+         ("rice", "chawal", "boiled rice", "plain rice", "चावल", "چاول")),
+    Food("biryani", 170, 8, 20, 6.5, "plate", {"plate": 350, "cup": 200, "bowl": 250},
+         ("biryani", "chicken biryani", "बिरयानी", "بریانی")),
+    Food("pulao", 150, 4, 24, 4.5, "plate", {"plate": 300, "cup": 180, "bowl": 220},
+         ("pulao", "pilaf", "पुलाव", "پلاؤ")),
+    Food("khichdi", 120, 4.5, 20, 2.5, "bowl", {"bowl": 200, "cup": 200, "plate": 300},
+         ("khichdi", "khichri", "खिचड़ी", "کھچڑی")),
+    Food("egg", 140, 12, 1.2, 10, "piece", {"piece": 50},
+         ("egg", "anda", "boiled egg", "अंडा", "انڈا", "انڈے")),
+    Food("omelette", 154, 10.6, 0.6, 11.7, "piece", {"piece": 90},
+         ("omelette", "omelet", "amlet", "आमलेट", "آملیٹ")),
+    Food("milk", 61, 3.2, 4.8, 3.3, "glass", {"glass": 250, "cup": 240},
+         ("milk", "doodh", "दूध", "دودھ")),
+    Food("chai", 40, 1.3, 6, 1.3, "cup", {"cup": 150, "glass": 250},
+         ("chai", "tea", "milk tea", "doodh patti", "चाय", "چائے")),
+    Food("coffee", 30, 1.5, 3.5, 1.2, "cup", {"cup": 240, "glass": 250},
+         ("coffee", "kaafi", "कॉफी", "کافی")),
+    Food("dahi", 61, 3.5, 4.7, 3.3, "cup", {"cup": 245, "bowl": 250},
+         ("dahi", "yogurt", "yoghurt", "curd", "दही", "دہی")),
+    Food("raita", 55, 2.5, 5, 2.5, "cup", {"cup": 200, "bowl": 200},
+         ("raita", "रायता", "رائتہ")),
+    Food("lassi", 75, 3, 10, 2.5, "glass", {"glass": 250, "cup": 240},
+         ("lassi", "लस्सी", "لسی")),
+    Food("chicken curry", 150, 14, 4, 9, "cup", {"cup": 240, "bowl": 250, "plate": 300, "piece": 100},
+         ("chicken curry", "chicken salan", "murgh salan", "chicken karahi", "karahi", "chicken handi",
+          "चिकन करी", "چکن کڑاہی", "چکن سالن")),
+    Food("chicken", 165, 31, 0, 3.6, "piece", {"piece": 120, "plate": 200},
+         ("chicken", "murgh", "grilled chicken", "chicken breast", "tikka", "chicken tikka", "चिकन", "چکن")),
+    Food("mutton curry", 200, 15, 4, 14, "cup", {"cup": 240, "bowl": 250, "plate": 300, "piece": 60},
+         ("mutton", "mutton curry", "gosht", "qorma", "korma", "मटन", "گوشت", "قورمہ")),
+    Food("nihari", 180, 14, 4, 12, "bowl", {"bowl": 250, "cup": 240, "plate": 300},
+         ("nihari", "نہاری")),
+    Food("haleem", 130, 9, 13, 5, "bowl", {"bowl": 250, "cup": 240, "plate": 300},
+         ("haleem", "حلیم")),
+    Food("kebab", 240, 17, 4, 17, "piece", {"piece": 45},
+         ("kebab", "kabab", "seekh kabab", "seekh kebab", "shami kabab", "कबाब", "کباب")),
+    Food("fish", 150, 22, 0, 6, "piece", {"piece": 150, "plate": 250},
+         ("fish", "machli", "machhli", "मछली", "مچھلی")),
+    Food("sabzi", 90, 2.5, 10, 4.5, "cup", {"cup": 200, "bowl": 250, "plate": 300},
+         ("sabzi", "vegetable", "vegetables", "mixed vegetables", "bhaji", "aloo sabzi", "aloo gobi",
+          "सब्जी", "سبزی")),
+    Food("potato", 87, 1.9, 20, 0.1, "piece", {"piece": 150, "cup": 150},
+         ("potato", "potatoes", "aloo", "आलू", "آلو")),
+    Food("salad", 20, 1, 4, 0.2, "bowl", {"bowl": 150, "plate": 200, "cup": 100},
+         ("salad", "salaad", "सलाद", "سلاد")),
+    Food("samosa", 262, 4, 24, 17, "piece", {"piece": 100},
+         ("samosa", "samosay", "समोसा", "سموسہ")),
+    Food("pakora", 300, 8, 27, 18, "piece", {"piece": 20, "plate": 150},
+         ("pakora", "pakoray", "pakoda", "pakode", "पकौड़ा", "پکوڑا", "پکوڑے")),
+    Food("oats", 71, 2.5, 12, 1.5, "cup", {"cup": 234, "bowl": 250},
+         ("oats", "oatmeal", "porridge", "daliya", "dalia", "दलिया", "دلیہ")),
+    Food("halwa", 330, 4, 45, 15, "bowl", {"bowl": 150, "cup": 200, "plate": 200},
+         ("halwa", "suji halwa", "हलवा", "حلوہ")),
+    Food("kheer", 140, 4, 20, 5, "bowl", {"bowl": 150, "cup": 200},
+         ("kheer", "खीर", "کھیر")),
+    Food("pizza", 266, 11, 33, 10, "slice", {"slice": 107, "piece": 107},
+         ("pizza", "पिज़्ज़ा", "پیزا")),
+    Food("burger", 250, 13, 24, 11, "piece", {"piece": 220},
+         ("burger", "बर्गर", "برگر")),
+    Food("fries", 312, 3.4, 41, 15, "plate", {"plate": 117, "cup": 60},
+         ("fries", "french fries", "chips", "فرائز")),
+    Food("pasta", 157, 5.8, 31, 0.9, "cup", {"cup": 140, "bowl": 250, "plate": 300},
+         ("pasta", "spaghetti", "macaroni", "noodles", "पास्ता", "پاستا")),
+    Food("juice", 45, 0.7, 10.4, 0.2, "glass", {"glass": 250, "cup": 240},
+         ("juice", "orange juice", "jooce", "जूस", "جوس")),
+    Food("soft drink", 42, 0, 10.6, 0, "glass", {"glass": 250, "can": 330, "bottle": 500},
+         ("coke", "pepsi", "soda", "soft drink", "cold drink", "sprite", "7up")),
+    Food("water", 0, 0, 0, 0, "glass", {"glass": 250, "cup": 240, "bottle": 500},
+         ("water", "pani", "paani", "पानी", "پانی")),
+    Food("sugar", 387, 0, 100, 0, "tsp", {"tsp": 4, "tbsp": 12},
+         ("sugar", "cheeni", "chini", "चीनी", "چینی")),
+    Food("ghee", 900, 0, 0, 100, "tbsp", {"tbsp": 14, "tsp": 5},
+         ("ghee", "desi ghee", "घी", "گھی")),
+    Food("butter", 717, 0.9, 0.1, 81, "tbsp", {"tbsp": 14, "tsp": 5, "slice": 10},
+         ("butter", "makhan", "makkhan", "मक्खन", "مکھن")),
+]
+
+# Unit spellings (English, Roman Urdu, Hindi/Urdu script) mapped to canonical units
+UNIT_ALIASES = {
+    "cup": "cup", "cups": "cup", "pyala": "cup", "pyali": "cup", "piyala": "cup", "कप": "cup", "کپ": "cup",
+    "bowl": "bowl", "bowls": "bowl", "katori": "bowl", "katoriyan": "bowl", "कटोरी": "bowl", "کٹوری": "bowl",
+    "plate": "plate", "plates": "plate", "प्लेट": "plate", "پلیٹ": "plate",
+    "glass": "glass", "glasses": "glass", "gilas": "glass", "gilaas": "glass", "गिलास": "glass", "گلاس": "glass",
+    "piece": "piece", "pieces": "piece", "pc": "piece", "pcs": "piece", "adad": "piece", "dana": "piece",
+    "daana": "piece", "tukra": "piece", "tukray": "piece",
+    "slice": "slice", "slices": "slice",
+    "can": "can", "cans": "can", "bottle": "bottle", "bottles": "bottle", "botal": "bottle",
+    "tbsp": "tbsp", "tablespoon": "tbsp", "tablespoons": "tbsp", "chamach": "tbsp", "chammach": "tbsp",
+    "tsp": "tsp", "teaspoon": "tsp", "teaspoons": "tsp",
+    "g": "g", "gm": "g", "gms": "g", "gram": "g", "grams": "g", "grm": "g",
+    "kg": "kg", "kilo": "kg", "ml": "ml", "l": "l", "litre": "l", "liter": "l",
+}
+
+# Weight used when a food is given in a unit it has no specific size for
+GENERIC_UNIT_GRAMS = {
+    "cup": 200, "bowl": 250, "plate": 300, "glass": 250, "slice": 30, "can": 330, "bottle": 500,
+    "tbsp": 15, "tsp": 5,
+}
+MASS_UNIT_GRAMS = {"g": 1, "kg": 1000, "ml": 1, "l": 1000}
+
+SIZE_MULTIPLIERS = {
+    "small": 0.75, "chota": 0.75, "choti": 0.75, "medium": 1.0, "regular": 1.0,
+    "large": 1.3, "big": 1.3, "bara": 1.3, "bari": 1.3, "full": 1.0,
+}
+
+# Words that carry no nutritional meaning and may be skipped without lowering confidence
+FILLER_WORDS = {
+    "a", "an", "the", "of", "with", "and", "plus", "some", "my", "for", "in", "on", "had", "ate",
+    "breakfast", "lunch", "dinner", "snack", "meal", "cooked", "boiled", "plain", "fresh", "homemade",
+    "ripe", "desi", "serving", "servings", "portion", "portions",
+    "aur", "or", "ke", "ka", "ki", "k", "sath", "saath", "sth", "mein", "main", "wala", "wali", "walay",
+    "और", "के", "साथ", "का", "की", "اور", "کے", "ساتھ", "کا", "کی",
+}
+
+# Roman Urdu "do" (two) is only read as a number when a unit, size or food follows
+AMBIGUOUS_NUMBER_WORDS = {"do": 2.0}
+
+_NUMBER_RE = re.compile(r"^\d+(?:\.\d+)?$")
+_ITEM_SEPARATOR_RE = re.compile(r"[,;+&\n]|،")  # Punctuation that separates foods; tokenize() drops it
+_FRACTION_RE = re.compile(r"^(\d+)/(\d+)$")
+
+def _parse_number(token: str) -> Optional[float]:
+    if _NUMBER_RE.match(token):
+        return float(token)
+    match = _FRACTION_RE.match(token)
+    if match and int(match.group(2)):
+        return int(match.group(1)) / int(match.group(2))
+    return None
+
+def _build_index() -> Tuple[Dict[Tuple[str, ...], Food], Dict[str, int]]:
+    """Index every synonym by its token tuple, plus the longest synonym per first token"""
+    index: Dict[Tuple[str, ...], Food] = {}
+    longest: Dict[str, int] = {}
+    for food in FOODS:
+        for synonym in (food.name,) + food.synonyms:
+            tokens = tuple(tokenize(synonym))
+            index.setdefault(tokens, food)
+            longest[tokens[0]] = max(longest.get(tokens[0], 0), len(tokens))
+    return index, longest
+
+_SYNONYM_INDEX, _LONGEST_SYNONYM = _build_index()
+_KNOWN_TOKENS = {token for synonym in _SYNONYM_INDEX for token in synonym}
+
+def _index_token(token: str) -> str:
+    """Map a token onto the spelling used in the index ("bananas" -> "banana")"""
+    if token in _KNOWN_TOKENS:
+        return token
+    for suffix in ("oes", "es", "s"):
+        if token.endswith(suffix) and len(token) > len(suffix) + 2:
+            candidate = token[:-len(suffix)]
+            if candidate in _KNOWN_TOKENS:
+                return candidate
+    return token
+
+def _match_food(tokens: List[str], start: int) -> Tuple[Optional[Food], int]:
+    """Longest synonym match starting at tokens[start]; returns (food, tokens consumed)"""
+    max_len = _LONGEST_SYNONYM.get(_index_token(tokens[start]))
+    if not max_len:
+        return None, 0
+    for length in range(min(max_len, len(tokens) - start), 0, -1):
+        food = _SYNONYM_INDEX.get(tuple(_index_token(t) for t in tokens[start:start + length]))
+        if food:
+            return food, length
+    return None, 0
+
+@dataclass
+class FoodItem:
+    """One resolved food in a meal description"""
+    food: Food
+    quantity: float = 1.0
+    unit: Optional[str] = None
+    explicit_quantity: bool = False
+
+    @property
+    def grams(self) -> float:
+        unit = self.unit or self.food.default_unit
+        if unit in MASS_UNIT_GRAMS:
+            return self.quantity * MASS_UNIT_GRAMS[unit]
+        unit_grams = self.food.units.get(unit) or GENERIC_UNIT_GRAMS.get(unit) \
+            or self.food.units[self.food.default_unit]
+        return self.quantity * unit_grams
+
+    def nutrition(self) -> Dict[str, float]:
+        factor = self.grams / 100
+        return {
+            "calories": self.food.calories * factor,
+            "protein": self.food.protein * factor,
+            "carbohydrates": self.food.carbohydrates * factor,
+            "fats": self.food.fats * factor,
+        }
+
+@dataclass
+class MealResolution:
+    """Result of resolving a meal description against the local food table"""
+    items: List[FoodItem]
+    unresolved: List[str]
+    content_tokens: int
+    ambiguous: bool = False  # A number could not be read with certainty, or a quantity was clamped
+
+    @property
+    def confidence(self) -> float:
+        if not self.items or not self.content_tokens:
+            return 0.0
+        return 1 - len(self.unresolved) / self.content_tokens
+
+    @property
+    def is_confident(self) -> bool:
+        return bool(self.items) and not self.ambiguous and self.confidence >= FOOD_DB_MIN_CONFIDENCE
+
+    def nutrition(self) -> Dict[str, float]:
+        totals = {"calories": 0.0, "protein": 0.0, "carbohydrates": 0.0, "fats": 0.0}
+        for item in self.items:
+            for key, value in item.nutrition().items():
+                totals[key] += value
+        return {key: round(value, 1) for key, value in totals.items()}
+
+def resolve_meal(description: str) -> MealResolution:
+    """Resolve a free-text meal ("2 cups chawal with half plate biryani") into foods.
+
+    Tokens are scanned left to right: numbers, sizes and units accumulate into
+    a pending quantity that is attached to the next food matched. A quantity
+    left over after the last food applies to the preceding food only when it
+    has a unit ("chawal 2 plate") and that food had none of its own. A bare
+    number right after a food ("chicken 65") is never a count: it is skipped
+    and, like a clamped quantity above FOOD_DB_MAX_ITEM_GRAMS, marks the
+    resolution ambiguous, so it is not trusted on its own. So do two foods
+    with nothing between them: "butter chicken" or "banana bread" is one
+    dish, not two of the foods in the table.
+    """
+    tokens: List[str] = []
+    boundaries = set()  # Token indices that start a new comma-separated item
+    for part in _ITEM_SEPARATOR_RE.split(description):
+        boundaries.add(len(tokens))
+        tokens.extend(tokenize(part))
+    items: List[FoodItem] = []
+    unresolved: List[str] = []
+    content_tokens = 0
+    quantity: Optional[float] = None
+    unit: Optional[str] = None
+    size = 1.0
+    ambiguous = False
+    food_end = -1  # Index just past the last matched food
+
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        number = _parse_number(token)
+        if number is None and token in AMBIGUOUS_NUMBER_WORDS and i + 1 < len(tokens):
+            following = tokens[i + 1]
+            if following in UNIT_ALIASES or following in SIZE_MULTIPLIERS or _match_food(tokens, i + 1)[0]:
+                number = AMBIGUOUS_NUMBER_WORDS[token]
+        if number is not None:
+            following = tokens[i + 1] if i + 1 < len(tokens) else None
+            if i == food_end and following not in UNIT_ALIASES and following not in SIZE_MULTIPLIERS:
+                # "chicken 65 with rice": part of the dish's name, or a count written after the food
+                ambiguous = True
+                i += 1
+                continue
+            # "1 0.5" (one and a half) accumulates; otherwise a new number replaces the old
+            quantity = quantity + number if quantity is not None and number < 1 else number
+            i += 1
+            continue
+        if token in UNIT_ALIASES:
+            unit = UNIT_ALIASES[token]
+            i += 1
+            continue
+        if token in SIZE_MULTIPLIERS:
+            size = SIZE_MULTIPLIERS[token]
+            i += 1
+            continue
+        if token in FILLER_WORDS:
+            i += 1
+            continue
+
+        food, consumed = _match_food(tokens, i)
+        content_tokens += max(consumed, 1)
+        if food is None:
+            unresolved.append(token)
+            i += 1
+            continue
+        if i == food_end and i not in boundaries:
+            ambiguous = True
+        items.append(FoodItem(
+            food=food,
+            quantity=(quantity if quantity is not None else 1.0) * size,
+            unit=unit,
+            explicit_quantity=quantity is not None or unit is not None
+        ))
+        quantity, unit, size = None, None, 1.0
+        i += consumed
+        food_end = i
+
+    if quantity is not None or unit is not None:
+        if unit is not None and items and not items[-1].explicit_quantity:
+            last = items[-1]
+            last.quantity = (quantity if quantity is not None else 1.0) * size
+            last.unit = unit
+            last.explicit_quantity = True
+        else:
+            ambiguous = True
+
+    for item in items:
+        grams = item.grams
+        if grams > FOOD_DB_MAX_ITEM_GRAMS:
+            item.quantity *= FOOD_DB_MAX_ITEM_GRAMS / grams
+            ambiguous = True
+
+    return MealResolution(items=items, unresolved=unresolved, content_tokens=content_tokens, ambiguous=ambiguous)
@@ -0,0 +1,155 @@
+"""
+Per-user food term frequencies kept in the user_food_terms table.
+
+Each meal contributes its distinct food words (text_utils.food_terms) once.
+Counts are adjusted in the same transaction as the meal insert or delete,
+so "most common foods" is an index read instead of a rescan of every meal
+name. Run `python -m backend.food_terms check` to report drift and
+`python -m backend.food_terms rebuild` to recount every user from their
+meals.
+"""
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import DailyLog, MealEntry, UserFoodTerm
+from .text_utils import food_terms
+
+# Rows per multi-row INSERT, well under SQLite's bound-parameter limit
+UPSERT_CHUNK_SIZE = 500
+
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def _count_terms(meal_names: Iterable[Tuple[int, str]]) -> Dict[Tuple[int, str], int]:
+    counts: Dict[Tuple[int, str], int] = Counter()
+    for user_id, meal_name in meal_names:
+        for term in food_terms(meal_name):
+            counts[(user_id, term)] += 1
+    return counts
+
+def _add_counts(db: Session, counts: Dict[Tuple[int, str], int], logged_at: datetime) -> None:
+    """Add to the counts, creating terms seen for the first time"""
+    rows = [
+        {"user_id": user_id, "term": term, "count": count, "last_logged_at": logged_at}
+        for (user_id, term), count in counts.items()
+    ]
+    dialect_insert = _DIALECT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        # Portable fallback: update what exists, insert the rest
+        for row in rows:
+            result = db.execute(
+                update(UserFoodTerm)
+                .where(UserFoodTerm.user_id == row["user_id"], UserFoodTerm.term == row["term"])
+                .values(count=UserFoodTerm.count + row["count"], last_logged_at=logged_at)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                db.execute(insert(UserFoodTerm).values(row))
+        return
+
+    # One atomic upsert per chunk, so concurrent writers cannot lose increments
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = dialect_insert(UserFoodTerm).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[UserFoodTerm.user_id, UserFoodTerm.term],
+            set_={"count": UserFoodTerm.count + stmt.excluded.count, "last_logged_at": stmt.excluded.last_logged_at}
+        ))
+
+def _subtract_counts(db: Session, counts: Dict[Tuple[int, str], int]) -> None:
+    """Subtract from the counts and drop terms that no meal contains any more"""
+    by_amount: Dict[Tuple[int, int], List[str]] = defaultdict(list)
+    for (user_id, term), count in counts.items():
+        by_amount[(user_id, count)].append(term)
+    for (user_id, count), terms in by_amount.items():
+        db.execute(
+            update(UserFoodTerm)
+            .where(UserFoodTerm.user_id == user_id, UserFoodTerm.term.in_(terms))
+            .values(count=UserFoodTerm.count - count)
+            .execution_options(synchronize_session=False)
+        )
+    for user_id in {user_id for user_id, _ in counts}:
+        db.execute(
+            delete(UserFoodTerm)
+            .where(UserFoodTerm.user_id == user_id, UserFoodTerm.count <= 0)
+            .execution_options(synchronize_session=False)
+        )
+
+def apply_term_deltas(db: Session, meals: Iterable[Tuple[int, str, int]]) -> None:
+    """Add (sign=1) or remove (sign=-1) meals from their users' food term counts.
+
+    `meals` holds (user_id, meal_name, sign) tuples; the caller commits.
+    """
+    added, removed = [], []
+    for user_id, meal_name, sign in meals:
+        (added if sign > 0 else removed).append((user_id, meal_name))
+    if added:
+        _add_counts(db, _count_terms(added), datetime.utcnow())
+    if removed:
+        _subtract_counts(db, _count_terms(removed))
+
+def top_food_terms(db: Session, user_id: int, limit: int = 10) -> List[UserFoodTerm]:
+    """A user's most frequently logged food terms, most frequent first"""
+    return db.scalars(
+        select(UserFoodTerm)
+        .where(UserFoodTerm.user_id == user_id)
+        .order_by(UserFoodTerm.count.desc(), UserFoodTerm.term)
+        .limit(limit)
+    ).all()
+
+def _meal_names_statement(user_ids: Optional[Iterable[int]] = None):
+    stmt = select(DailyLog.user_id, MealEntry.name).join(DailyLog, MealEntry.log_id == DailyLog.id)
+    if user_ids is not None:
+        stmt = stmt.where(DailyLog.user_id.in_(list(user_ids)))
+    return stmt
+
+def find_drift(db: Session) -> List[Tuple[int, str, Optional[int], int]]:
+    """List (user_id, term, stored, actual) for every count that disagrees with the meals"""
+    actual = _count_terms(db.execute(_meal_names_statement()))
+    stored = {(row.user_id, row.term): row.count for row in db.scalars(select(UserFoodTerm))}
+    return [
+        (user_id, term, stored.get((user_id, term)), actual.get((user_id, term), 0))
+        for user_id, term in sorted(actual.keys() | stored.keys())
+        if stored.get((user_id, term)) != actual.get((user_id, term), 0)
+    ]
+
+def rebuild_food_terms(db: Session, user_ids: Optional[Iterable[int]] = None) -> int:
+    """Recount food terms from meal entries (all users by default); returns the number of terms stored"""
+    user_ids = list(user_ids) if user_ids is not None else None
+    counts = _count_terms(db.execute(_meal_names_statement(user_ids)))
+    stmt = delete(UserFoodTerm)
+    if user_ids is not None:
+        stmt = stmt.where(UserFoodTerm.user_id.in_(user_ids))
+    db.execute(stmt)
+    if counts:
+        _add_counts(db, counts, datetime.utcnow())
+    db.commit()
+    return len(counts)
+
+def main(argv: List[str]) -> int:
+    from .database import SessionLocal
+
+    command = argv[0] if argv else "check"
+    if command not in ("check", "rebuild"):
+        print("Usage: python -m backend.food_terms [check|rebuild]")
+        return 2
+
+    db = SessionLocal()
+    try:
+        if command == "rebuild":
+            print(f"Rebuilt {rebuild_food_terms(db)} food term counts")
+            return 0
+        drift = find_drift(db)
+        for user_id, term, stored, actual in drift:
+            print(f"user {user_id} '{term}': stored={stored} actual={actual}")
+        print(f"{len(drift)} food term counts out of sync")
+        return 1 if drift else 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,199 @@
+"""
+Live dashboard updates pushed over Server-Sent Events (GET /api/live/events).
+
+Every open tab of a signed-in user holds one event stream. After each
+write, the handler publishes a small delta to that user's streams: a meal
+was logged, a meal was deleted, or a background analysis completed. The
+delta carries the meal and its day's new totals, read from the rollups
+with one query. The frontend patches its lists, totals and weekly chart
+from these deltas instead of fetching the dashboard again. When nobody is
+subscribed, publishing returns before touching the database.
+
+- Subscribers are kept in memory per process. With several app processes,
+  a write only reaches streams connected to the same process. Clients
+  reload everything whenever they (re)connect, so nothing is lost for
+  long.
+- A client that falls more than LIVE_UPDATES_QUEUE_SIZE events behind
+  gets a single `resync` event instead of the backlog.
+- EventSource cannot send an Authorization header, and a token in the URL
+  would end up in access logs. Clients first POST /api/live/ticket with
+  their access token and open the stream with the returned ticket, which
+  is single-use and expires after LIVE_UPDATES_TICKET_TTL_SECONDS.
+  Tickets are stored in the database, so any app process can redeem them.
+- The stream ends with an `expired` event when the access token the ticket
+  was issued for expires. The client then gets a new ticket and reconnects.
+"""
+import asyncio
+import hashlib
+import os
+import secrets
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from .aggregates import log_totals_statement
+from .database import SessionLocal
+from .models import LiveStreamTicket, MealEntry
+from .schemas import MealLogResponse
+
+load_dotenv()
+
+# Configuration
+LIVE_UPDATES_ENABLED = os.getenv("LIVE_UPDATES_ENABLED", "true").lower() in ("1", "true", "yes")
+LIVE_UPDATES_MAX_STREAMS_PER_USER = int(os.getenv("LIVE_UPDATES_MAX_STREAMS_PER_USER", "5"))
+LIVE_UPDATES_QUEUE_SIZE = int(os.getenv("LIVE_UPDATES_QUEUE_SIZE", "100"))
+LIVE_UPDATES_HEARTBEAT_SECONDS = float(os.getenv("LIVE_UPDATES_HEARTBEAT_SECONDS", "15"))
+LIVE_UPDATES_TICKET_TTL_SECONDS = float(os.getenv("LIVE_UPDATES_TICKET_TTL_SECONDS", "30"))
+
+TOTAL_FIELDS = ("total_calories", "total_protein", "total_carbohydrates", "total_fats", "meal_count")
+
+class TooManyStreams(Exception):
+    """The user already has LIVE_UPDATES_MAX_STREAMS_PER_USER open streams"""
+
+class Subscription:
+    """One open stream: a bounded queue fed from any thread through its event loop"""
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(LIVE_UPDATES_QUEUE_SIZE)
+
+    def _deliver(self, message: Tuple[str, Any]) -> None:
+        if self.queue.full():
+            # Deltas only make sense in order; a client that fell behind reloads instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = ("resync", {})
+        self.queue.put_nowait(message)
+
+    def send(self, event: str, data: Any) -> None:
+        self.loop.call_soon_threadsafe(self._deliver, (event, data))
+
+class LiveUpdates:
+    """Per-user fan-out of events to the streams open in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Open a subscription on the running event loop"""
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            if len(self._subscriptions[user_id]) >= LIVE_UPDATES_MAX_STREAMS_PER_USER:
+                raise TooManyStreams()
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def subscribed_users(self) -> Set[int]:
+        with self._lock:
+            return set(self._subscriptions)
+
+    def stream_count(self) -> int:
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def publish(self, user_id: int, event: str, data: Any) -> None:
+        """Queue an event for every stream of the user; safe to call from any thread"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.send(event, data)
+
+live_updates = LiveUpdates()
+
+def _hash_ticket(ticket: str) -> str:
+    return hashlib.sha256(ticket.encode("utf-8")).hexdigest()
+
+def issue_stream_ticket(db: Session, user_id: int, session_expires_at: Optional[datetime]) -> str:
+    """Create a single-use ticket for opening one stream, purging expired ones; the caller commits"""
+    now = datetime.utcnow()
+    db.execute(
+        delete(LiveStreamTicket)
+        .where(LiveStreamTicket.expires_at < now)
+        .execution_options(synchronize_session=False)
+    )
+    ticket = secrets.token_urlsafe(32)
+    db.add(LiveStreamTicket(
+        user_id=user_id,
+        ticket_hash=_hash_ticket(ticket),
+        expires_at=now + timedelta(seconds=LIVE_UPDATES_TICKET_TTL_SECONDS),
+        session_expires_at=session_expires_at,
+        created_at=now
+    ))
+    return ticket
+
+def redeem_stream_ticket(db: Session, ticket: str) -> Optional[Tuple[int, Optional[datetime]]]:
+    """Use up a ticket, returning its user id and session expiry; None when unknown, expired or used"""
+    stored = db.scalars(select(LiveStreamTicket).where(LiveStreamTicket.ticket_hash == _hash_ticket(ticket))).first()
+    if stored is None or stored.expires_at < datetime.utcnow():
+        return None
+    claimed = (stored.user_id, stored.session_expires_at)
+    # Deleting the row is the claim: of two concurrent redemptions, only one deletes it
+    deleted = db.execute(
+        delete(LiveStreamTicket)
+        .where(LiveStreamTicket.id == stored.id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return claimed if deleted else None
+
+def _day_totals(db: Session, log_ids: Iterable[int]) -> Dict[int, Tuple[int, date, Dict[str, float]]]:
+    """user_id, date and current totals per daily log"""
+    return {
+        row[0]: (row[1], row[2], dict(zip(TOTAL_FIELDS, row[3:])))
+        for row in db.execute(log_totals_statement(log_ids))
+    }
+
+def publish_meal_changes(db: Session, event: str, meals: List[MealEntry]) -> None:
+    """Publish `event` (meal_added or meal_updated) for each meal, with its day's totals.
+
+    Call after the meals were committed. Meals of users without an open
+    stream are skipped, and nothing is queried when nobody is subscribed.
+    """
+    subscribed = live_updates.subscribed_users()
+    if not meals or not subscribed:
+        return
+    days = _day_totals(db, {meal.log_id for meal in meals})
+    for meal in meals:
+        user_id, day, totals = days[meal.log_id]
+        if user_id in subscribed:
+            live_updates.publish(user_id, event, {
+                "meal": MealLogResponse.model_validate(meal).model_dump(mode="json"),
+                "date": day.isoformat(),
+                "totals": totals,
+            })
+
+def publish_meal_deleted(db: Session, user_id: int, meal_id: int, log_id: int) -> None:
+    """Publish meal_deleted with the day's totals; call after the delete was committed"""
+    if user_id not in live_updates.subscribed_users():
+        return
+    _, day, totals = _day_totals(db, [log_id])[log_id]
+    live_updates.publish(user_id, "meal_deleted", {"id": meal_id, "date": day.isoformat(), "totals": totals})
+
+def _publish_analyzed(meals: List[MealEntry]) -> None:
+    db = SessionLocal()
+    try:
+        publish_meal_changes(db, "meal_updated", meals)
+    except Exception as e:
+        print(f"Error publishing analyzed meals: {e!r}")
+    finally:
+        db.close()
+
+def publish_analyzed_meals(meals: List[MealEntry]) -> None:
+    """Meal analysis listener: push completed meals without blocking the workers' event loop"""
+    if live_updates.subscribed_users():
+        asyncio.get_running_loop().run_in_executor(None, _publish_analyzed, meals)
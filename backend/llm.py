@@ -0,0 +1,443 @@
+"""
+Language model access behind a small provider interface.
+
+LLM_PROVIDER picks the backend: "gemini" (default), "openai", or
+"disabled", which never calls out: every call raises LLMUnavailable, so
+meals go to the food table estimator, advice and reports answer with
+their error text, and the breaker is left alone. Whatever the provider, calls go through the same guards:
+
+- at most LLM_MAX_CONCURRENCY calls in flight;
+- a deadline per call that covers queueing, retries and the call itself;
+  running out of time while queued for a slot raises LLMQueueTimeout,
+  which is local overload, so it is neither retried nor held against the
+  provider by the breaker;
+- up to LLM_MAX_RETRIES retries of transient errors (timeouts, 429, 5xx,
+  connection errors) with full-jitter exponential backoff;
+- a circuit breaker: after LLM_BREAKER_FAILURE_THRESHOLD failed calls in
+  a row, calls fail fast with CircuitOpenError for
+  LLM_BREAKER_RESET_SECONDS, then a single trial call decides whether to
+  close it again. Callers treat that error like any other model failure,
+  so meal logging goes straight to the local estimator instead of
+  waiting out timeouts.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from dotenv import load_dotenv
+
+from .metrics import LLM_CALLS, LLM_DURATION, LLM_IN_FLIGHT, LLM_RETRIES, REGISTRY, CallbackMetric
+
+load_dotenv()
+
+# Configuration
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-flash")
+OPENAI_MODEL_NAME = os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # For OpenAI-compatible servers
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_REPORT_TIMEOUT_SECONDS = float(os.getenv("LLM_REPORT_TIMEOUT_SECONDS", "60"))
+LLM_BATCH_TIMEOUT_SECONDS = float(os.getenv("LLM_BATCH_TIMEOUT_SECONDS", "45"))
+LLM_BATCH_CHUNK_SIZE = int(os.getenv("LLM_BATCH_CHUNK_SIZE", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "0.25"))
+LLM_RETRY_MAX_DELAY_SECONDS = float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", "2"))
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# HTTP statuses worth retrying
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Optional base URL of a Gemini-compatible REST API (a proxy, or the benchmark's stand-in server)
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+class LLMUnavailable(Exception):
+    """No model answer can be had right now; callers should use their local fallback"""
+
+class CircuitOpenError(LLMUnavailable):
+    """The circuit breaker is open after repeated model failures"""
+
+class LLMQueueTimeout(LLMUnavailable):
+    """Every model call slot stayed busy until the call's deadline"""
+
+class _RestChunk:
+    """The part of a Gemini SDK response the app reads"""
+    def __init__(self, payload: Dict[str, Any]):
+        self._payload = payload
+
+    @property
+    def text(self) -> str:
+        try:
+            parts = self._payload["candidates"][0]["content"]["parts"]
+        except (KeyError, IndexError):
+            raise ValueError("Response has no text parts")
+        return "".join(part.get("text", "") for part in parts)
+
+class GeminiRestModel:
+    """Minimal Gemini client over the public REST API, used when GEMINI_API_ENDPOINT is set.
+
+    The SDK's own REST transport has no working async support, so this
+    speaks generateContent / streamGenerateContent directly with httpx and
+    mirrors the GenerativeModel method the app calls.
+    """
+    def __init__(self, endpoint: str, model_name: str, api_key: Optional[str]):
+        self.base_url = f"{endpoint.rstrip('/')}/v1beta/models/{model_name}"
+        self.headers = {"x-goog-api-key": api_key or ""}
+        self._client = None
+
+    def _async_client(self):
+        import httpx
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers, timeout=None,
+                limits=httpx.Limits(max_connections=LLM_MAX_CONCURRENCY)
+            )
+        return self._client
+
+    @staticmethod
+    def _body(prompt: str) -> Dict[str, Any]:
+        return {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+
+    async def _stream(self, prompt: str) -> AsyncIterator[_RestChunk]:
+        request = self._async_client().stream(
+            "POST", f"{self.base_url}:streamGenerateContent", params={"alt": "sse"}, json=self._body(prompt)
+        )
+        async with request as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    yield _RestChunk(json.loads(line[5:]))
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        if stream:
+            return self._stream(prompt)
+        response = await self._async_client().post(f"{self.base_url}:generateContent", json=self._body(prompt))
+        response.raise_for_status()
+        return _RestChunk(response.json())
+
+class LLMProvider:
+    """What the guarded calls below need from a model backend"""
+    name = "base"
+
+    async def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Async iterator of non-empty text chunks"""
+        raise NotImplementedError
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, model):
+        self.model = model
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text.strip()
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. the final metadata chunk)
+                continue
+            if text:
+                yield text
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def __init__(self, model_name: str, api_key: Optional[str], base_url: Optional[str] = None):
+        import openai
+        
+        # Retries are handled here, not by the SDK
+        self.client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.model_name = model_name
+
+    def _messages(self, prompt: str):
+        return [{"role": "user", "content": prompt}]
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(model=self.model_name, messages=self._messages(prompt))
+        return (response.choices[0].message.content or "").strip()
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.client.chat.completions.create(
+            model=self.model_name, messages=self._messages(prompt), stream=True
+        )
+        async for chunk in response:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                yield text
+
+class DisabledProvider(LLMProvider):
+    """No model at all: every call raises LLMUnavailable, so callers take their local fallback"""
+    name = "disabled"
+
+    def _unavailable(self):
+        return LLMUnavailable("Model calls are disabled (LLM_PROVIDER=disabled)")
+
+    async def generate(self, prompt: str) -> str:
+        raise self._unavailable()
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        raise self._unavailable()
+        yield  # Makes this an async generator
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker shared by every model call"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go out now"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                raise CircuitOpenError(f"Model calls paused after {self._failures} consecutive failures")
+            # Half-open: let this call through as the trial and keep the rest waiting another period
+            self._opened_at = time.monotonic()
+            self._trial = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                print("✅ Model calls succeeding again; circuit breaker closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial:
+                    print(f"⚠️  {self._failures} consecutive model failures; pausing model calls for {self.reset_seconds:.0f}s")
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._opened_at is None:
+                state = "closed"
+            elif self._trial:
+                state = "half_open"
+            else:
+                state = "open"
+            retry_in = max(self.reset_seconds - (time.monotonic() - self._opened_at), 0) if state == "open" else 0
+            return {"state": state, "consecutive_failures": self._failures, "retry_in_seconds": round(retry_in, 1)}
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status carried by an SDK exception (google.api_core, openai, httpx), if any"""
+    for attribute in ("status_code", "code"):
+        value = getattr(exc, attribute, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether a failed call might succeed if simply tried again"""
+    if isinstance(exc, LLMUnavailable):
+        return False
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    # Transport-level failures from httpx/openai (connect errors, resets) carry no status
+    return type(exc).__name__.endswith(("ConnectError", "ConnectionError", "TransportError", "ReadError", "TimeoutError"))
+
+def retry_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given retry number (0-based)"""
+    return random.uniform(0, min(LLM_RETRY_MAX_DELAY_SECONDS, LLM_RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+
+def create_provider(name: str) -> LLMProvider:
+    if name == "gemini":
+        return GeminiProvider(model)
+    if name == "openai":
+        return OpenAIProvider(OPENAI_MODEL_NAME, os.getenv("OPENAI_API_KEY"), OPENAI_BASE_URL)
+    if name == "disabled":
+        return DisabledProvider()
+    raise ValueError(f"Unknown LLM_PROVIDER '{name}'. Choose one of: gemini, openai, disabled")
+
+# Configure the model backend
+model = None  # The Gemini model object, when Gemini is the provider
+if LLM_PROVIDER == "gemini":
+    if GEMINI_API_ENDPOINT:
+        model = GeminiRestModel(GEMINI_API_ENDPOINT, GEMINI_MODEL_NAME, os.getenv("GEMINI_API_KEY"))
+    else:
+        import google.generativeai as genai
+        
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+provider = create_provider(LLM_PROVIDER)
+breaker = CircuitBreaker(LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_RESET_SECONDS)
+
+# Created lazily so it binds to the running event loop
+_semaphore: Optional[asyncio.Semaphore] = None
+
+REGISTRY.register(CallbackMetric(
+    "llm_circuit_breaker_open", "1 while model calls are paused by the circuit breaker.", (),
+    lambda: [((), 0 if breaker.status()["state"] == "closed" else 1)]
+))
+
+def _outcome(exc: Optional[BaseException]) -> str:
+    if exc is None:
+        return "ok"
+    if isinstance(exc, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(exc, LLMQueueTimeout):
+        return "queue_timeout"
+    if isinstance(exc, LLMUnavailable):
+        return "unavailable"
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+        return "timeout"
+    if isinstance(exc, Exception):
+        return "error"
+    return "cancelled"
+
+@contextmanager
+def _track_call(operation: str):
+    """Record duration, outcome and concurrency of one guarded model call"""
+    start = time.perf_counter()
+    LLM_IN_FLIGHT.inc()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        LLM_IN_FLIGHT.dec()
+        LLM_CALLS.inc(operation, _outcome(error))
+        LLM_DURATION.observe(time.perf_counter() - start, operation)
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Get the semaphore that caps concurrent model calls"""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+async def _backoff_or_raise(exc: Exception, attempt: int, deadline: float, operation: str) -> None:
+    """Sleep before the next attempt, or record the failure and re-raise when retrying is pointless"""
+    loop = asyncio.get_running_loop()
+    if not isinstance(exc, LLMUnavailable):
+        delay = retry_delay(attempt)
+        if attempt < LLM_MAX_RETRIES and is_retryable(exc) and loop.time() + delay < deadline:
+            LLM_RETRIES.inc(operation)
+            await asyncio.sleep(delay)
+            return
+        breaker.record_failure()
+    raise exc
+
+async def _acquire_slot(deadline: float) -> asyncio.Semaphore:
+    """Wait for one of the LLM_MAX_CONCURRENCY slots until the deadline; the caller releases it"""
+    semaphore = _get_semaphore()
+    try:
+        await asyncio.wait_for(semaphore.acquire(), max(deadline - asyncio.get_running_loop().time(), 0))
+    except asyncio.TimeoutError:
+        raise LLMQueueTimeout("No model call slot became free before the deadline") from None
+    return semaphore
+
+async def generate_text_async(prompt: str, timeout: Optional[float] = None, operation: str = "generate") -> str:
+    """Generate text from the model without blocking the event loop.
+
+    The timeout is the deadline for the whole call: waiting for a free slot,
+    every attempt and the backoff between them. The slot is held until the
+    call ends. Raises LLMQueueTimeout when the deadline passes while queued,
+    asyncio.TimeoutError when it passes during an attempt, CircuitOpenError
+    while the breaker is open, or the last error once retries are exhausted.
+    The operation names the call in metrics.
+    """
+    with _track_call(operation):
+        breaker.before_call()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or LLM_TIMEOUT_SECONDS)
+        semaphore = await _acquire_slot(deadline)
+        try:
+            attempt = 0
+            while True:
+                try:
+                    text = await asyncio.wait_for(provider.generate(prompt), max(deadline - loop.time(), 0))
+                except Exception as e:
+                    await _backoff_or_raise(e, attempt, deadline, operation)
+                    attempt += 1
+                    continue
+                breaker.record_success()
+                return text
+        finally:
+            semaphore.release()
+
+async def stream_text_async(prompt: str, timeout: Optional[float] = None, operation: str = "stream") -> AsyncIterator[str]:
+    """Stream generated text from the model chunk by chunk.
+
+    Holds one of the LLM_MAX_CONCURRENCY slots until the stream ends or is
+    closed. The timeout bounds the wait for a slot plus the first chunk, and
+    then each gap between chunks, so long answers are not cut off as long as
+    the model keeps producing. Failures before the first chunk are retried
+    like generate_text_async; once text has been sent, an error ends the
+    stream. Closing the generator early (e.g. when the client disconnects)
+    stops reading from the model.
+    """
+    with _track_call(operation):
+        breaker.before_call()
+        timeout = timeout or LLM_TIMEOUT_SECONDS
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        semaphore = await _acquire_slot(deadline)
+        chunks = None
+        try:
+            attempt = 0
+            while True:
+                chunks = provider.stream(prompt).__aiter__()
+                try:
+                    first = await asyncio.wait_for(chunks.__anext__(), max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    first = None
+                except Exception as e:
+                    await chunks.aclose()
+                    await _backoff_or_raise(e, attempt, deadline, operation)
+                    attempt += 1
+                    continue
+                break
+            breaker.record_success()
+            if first is None:
+                return
+            yield first
+        
+            while True:
+                deadline = loop.time() + timeout
+                try:
+                    text = await asyncio.wait_for(chunks.__anext__(), max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    break
+                except Exception:
+                    breaker.record_failure()
+                    raise
+                yield text
+        finally:
+            if chunks is not None:
+                await chunks.aclose()
+            semaphore.release()
+
+def llm_status() -> Dict[str, Any]:
+    """Active provider and circuit breaker state, for monitoring"""
+    return {"provider": provider.name, "breaker": breaker.status()}
@@ -1,35 +1,100 @@
-from fastapi import FastAPI, Depends, HTTPException, status, APIRouter
+from fastapi import FastAPI, Depends, HTTPException, status, APIRouter, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
 import uvicorn
+import asyncio
 from dotenv import load_dotenv
 import os
+import secrets
+from datetime import datetime
+from typing import List, Optional, Tuple
 
-from .database import get_db, engine, Base
-from .models import User, UserProfile, DailyLog, MealEntry
+from .database import DB_ASYNC, SQL_PROFILE, QueryProfilerMiddleware, SessionLocal, async_engine, get_db, get_pool_stats, engine
+from .migrations import pending_migrations
+from .models import MEAL_PENDING, User, UserProfile, DailyLog, MealEntry
 from .schemas import (
     UserCreate, UserLogin, UserResponse, ProfileCreate, ProfileResponse,
-    MealLogCreate, MealLogResponse, DailyLogResponse, AIQuestion, AIResponse
+    MealLogCreate, MealLogResponse, DailyLogResponse, AIQuestion, AIResponse,
+    MealBatchCreate, MealBatchItemResult, MealBatchResponse, MealHistoryPage, FoodTermResponse,
+    TokenRefresh, TokenResponse, StreamTicketResponse
 )
-from .auth import create_access_token, verify_token, get_password_hash, verify_password
+from .auth import (
+    create_access_token, get_password_hash_async, verify_and_update_password_async,
+    PasswordHasherBusy, shutdown_password_hasher
+)
+from .refresh_tokens import (
+    InvalidRefreshToken, issue_refresh_token, revoke_refresh_token, rotate_refresh_token
+)
+from .aggregates import day_meals_statement, get_daily_totals
+from .authentication import authenticate, load_user
+from .analytics import dashboard_range_fields, get_range_analytics, resolve_range
+from .cache import AuthenticatedUser, advice_cache, auth_cache, meal_cache
+from .food_terms import top_food_terms
+from .live_updates import (
+    LIVE_UPDATES_ENABLED, LIVE_UPDATES_HEARTBEAT_SECONDS, LIVE_UPDATES_TICKET_TTL_SECONDS, TooManyStreams,
+    issue_stream_ticket, live_updates, publish_analyzed_meals, publish_meal_changes, publish_meal_deleted,
+    redeem_stream_ticket
+)
+from .llm import llm_status
+from .metrics import (
+    CONTENT_TYPE, METRICS_ENABLED, METRICS_TOKEN, REGISTRY, CallbackMetric, MetricsMiddleware,
+    instrument_engine, register_pool_metrics, render_metrics
+)
+from .meal_analysis import (
+    MEAL_ANALYSIS_ASYNC, MEAL_ANALYSIS_EVENTS_TIMEOUT_SECONDS, MEAL_ANALYSIS_POLL_SECONDS, MEAL_ANALYSIS_WORKERS,
+    analysis_workers, get_user_meals, queue_stats
+)
+from .meal_history import build_history_page, meal_history_statement, parse_history_params
+from .reports import REPORT_RANGE_OPTIONS, load_report_data, render_report_html
+from .streaming import SSE_HEADERS, encode_stream, negotiate_encoding, sse_event
 from .services import (
-    calculate_bmr, calculate_tdee, get_daily_summary,
-    analyze_meal_with_ai, get_ai_nutrition_advice,
-    generate_meal_analysis_report, generate_comprehensive_report_html
+    save_profile, build_dashboard, parse_log_date, get_daily_summary, save_meal_entry, save_meal_entries, delete_meal_entry,
+    get_meal_nutrition_async, get_meals_nutrition_async, lookup_known_nutrition_async, get_ai_nutrition_advice_async,
+    generate_meal_analysis_report_async, stream_ai_nutrition_advice, stream_meal_analysis_report
 )
 
 # Load environment variables
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+MEAL_BATCH_MAX_ITEMS = int(os.getenv("MEAL_BATCH_MAX_ITEMS", "200"))
+FREQUENT_FOODS_MAX_LIMIT = 50
 
 # --- Main App and Router Setup ---
 app = FastAPI(title="Calorie & Diet Tracker API", version="1.0.0")
 api_router = APIRouter(prefix="/api")
 
+@app.on_event("startup")
+def check_migrations():
+    """Warn when the schema is behind; migrations run as a deploy step, not here"""
+    pending = pending_migrations(engine)
+    if pending:
+        print(f"⚠️  {len(pending)} pending database migration(s): {', '.join(str(m) for m in pending)}")
+        print("   Run: python -m backend.migrations upgrade")
+
+@app.on_event("shutdown")
+def stop_password_hasher():
+    """Stop the password hashing processes with the server"""
+    shutdown_password_hasher()
+
+if MEAL_ANALYSIS_ASYNC and MEAL_ANALYSIS_WORKERS > 0:
+    @app.on_event("startup")
+    async def start_meal_analysis_workers():
+        """Start draining pending meal analyses, including ones left from before a restart"""
+        analysis_workers.start()
+    
+    @app.on_event("shutdown")
+    async def stop_meal_analysis_workers():
+        """Stop the workers; meals they were analyzing are picked up again after their lease"""
+        await analysis_workers.stop()
+    
+    if LIVE_UPDATES_ENABLED:
+        analysis_workers.add_listener(publish_analyzed_meals)
+
 # --- CORS Middleware ---
 app.add_middleware(
     CORSMiddleware,
@@ -39,83 +104,215 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Metrics ---
+def _cache_stats() -> dict:
+    auth = auth_cache.stats()
+    return {
+        "meal_analysis": meal_cache.stats(), "advice": advice_cache.stats(),
+        "auth_tokens": auth["tokens"], "auth_users": auth["users"],
+    }
+
+def _cache_samples(field: str):
+    return [((name,), stats[field]) for name, stats in _cache_stats().items()]
+
+if METRICS_ENABLED:
+    if not METRICS_TOKEN:
+        print("⚠️ METRICS_ENABLED without METRICS_TOKEN: anyone who can reach /metrics can read it")
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine, "sync")
+    metered_engines = {"sync": engine}
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine, "async")
+        metered_engines["async"] = async_engine
+    register_pool_metrics(metered_engines)
+    REGISTRY.register(CallbackMetric(
+        "cache_hits_total", "Cache lookups that found an entry.", ("cache",), lambda: _cache_samples("hits"), "counter"
+    ))
+    REGISTRY.register(CallbackMetric(
+        "cache_misses_total", "Cache lookups that found nothing.", ("cache",), lambda: _cache_samples("misses"), "counter"
+    ))
+    REGISTRY.register(CallbackMetric(
+        "cache_hit_ratio", "Hits over lookups since the process started.", ("cache",), lambda: _cache_samples("hit_ratio")
+    ))
+    if MEAL_ANALYSIS_ASYNC:
+        REGISTRY.register(CallbackMetric(
+            "meal_analysis_jobs", "Queued meal analyses: pending, claimed by a worker, waiting to retry.", ("state",),
+            lambda: [((state,), count) for state, count in queue_stats().items()]
+        ))
+    if LIVE_UPDATES_ENABLED:
+        REGISTRY.register(CallbackMetric(
+            "live_update_streams", "Open live dashboard update streams.", (), lambda: [((), live_updates.stream_count())]
+        ))
+
+# Debug mode: per-request SQL counts and N+1 warnings in headers and the log
+if SQL_PROFILE:
+    app.add_middleware(QueryProfilerMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics(request: Request):
+    """Metrics in the Prometheus text format"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
 # --- Security and User Handling ---
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    """Get current authenticated user"""
-    token = credentials.credentials
-    payload = verify_token(token)
-    if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    user = db.query(User).filter(User.id == payload.get("sub")).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    return user
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> AuthenticatedUser:
+    """Get current authenticated user.
+
+    Verified tokens and resolved users are cached briefly, so most requests
+    authenticate without decoding the JWT again or querying the database.
+    """
+    return authenticate(db, credentials.credentials)[0]
+
+def _get_user_profile(db: Session, user_id: int):
+    """Fetch a user's profile (used from async endpoints via the threadpool)"""
+    return db.query(UserProfile).filter(UserProfile.user_id == user_id).first()
 
 # --- API Endpoints using the Router ---
 
+def _get_user_by_email(db: Session, email: str):
+    """Fetch a user by email (used from async endpoints via the threadpool)"""
+    return db.query(User).filter(User.email == email).first()
+
+def _create_user(db: Session, email: str, hashed_password: str, full_name: str) -> Tuple[User, str, str]:
+    """Insert a new user along with their first refresh token; returns the user, the token and its session id"""
+    db_user = User(
+        email=email,
+        hashed_password=hashed_password,
+        full_name=full_name
+    )
+    db.add(db_user)
+    db.flush()
+    refresh_token, session_id = issue_refresh_token(db, db_user.id)
+    db.commit()
+    db.refresh(db_user)
+    return db_user, refresh_token, session_id
+
+def _start_session(db: Session, user: User, upgraded_hash: Optional[str] = None) -> Tuple[str, str]:
+    """Issue a refresh token after a password login, storing an upgraded hash if there is one.
+
+    Returns the refresh token and its session id.
+    """
+    if upgraded_hash:
+        # The stored hash predates the current bcrypt settings
+        user.hashed_password = upgraded_hash
+    refresh_token, session_id = issue_refresh_token(db, user.id)
+    db.commit()
+    if upgraded_hash:
+        auth_cache.invalidate_user(user.id)
+    return refresh_token, session_id
+
+# Password hashing runs in a separate process pool; when its queue is full, ask clients to back off
+PASSWORD_HASHER_BUSY = HTTPException(
+    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+    detail="Too many authentication requests. Please try again shortly.",
+    headers={"Retry-After": "1"},
+)
+
 # Authentication endpoints
 @api_router.post("/auth/register", response_model=UserResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await run_in_threadpool(_get_user_by_email, db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    hashed_password = get_password_hash(user_data.password)
-    db_user = User(
-        email=user_data.email,
-        hashed_password=hashed_password,
-        full_name=user_data.full_name
+    try:
+        hashed_password = await get_password_hash_async(user_data.password)
+    except PasswordHasherBusy:
+        raise PASSWORD_HASHER_BUSY
+    db_user, refresh_token, session_id = await run_in_threadpool(
+        _create_user, db, user_data.email, hashed_password, user_data.full_name
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
     
-    access_token = create_access_token(data={"sub": str(db_user.id)})
+    auth_cache.set_user(db_user)
+    access_token = create_access_token(data={"sub": str(db_user.id), "sid": session_id})
     
     return UserResponse(
         id=db_user.id,
         email=db_user.email,
         full_name=db_user.full_name,
-        access_token=access_token
+        access_token=access_token,
+        refresh_token=refresh_token
     )
 
 @api_router.post("/auth/login", response_model=UserResponse)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: Session = Depends(get_db)):
     """Login user"""
-    user = db.query(User).filter(User.email == user_data.email).first()
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    user = await run_in_threadpool(_get_user_by_email, db, user_data.email)
+    verified, new_hash = False, None
+    if user:
+        try:
+            verified, new_hash = await verify_and_update_password_async(user_data.password, user.hashed_password)
+        except PasswordHasherBusy:
+            raise PASSWORD_HASHER_BUSY
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(data={"sub": str(user.id)})
+    refresh_token, session_id = await run_in_threadpool(_start_session, db, user, new_hash)
+    
+    # Refresh the cached snapshot from the row just read
+    auth_cache.set_user(user)
+    access_token = create_access_token(data={"sub": str(user.id), "sid": session_id})
     
     return UserResponse(
         id=user.id,
         email=user.email,
         full_name=user.full_name,
-        access_token=access_token
+        access_token=access_token,
+        refresh_token=refresh_token
     )
 
+@api_router.post("/auth/refresh", response_model=TokenResponse)
+def refresh_access_token(token_data: TokenRefresh, db: Session = Depends(get_db)):
+    """Exchange a refresh token for a new access token and a new refresh token"""
+    try:
+        user, refresh_token, session_id = rotate_refresh_token(db, token_data.refresh_token)
+    except InvalidRefreshToken as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    auth_cache.set_user(user)
+    access_token = create_access_token(data={"sub": str(user.id), "sid": session_id})
+    return TokenResponse(access_token=access_token, refresh_token=refresh_token)
+
+@api_router.post("/auth/logout")
+def logout(
+    token_data: TokenRefresh,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+):
+    """Revoke a refresh token and every token rotated from the same login.
+
+    The login's access tokens stop working as well: at once for the one sent
+    in the Authorization header, and within AUTH_CACHE_TTL_SECONDS for
+    copies another worker has cached.
+    """
+    revoke_refresh_token(db, token_data.refresh_token)
+    if credentials is not None:
+        auth_cache.invalidate_token(credentials.credentials)
+    return {"message": "Logged out successfully"}
+
 # Profile endpoints
 @api_router.get("/profile", response_model=ProfileResponse)
-def get_profile(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_profile(current_user: AuthenticatedUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get user profile"""
     profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
     if not profile:
@@ -128,125 +325,197 @@ def get_profile(current_user: User = Depends(get_current_user), db: Session = De
 @api_router.put("/profile", response_model=ProfileResponse)
 def create_or_update_profile(
     profile_data: ProfileCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create or update user profile"""
-    bmr = calculate_bmr(profile_data.weight, profile_data.height, profile_data.age, profile_data.gender)
-    tdee = calculate_tdee(bmr, profile_data.activity_level)
-    
-    if profile_data.fitness_goal == "lose_weight":
-        daily_calorie_goal = tdee - 500
-    elif profile_data.fitness_goal == "gain_weight":
-        daily_calorie_goal = tdee + 500
-    else:
-        daily_calorie_goal = tdee
-    
-    daily_protein_goal = (daily_calorie_goal * 0.25) / 4
-    daily_carb_goal = (daily_calorie_goal * 0.45) / 4
-    daily_fat_goal = (daily_calorie_goal * 0.30) / 9
-    
-    existing_profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-    
-    if existing_profile:
-        for field, value in profile_data.dict().items():
-            setattr(existing_profile, field, value)
-        existing_profile.daily_calorie_goal = daily_calorie_goal
-        existing_profile.daily_protein_goal = daily_protein_goal
-        existing_profile.daily_carb_goal = daily_carb_goal
-        existing_profile.daily_fat_goal = daily_fat_goal
-        db.commit()
-        db.refresh(existing_profile)
-        return existing_profile
-    else:
-        new_profile = UserProfile(
-            user_id=current_user.id,
-            **profile_data.dict(),
-            daily_calorie_goal=daily_calorie_goal,
-            daily_protein_goal=daily_protein_goal,
-            daily_carb_goal=daily_carb_goal,
-            daily_fat_goal=daily_fat_goal
-        )
-        db.add(new_profile)
-        db.commit()
-        db.refresh(new_profile)
-        return new_profile
+    return save_profile(db, current_user.id, profile_data.model_dump())
 
 # Meal logging endpoints
 @api_router.post("/logs/meals", response_model=MealLogResponse)
-def log_meal(
+async def log_meal(
     meal_data: MealLogCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Log a new meal for a specific date"""
-    from datetime import date, datetime
+    try:
+        target_date = parse_log_date(meal_data.date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    if MEAL_ANALYSIS_ASYNC:
+        # Meals that need the model are stored pending and analyzed in the background
+        nutritional_data = await lookup_known_nutrition_async(meal_data.description)
+    else:
+        # The model call is awaited so a slow answer does not hold a worker thread
+        nutritional_data = await get_meal_nutrition_async(meal_data.description)
     
-    target_date = getattr(meal_data, 'date', date.today())
-    if isinstance(target_date, str):
+    meal = await run_in_threadpool(
+        save_meal_entry, db, current_user.id, target_date, meal_data.description, nutritional_data
+    )
+    if nutritional_data is None:
+        analysis_workers.notify()
+    await run_in_threadpool(publish_meal_changes, db, "meal_added", [meal])
+    return meal
+
+@api_router.post("/logs/meals/batch", response_model=MealBatchResponse)
+async def log_meals_batch(
+    batch: MealBatchCreate,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Log many meals, possibly across several dates, in one request.
+
+    Meals unknown to the local food table and the cache are analyzed with a
+    single structured prompt per chunk, and all entries are stored in one
+    transaction. Items with an invalid date or empty description are
+    reported as failed without affecting the rest of the batch.
+    """
+    if not batch.meals:
+        raise HTTPException(status_code=400, detail="No meals provided")
+    if len(batch.meals) > MEAL_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {MEAL_BATCH_MAX_ITEMS} meals")
+    
+    results = [None] * len(batch.meals)
+    valid = []
+    for index, item in enumerate(batch.meals):
+        description = item.description.strip()
+        if not description:
+            results[index] = MealBatchItemResult(index=index, success=False, error="Empty meal description")
+            continue
         try:
-            target_date = datetime.strptime(target_date, "%Y-%m-%d").date()
+            valid.append((index, parse_log_date(item.date), description))
         except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-
-    daily_log = db.query(DailyLog).filter(DailyLog.user_id == current_user.id, DailyLog.date == target_date).first()
+            results[index] = MealBatchItemResult(index=index, success=False, error="Invalid date format. Use YYYY-MM-DD")
     
-    if not daily_log:
-        daily_log = DailyLog(user_id=current_user.id, date=target_date)
-        db.add(daily_log)
-        db.commit()
-        db.refresh(daily_log)
+    if valid:
+        descriptions = [description for _, _, description in valid]
+        if MEAL_ANALYSIS_ASYNC:
+            nutrition = [await lookup_known_nutrition_async(description) for description in descriptions]
+        else:
+            nutrition = await get_meals_nutrition_async(descriptions)
+        meal_entries = await run_in_threadpool(
+            save_meal_entries, db, current_user.id,
+            [(target_date, description, data) for (_, target_date, description), data in zip(valid, nutrition)]
+        )
+        for (index, _, _), meal_entry in zip(valid, meal_entries):
+            results[index] = MealBatchItemResult(
+                index=index, success=True, meal=MealLogResponse.model_validate(meal_entry)
+            )
+        if any(data is None for data in nutrition):
+            analysis_workers.notify()
+        await run_in_threadpool(publish_meal_changes, db, "meal_added", meal_entries)
     
-    nutritional_data = analyze_meal_with_ai(meal_data.description)
+    return MealBatchResponse(created=len(valid), failed=len(batch.meals) - len(valid), results=results)
+
+@api_router.get("/logs/meals", response_model=MealHistoryPage)
+def get_meal_history(
+    cursor: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    q: Optional[str] = None,
+    limit: Optional[int] = None,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Page through meal history, newest first; pass next_cursor back to continue"""
+    try:
+        after, start, end, limit = parse_history_params(cursor, start_date, end_date, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    meal_entry = MealEntry(
-        log_id=daily_log.id,
-        name=meal_data.description,
-        calories=nutritional_data.get("calories", 0),
-        protein=nutritional_data.get("protein", 0),
-        carbohydrates=nutritional_data.get("carbohydrates", 0),
-        fats=nutritional_data.get("fats", 0)
-    )
+    rows = db.execute(meal_history_statement(current_user.id, limit, after, start, end, q)).all()
+    return build_history_page(rows, limit)
+
+def _parse_meal_ids(ids: str) -> List[int]:
+    try:
+        meal_ids = sorted({int(value) for value in ids.split(",") if value.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of meal ids")
+    if not meal_ids or len(meal_ids) > MEAL_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Pass between 1 and {MEAL_BATCH_MAX_ITEMS} meal ids")
+    return meal_ids
+
+@api_router.get("/logs/meals/analysis/events")
+async def meal_analysis_events(
+    ids: str,
+    request: Request,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """Stream each listed meal as Server-Sent Events once its analysis is complete.
+
+    Sends a `meal` event per completed meal (immediately for ones already
+    done), `deleted` for ids that no longer exist, then `done`; or `timeout`
+    with the ids still pending after MEAL_ANALYSIS_EVENTS_TIMEOUT_SECONDS.
+    """
+    remaining = set(_parse_meal_ids(ids))
     
-    db.add(meal_entry)
-    db.commit()
-    db.refresh(meal_entry)
-    return meal_entry
+    async def events():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + MEAL_ANALYSIS_EVENTS_TIMEOUT_SECONDS
+        while True:
+            meals = {meal.id: meal for meal in await run_in_threadpool(get_user_meals, current_user.id, list(remaining))}
+            for meal_id in sorted(remaining):
+                meal = meals.get(meal_id)
+                if meal is None:
+                    yield sse_event("deleted", {"id": meal_id})
+                elif meal.status == MEAL_PENDING:
+                    continue
+                else:
+                    yield sse_event("meal", MealLogResponse.model_validate(meal).model_dump(mode="json"))
+                remaining.discard(meal_id)
+            if not remaining:
+                yield sse_event("done", {})
+                return
+            if loop.time() >= deadline or await request.is_disconnected():
+                yield sse_event("timeout", {"pending": sorted(remaining)})
+                return
+            # Workers in this process wake us on completion; the timeout covers workers elsewhere
+            await analysis_workers.wait_for_completion(min(MEAL_ANALYSIS_POLL_SECONDS, deadline - loop.time()))
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@api_router.get("/logs/meals/{meal_id}", response_model=MealLogResponse)
+def get_meal(
+    meal_id: int,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get one meal entry, e.g. to poll a pending analysis"""
+    meal = db.query(MealEntry).join(DailyLog).filter(
+        MealEntry.id == meal_id,
+        DailyLog.user_id == current_user.id
+    ).first()
+    if not meal:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meal not found")
+    return meal
 
 @api_router.get("/logs/{date}", response_model=DailyLogResponse)
 def get_daily_log(
     date: str,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all meal entries and summary for a specific date"""
-    from datetime import datetime
     try:
         target_date = datetime.strptime(date, "%Y-%m-%d").date()
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    daily_log = db.query(DailyLog).filter(DailyLog.user_id == current_user.id, DailyLog.date == target_date).first()
-    
-    if not daily_log:
-        return DailyLogResponse(date=target_date, meals=[], total_calories=0, total_protein=0, total_carbohydrates=0, total_fats=0)
-    
-    meals = db.query(MealEntry).filter(MealEntry.log_id == daily_log.id).all()
-    
-    total_calories = sum(m.calories for m in meals)
-    total_protein = sum(m.protein for m in meals)
-    total_carbohydrates = sum(m.carbohydrates for m in meals)
-    total_fats = sum(m.fats for m in meals)
+    meals = db.scalars(day_meals_statement(current_user.id, target_date)).all()
+    summary = get_daily_summary(current_user.id, target_date, db)
     
     return DailyLogResponse(
-        date=target_date, meals=meals, total_calories=total_calories, total_protein=total_protein,
-        total_carbohydrates=total_carbohydrates, total_fats=total_fats
+        date=target_date, meals=meals, total_calories=summary["total_calories"],
+        total_protein=summary["total_protein"], total_carbohydrates=summary["total_carbohydrates"],
+        total_fats=summary["total_fats"]
     )
 
 @api_router.delete("/logs/meals/{meal_id}")
 def delete_meal(
     meal_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete a meal entry"""
@@ -258,98 +527,287 @@ def delete_meal(
     if not meal:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meal not found")
     
-    db.delete(meal)
-    db.commit()
+    log_id = meal.log_id
+    delete_meal_entry(db, meal, current_user.id)
+    publish_meal_deleted(db, current_user.id, meal_id, log_id)
     return {"message": "Meal deleted successfully"}
 
 # AI guidance endpoint
 @api_router.post("/ai/ask", response_model=AIResponse)
-def ask_nutritionist(
+async def ask_nutritionist(
     question_data: AIQuestion,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Send a question to the nutrition AI"""
     try:
-        profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-        response = get_ai_nutrition_advice(question_data.question, profile)
+        profile = await run_in_threadpool(_get_user_profile, db, current_user.id)
+        response = await get_ai_nutrition_advice_async(question_data.question, profile, question_data.use_cache)
         return AIResponse(response=response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting AI response: {str(e)}")
 
 # Meal analysis report endpoint
 @api_router.post("/ai/analyze-meals", response_model=AIResponse)
-def analyze_meals(
-    current_user: User = Depends(get_current_user),
+async def analyze_meals(
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Generate comprehensive meal analysis report"""
     try:
-        profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
+        profile = await run_in_threadpool(_get_user_profile, db, current_user.id)
         if not profile:
             raise HTTPException(status_code=404, detail="Profile not found. Please complete your profile setup.")
         
-        report = generate_meal_analysis_report(current_user.id, profile, db)
+        report = await generate_meal_analysis_report_async(current_user.id, profile, db)
         return AIResponse(response=report)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating analysis report: {str(e)}")
 
+def _sse_response(request: Request, chunks, error_message: str) -> StreamingResponse:
+    """Forward model output as Server-Sent Events, stopping when the client goes away"""
+    async def events():
+        try:
+            async for text in chunks:
+                if await request.is_disconnected():
+                    # Closing the generator below stops reading from the model
+                    break
+                yield sse_event("token", {"text": text})
+            else:
+                yield sse_event("done", {})
+        except Exception as e:
+            yield sse_event("error", {"detail": f"{error_message}: {str(e) or type(e).__name__}"})
+        finally:
+            await chunks.aclose()
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+# Streaming AI Nutritionist endpoint
+@api_router.post("/ai/ask/stream")
+async def ask_nutritionist_stream(
+    question_data: AIQuestion,
+    request: Request,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Stream the nutrition AI's answer as Server-Sent Events"""
+    profile = await run_in_threadpool(_get_user_profile, db, current_user.id)
+    chunks = stream_ai_nutrition_advice(question_data.question, profile, question_data.use_cache)
+    return _sse_response(request, chunks, "Error getting AI response")
+
+# Streaming meal analysis report endpoint
+@api_router.post("/ai/analyze-meals/stream")
+async def analyze_meals_stream(
+    request: Request,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Stream the meal analysis report as Server-Sent Events"""
+    profile = await run_in_threadpool(_get_user_profile, db, current_user.id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found. Please complete your profile setup.")
+    
+    chunks = stream_meal_analysis_report(current_user.id, profile, db)
+    return _sse_response(request, chunks, "Error generating analysis report")
+
 # Download comprehensive report endpoint
 @api_router.get("/reports/download")
 def download_comprehensive_report(
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    days: int = 30,
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Download comprehensive nutrition report as HTML"""
-    from fastapi.responses import HTMLResponse
+    if days not in REPORT_RANGE_OPTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid report range. Choose one of: {', '.join(str(option) for option in REPORT_RANGE_OPTIONS)} days"
+        )
     try:
         profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
         if not profile:
             raise HTTPException(status_code=404, detail="Profile not found. Please complete your profile setup.")
         
-        report_html = generate_comprehensive_report_html(current_user.id, profile, db)
-        return HTMLResponse(content=report_html, media_type="text/html")
+        # All database work happens here; only template rendering is streamed
+        data = load_report_data(current_user.id, db, days=days)
+        chunks = render_report_html(profile, current_user.full_name, data)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating report: {str(e)}")
+    
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {
+        "Content-Disposition": f'attachment; filename="nutrition-report-{data.end_date.isoformat()}-{days}d.html"',
+        "Vary": "Accept-Encoding"
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(encode_stream(chunks, encoding), media_type="text/html; charset=utf-8", headers=headers)
+
+# Frequent foods endpoint
+@api_router.get("/foods/frequent", response_model=List[FoodTermResponse])
+def get_frequent_foods(
+    limit: int = 10,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the user's most frequently logged foods"""
+    if not 1 <= limit <= FREQUENT_FOODS_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {FREQUENT_FOODS_MAX_LIMIT}")
+    return top_food_terms(db, current_user.id, limit)
+
+# Cache statistics endpoint
+@api_router.get("/cache/stats")
+def get_cache_stats(current_user: AuthenticatedUser = Depends(get_current_user)):
+    """Get hit/miss counters for the server-side caches"""
+    return {"meal_analysis": meal_cache.stats(), "advice": advice_cache.stats(), "auth": auth_cache.stats()}
+
+# Database pool statistics endpoint
+@api_router.get("/db/pool")
+def get_db_pool_stats(current_user: AuthenticatedUser = Depends(get_current_user)):
+    """Get connection pool usage for monitoring"""
+    return get_pool_stats()
+
+@api_router.get("/llm/status")
+def get_llm_status(current_user: AuthenticatedUser = Depends(get_current_user)):
+    """Get the model provider and circuit breaker state for monitoring"""
+    return llm_status()
+
+# Live updates endpoints
+@api_router.post("/live/ticket", response_model=StreamTicketResponse)
+def create_live_ticket(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+    """Issue a short-lived, single-use ticket for opening GET /api/live/events.
+
+    EventSource cannot send an Authorization header, and an access token in
+    the URL would be written to access logs; a ticket is worthless once used.
+    """
+    if not LIVE_UPDATES_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    current_user, payload = authenticate(db, credentials.credentials)
+    session_expires_at = datetime.utcfromtimestamp(payload["exp"]) if "exp" in payload else None
+    ticket = issue_stream_ticket(db, current_user.id, session_expires_at)
+    db.commit()
+    return StreamTicketResponse(ticket=ticket, expires_in=int(LIVE_UPDATES_TICKET_TTL_SECONDS))
+
+def _authenticate_stream(ticket: str) -> Tuple[AuthenticatedUser, Optional[datetime]]:
+    # A long-lived stream must not hold a pooled session, so this one is closed right away
+    db = SessionLocal()
+    try:
+        claimed = redeem_stream_ticket(db, ticket)
+        if claimed is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired stream ticket")
+        user_id, session_expires_at = claimed
+        return load_user(db, user_id), session_expires_at
+    finally:
+        db.close()
+
+@api_router.get("/live/events")
+async def live_events(ticket: str):
+    """Stream the user's meal and daily total changes as Server-Sent Events.
+
+    Open it with a ticket from POST /api/live/ticket. Sends `ready` on
+    connect, then `meal_added`, `meal_updated` and `meal_deleted` deltas;
+    `resync` when the client fell behind, and `expired` when the access
+    token the ticket was issued for runs out.
+    """
+    if not LIVE_UPDATES_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    current_user, session_expires_at = await run_in_threadpool(_authenticate_stream, ticket)
+    try:
+        subscription = live_updates.subscribe(current_user.id)
+    except TooManyStreams:
+        raise HTTPException(status_code=429, detail="Too many live update streams open")
+    
+    async def events():
+        loop = asyncio.get_running_loop()
+        expires_at = (
+            loop.time() + (session_expires_at - datetime.utcnow()).total_seconds()
+            if session_expires_at is not None else float("inf")
+        )
+        yield sse_event("ready", {})
+        while True:
+            remaining = expires_at - loop.time()
+            if remaining <= 0:
+                yield sse_event("expired", {})
+                return
+            try:
+                event, data = await asyncio.wait_for(
+                    subscription.queue.get(), min(LIVE_UPDATES_HEARTBEAT_SECONDS, remaining)
+                )
+            except asyncio.TimeoutError:
+                # Comments keep idle connections open through proxies
+                yield ": keepalive\n\n"
+                continue
+            yield sse_event(event, data)
+    
+    # Starlette ends the stream when the client disconnects; the background task still runs
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers=SSE_HEADERS,
+        background=BackgroundTask(live_updates.unsubscribe, subscription)
+    )
 
 # Dashboard endpoint
 @api_router.get("/dashboard")
-def get_dashboard_data(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get dashboard data including goals and current day summary"""
+def get_dashboard_data(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    bucket: Optional[str] = None,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get dashboard data including goals, current day summary and optional range charts"""
     profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found. Please complete your profile setup.")
     
     from datetime import date, timedelta
     today = date.today()
-    today_summary = get_daily_summary(current_user.id, today, db)
     
-    week_ago = today - timedelta(days=6)
-    weekly_data = []
-    for i in range(7):
-        check_date = week_ago + timedelta(days=i)
-        daily_summary = get_daily_summary(current_user.id, check_date, db)
-        weekly_data.append({
-            "date": check_date.isoformat(),
-            "calories": daily_summary["total_calories"],
-            "protein": daily_summary["total_protein"],
-            "carbs": daily_summary["total_carbohydrates"],
-            "fats": daily_summary["total_fats"]
-        })
+    # One aggregate query covers the whole week, today included
+    week = get_daily_totals(current_user.id, today - timedelta(days=6), today, db)
+    dashboard = build_dashboard(profile, week)
+    if start_date or end_date:
+        try:
+            start, end, bucket = resolve_range(start_date, end_date, bucket)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        dashboard.update(dashboard_range_fields(get_range_analytics(current_user.id, profile, start, end, db, bucket)))
+    return dashboard
+
+# Range analytics endpoint
+@api_router.get("/analytics")
+def get_analytics(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    bucket: Optional[str] = None,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Daily totals, rolling averages and goal adherence for a date range (last 30 days by default)"""
+    try:
+        start, end, bucket = resolve_range(start_date, end_date, bucket)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {
-        "goals": {
-            "calories": profile.daily_calorie_goal,
-            "protein": profile.daily_protein_goal,
-            "carbs": profile.daily_carb_goal,
-            "fats": profile.daily_fat_goal
-        },
-        "today": today_summary,
-        "weekly_trends": weekly_data
-    }
+    profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found. Please complete your profile setup.")
+    return get_range_analytics(current_user.id, profile, start, end, db, bucket)
 
 # --- Final App Setup ---
 
+# With DB_ASYNC the async routes are registered first, so they shadow their sync versions
+if DB_ASYNC:
+    from .async_api import async_router
+    app.include_router(async_router)
+    
+    @app.on_event("shutdown")
+    async def close_async_engine():
+        """Close pooled async connections (aiosqlite keeps a thread per connection)"""
+        await async_engine.dispose()
+
 # Include the API router in the main app
 app.include_router(api_router)
 
@@ -0,0 +1,277 @@
+"""
+Asynchronous meal analysis (MEAL_ANALYSIS_ASYNC).
+
+With the mode on, logging a meal the local food table and the meal cache
+cannot answer stores it right away with status "pending", zeroed
+nutrients and a row in the meal_analysis_jobs table, in the same
+transaction. A pool of worker tasks claims pending jobs in batches of up
+to MEAL_ANALYSIS_BATCH_SIZE and resolves them with one model prompt per
+batch. They then fill in the nutrients, move the difference into the
+day's rollup and delete the jobs.
+
+- Claims are leases: a job whose worker died is taken over after
+  MEAL_ANALYSIS_LEASE_SECONDS. Because the queue lives in the database,
+  pending meals survive restarts.
+- Meals the model did not answer are retried with exponential backoff.
+  After MEAL_ANALYSIS_MAX_ATTEMPTS they get the local estimate, like the
+  synchronous path.
+- Workers run inside the API process (MEAL_ANALYSIS_WORKERS, started on
+  startup) or separately with `python -m backend.meal_analysis run`.
+  `python -m backend.meal_analysis status` shows the queue.
+"""
+import asyncio
+import os
+import random
+import socket
+import sys
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, func, or_, select, update
+
+from .database import SessionLocal
+from .llm import LLM_BATCH_CHUNK_SIZE
+from .models import MEAL_COMPLETE, MEAL_PENDING, DailyLog, MealAnalysisJob, MealEntry
+from .rollups import NUTRIENT_FIELDS, apply_meal_deltas
+from .services import estimate_nutrition_locally, resolve_meals_nutrition_async
+
+load_dotenv()
+
+# Configuration
+MEAL_ANALYSIS_ASYNC = os.getenv("MEAL_ANALYSIS_ASYNC", "false").lower() in ("1", "true", "yes")
+MEAL_ANALYSIS_WORKERS = int(os.getenv("MEAL_ANALYSIS_WORKERS", "2"))  # Per API process; 0 leaves it to `run`
+MEAL_ANALYSIS_BATCH_SIZE = int(os.getenv("MEAL_ANALYSIS_BATCH_SIZE", str(LLM_BATCH_CHUNK_SIZE)))
+MEAL_ANALYSIS_BATCH_WAIT_MS = float(os.getenv("MEAL_ANALYSIS_BATCH_WAIT_MS", "50"))  # Linger to fill a batch
+MEAL_ANALYSIS_POLL_SECONDS = float(os.getenv("MEAL_ANALYSIS_POLL_SECONDS", "2"))
+MEAL_ANALYSIS_MAX_ATTEMPTS = int(os.getenv("MEAL_ANALYSIS_MAX_ATTEMPTS", "3"))
+MEAL_ANALYSIS_RETRY_BASE_SECONDS = float(os.getenv("MEAL_ANALYSIS_RETRY_BASE_SECONDS", "5"))
+MEAL_ANALYSIS_LEASE_SECONDS = float(os.getenv("MEAL_ANALYSIS_LEASE_SECONDS", "120"))
+MEAL_ANALYSIS_EVENTS_TIMEOUT_SECONDS = float(os.getenv("MEAL_ANALYSIS_EVENTS_TIMEOUT_SECONDS", "120"))
+
+@dataclass(frozen=True)
+class ClaimedJob:
+    id: int
+    meal_id: int
+    user_id: int
+    description: str
+    attempts: int
+    claim_token: str
+
+def claim_jobs(worker_id: str, limit: int) -> List[ClaimedJob]:
+    """Lease up to `limit` jobs that are due and not held by a live worker"""
+    now = datetime.utcnow()
+    claimable = (
+        MealAnalysisJob.available_at <= now,
+        or_(MealAnalysisJob.claimed_at.is_(None), MealAnalysisJob.claimed_at < now - timedelta(seconds=MEAL_ANALYSIS_LEASE_SECONDS)),
+    )
+    token = f"{worker_id}:{uuid.uuid4().hex[:12]}"
+    db = SessionLocal()
+    try:
+        due = select(MealAnalysisJob.id).where(*claimable).order_by(MealAnalysisJob.id).limit(limit)
+        # The conditions are checked again on update, so two workers never hold the same job
+        db.execute(
+            update(MealAnalysisJob)
+            .where(MealAnalysisJob.id.in_(due.scalar_subquery()), *claimable)
+            .values(claim_token=token, claimed_at=now, attempts=MealAnalysisJob.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        jobs = [
+            ClaimedJob(job.id, job.meal_id, job.user_id, job.description, job.attempts, token)
+            for job in db.scalars(select(MealAnalysisJob).where(MealAnalysisJob.claim_token == token))
+        ]
+        db.commit()
+        return jobs
+    finally:
+        db.close()
+
+def retry_delay(attempts: int) -> float:
+    """Jittered exponential backoff before a job's next attempt"""
+    return MEAL_ANALYSIS_RETRY_BASE_SECONDS * 2 ** (attempts - 1) * random.uniform(0.5, 1.5)
+
+def finish_jobs(jobs: List[ClaimedJob], answers: List[Optional[Dict[str, float]]]) -> List[MealEntry]:
+    """Store the answers of a claimed batch; returns the meals that were completed.
+
+    Unanswered jobs are released for a later attempt, or completed with the
+    local estimate once they are out of attempts. Only jobs still held
+    under this claim are touched: a job whose lease ran out and was taken
+    over by another worker, or whose meal was deleted in the meantime, is
+    left alone, so a meal is never completed (and its rollup delta
+    applied) twice.
+    """
+    now = datetime.utcnow()
+    completed: Dict[int, Dict[str, float]] = {}
+    db = SessionLocal()
+    try:
+        for job, answer in zip(jobs, answers):
+            if answer is None and job.attempts < MEAL_ANALYSIS_MAX_ATTEMPTS:
+                db.execute(
+                    update(MealAnalysisJob).where(
+                        MealAnalysisJob.id == job.id, MealAnalysisJob.claim_token == job.claim_token
+                    ).values(
+                        claim_token=None, claimed_at=None, last_error="No answer from the model",
+                        available_at=now + timedelta(seconds=retry_delay(job.attempts))
+                    )
+                )
+                continue
+            # Deleting the job is the claim check: of two workers holding it, only one removes the row
+            deleted = db.execute(
+                delete(MealAnalysisJob)
+                .where(MealAnalysisJob.id == job.id, MealAnalysisJob.claim_token == job.claim_token)
+                .execution_options(synchronize_session=False)
+            )
+            if deleted.rowcount == 0:
+                continue
+            completed[job.meal_id] = answer if answer is not None else estimate_nutrition_locally(job.description)
+
+        meals = db.scalars(
+            select(MealEntry).where(MealEntry.id.in_(list(completed)), MealEntry.status == MEAL_PENDING)
+        ).all()
+        deltas = []
+        for meal in meals:
+            nutrition = completed[meal.id]
+            # The pending entry is already counted in the rollup with zeroed nutrients
+            deltas.append((meal.log_id, {field: getattr(meal, field) for field in NUTRIENT_FIELDS}, -1))
+            deltas.append((meal.log_id, nutrition, 1))
+            for field in NUTRIENT_FIELDS:
+                setattr(meal, field, nutrition.get(field, 0))
+            meal.status = MEAL_COMPLETE
+        db.flush()
+        apply_meal_deltas(db, deltas)
+        db.commit()
+        
+        # Reload the committed rows in one query
+        return db.scalars(select(MealEntry).where(MealEntry.id.in_([meal.id for meal in meals]))).all()
+    finally:
+        db.close()
+
+def get_user_meals(user_id: int, meal_ids: List[int]) -> List[MealEntry]:
+    """A user's meals among the given ids (others are silently left out)"""
+    db = SessionLocal()
+    try:
+        return db.scalars(
+            select(MealEntry).join(DailyLog, MealEntry.log_id == DailyLog.id)
+            .where(MealEntry.id.in_(meal_ids), DailyLog.user_id == user_id)
+        ).all()
+    finally:
+        db.close()
+
+def queue_stats() -> Dict[str, int]:
+    """Pending jobs, how many are leased, and how many wait for a retry"""
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        lease_cutoff = now - timedelta(seconds=MEAL_ANALYSIS_LEASE_SECONDS)
+        return {
+            "pending": db.scalar(select(func.count()).select_from(MealAnalysisJob)),
+            "claimed": db.scalar(select(func.count()).where(MealAnalysisJob.claimed_at >= lease_cutoff)),
+            "retrying": db.scalar(select(func.count()).where(MealAnalysisJob.available_at > now)),
+        }
+    finally:
+        db.close()
+
+class AnalysisWorkers:
+    """Worker tasks draining the meal_analysis_jobs queue, plus completion notifications"""
+
+    def __init__(self, count: int, batch_size: int):
+        self.count = count
+        self.batch_size = batch_size
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._work = asyncio.Event()
+        self._completed = asyncio.Event()
+        self._listeners: List[Callable[[List[MealEntry]], None]] = []
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run(f"{self.worker_id}:{n}")) for n in range(self.count)]
+
+    async def join(self) -> None:
+        """Wait for the workers, which run until cancelled"""
+        await asyncio.gather(*self._tasks)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after new jobs were committed"""
+        self._work.set()
+
+    def add_listener(self, callback: Callable[[List[MealEntry]], None]) -> None:
+        """Call `callback(meals)` on the event loop whenever a batch of meals is completed"""
+        self._listeners.append(callback)
+
+    async def wait_for_completion(self, timeout: float) -> None:
+        """Return when this process completes some meals, or after the timeout"""
+        try:
+            await asyncio.wait_for(self._completed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _completed_meals(self, meals: List[MealEntry]) -> None:
+        event, self._completed = self._completed, asyncio.Event()
+        event.set()
+        for callback in self._listeners:
+            try:
+                callback(meals)
+            except Exception as e:
+                print(f"Error in meal analysis listener: {e!r}")
+
+    async def _wait_for_work(self) -> None:
+        try:
+            await asyncio.wait_for(self._work.wait(), MEAL_ANALYSIS_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            return
+        self._work.clear()
+        # Let meals logged in the same moment join the batch
+        await asyncio.sleep(MEAL_ANALYSIS_BATCH_WAIT_MS / 1000)
+
+    async def _run(self, worker_id: str) -> None:
+        while True:
+            try:
+                jobs = await asyncio.to_thread(claim_jobs, worker_id, self.batch_size)
+                if not jobs:
+                    await self._wait_for_work()
+                    continue
+                answers = await resolve_meals_nutrition_async([job.description for job in jobs])
+                meals = await asyncio.to_thread(finish_jobs, jobs, answers)
+                if meals:
+                    self._completed_meals(meals)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Claimed jobs are picked up again once their lease runs out
+                print(f"Error in meal analysis worker {worker_id}: {e!r}")
+                await asyncio.sleep(MEAL_ANALYSIS_POLL_SECONDS)
+
+analysis_workers = AnalysisWorkers(MEAL_ANALYSIS_WORKERS, MEAL_ANALYSIS_BATCH_SIZE)
+
+async def _run_standalone(count: int) -> None:
+    workers = AnalysisWorkers(count, MEAL_ANALYSIS_BATCH_SIZE)
+    workers.start()
+    workers.add_listener(lambda meals: print(f"Analyzed {len(meals)} meal(s)"))
+    await workers.join()
+
+def main(argv: List[str]) -> int:
+    command = argv[0] if argv else "status"
+    if command == "status":
+        print(", ".join(f"{key}: {value}" for key, value in queue_stats().items()))
+        return 0
+    if command == "run":
+        count = int(argv[1]) if len(argv) > 1 else max(MEAL_ANALYSIS_WORKERS, 1)
+        print(f"Running {count} meal analysis worker(s); Ctrl+C to stop")
+        try:
+            asyncio.run(_run_standalone(count))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    print("Usage: python -m backend.meal_analysis [status|run [workers]]")
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
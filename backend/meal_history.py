@@ -0,0 +1,115 @@
+import base64
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import DateTime, literal, select, tuple_
+from sqlalchemy.dialects import sqlite
+
+from .models import DailyLog, MealEntry
+
+load_dotenv()
+
+MEAL_HISTORY_PAGE_SIZE = int(os.getenv("MEAL_HISTORY_PAGE_SIZE", "50"))
+MEAL_HISTORY_MAX_PAGE_SIZE = int(os.getenv("MEAL_HISTORY_MAX_PAGE_SIZE", "200"))
+
+Cursor = Tuple[date, datetime, int]
+
+# SQLite keeps datetimes as text and the CURRENT_TIMESTAMP default writes whole
+# seconds, while SQLAlchemy binds "...HH:MM:SS.ffffff"; the extra fraction would
+# make equal timestamps compare unequal inside the keyset comparison
+_SQLITE_WHOLE_SECONDS = sqlite.DATETIME(
+    storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+)
+
+def encode_cursor(log_date: date, created_at: datetime, meal_id: int) -> str:
+    """Opaque cursor pointing just past a meal in (date, created_at, id) order"""
+    raw = json.dumps([log_date.isoformat(), created_at.isoformat(), meal_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Parse a cursor from encode_cursor; raises ValueError when it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        log_date, created_at, meal_id = json.loads(raw)
+        return date.fromisoformat(log_date), datetime.fromisoformat(created_at), int(meal_id)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+def parse_history_params(cursor: Optional[str], start_date: Optional[str], end_date: Optional[str],
+                         limit: Optional[int]) -> Tuple[Optional[Cursor], Optional[date], Optional[date], int]:
+    """Validate the history query parameters; raises ValueError with a user-facing message"""
+    after = decode_cursor(cursor) if cursor else None
+    try:
+        start = date.fromisoformat(start_date) if start_date else None
+        end = date.fromisoformat(end_date) if end_date else None
+    except ValueError:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+    limit = MEAL_HISTORY_PAGE_SIZE if limit is None else limit
+    if not 1 <= limit <= MEAL_HISTORY_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MEAL_HISTORY_MAX_PAGE_SIZE}")
+    return after, start, end, limit
+
+def _created_at_param(value: datetime):
+    """Bind a cursor timestamp in the same text form SQLite stored it"""
+    if value.microsecond:
+        return literal(value, MealEntry.created_at.type)
+    return literal(value, DateTime(timezone=True).with_variant(_SQLITE_WHOLE_SECONDS, "sqlite"))
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def meal_history_statement(user_id: int, limit: int, after: Optional[Cursor] = None,
+                           start_date: Optional[date] = None, end_date: Optional[date] = None,
+                           search: Optional[str] = None):
+    """A page of a user's meals, newest first, starting after the cursor.
+
+    The cursor is a row-value comparison on the sort key rather than an
+    OFFSET, so every page costs the same however far back it is.
+    One extra row is fetched to tell whether another page follows.
+    """
+    sort_key = (DailyLog.date, MealEntry.created_at, MealEntry.id)
+    stmt = (
+        select(MealEntry, DailyLog.date)
+        .join(DailyLog, MealEntry.log_id == DailyLog.id)
+        .where(DailyLog.user_id == user_id)
+        .order_by(*(column.desc() for column in sort_key))
+        .limit(limit + 1)
+    )
+    if after is not None:
+        after_date, after_created_at, after_id = after
+        stmt = stmt.where(tuple_(*sort_key) < tuple_(after_date, _created_at_param(after_created_at), after_id))
+    if start_date is not None:
+        stmt = stmt.where(DailyLog.date >= start_date)
+    if end_date is not None:
+        stmt = stmt.where(DailyLog.date <= end_date)
+    if search:
+        stmt = stmt.where(MealEntry.name.ilike(f"%{_escape_like(search)}%", escape="\\"))
+    return stmt
+
+def build_history_page(rows: List[Tuple[MealEntry, date]], limit: int) -> Dict[str, Any]:
+    """Shape fetched rows (limit + 1 at most) into a page with the next cursor"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    meals = [
+        {
+            "id": meal.id,
+            "log_id": meal.log_id,
+            "date": log_date,
+            "name": meal.name,
+            "calories": meal.calories,
+            "protein": meal.protein,
+            "carbohydrates": meal.carbohydrates,
+            "fats": meal.fats,
+            "status": meal.status,
+            "created_at": meal.created_at,
+        }
+        for meal, log_date in rows
+    ]
+    next_cursor = None
+    if has_more:
+        last_meal, last_date = rows[-1]
+        next_cursor = encode_cursor(last_date, last_meal.created_at, last_meal.id)
+    return {"meals": meals, "next_cursor": next_cursor, "has_more": has_more}
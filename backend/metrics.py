@@ -0,0 +1,289 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms live in plain dicts keyed by label values
+and are updated under a per-metric lock, so recording a sample costs a few
+dict operations. Values owned by other components (cache hit counters,
+pool usage, breaker state) are read by callbacks only when /metrics is
+scraped. Each process keeps its own numbers; with several workers,
+Prometheus scrapes and sums them per instance.
+
+Recorded here:
+- HTTP requests per route template: count by status, latency histogram,
+  and the number in flight (MetricsMiddleware);
+- SQL statements per engine and operation: count, duration, errors
+  (instrument_engine);
+- model calls per operation (recorded by llm.py).
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+# Configuration
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # When set, scrapes must send it as a bearer token
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Response adds the charset
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}" for labels, value in values
+        ]
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (the last one is +Inf), sum]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        lines = self._header()
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+class CallbackMetric(_Metric):
+    """A counter or gauge whose samples are read from elsewhere at scrape time"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[LabelValues, float]]], metric_type: str = "gauge"):
+        super().__init__(name, help_text, label_names)
+        self.collect = collect
+        self.type = metric_type
+
+    def render(self) -> List[str]:
+        return self._header() + [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in self.collect()
+        ]
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str) -> None:
+        self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        """All metrics in the text exposition format"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # One broken callback must not take the whole scrape down
+                print(f"Error collecting metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# HTTP
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code.", ("method", "route", "status")
+))
+HTTP_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time from request start until the response body is fully sent.", ("method", "route")
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge("http_requests_in_flight", "HTTP requests currently being served."))
+
+# Model calls
+LLM_CALLS = REGISTRY.register(Counter(
+    "llm_calls_total", "Model calls by operation and outcome (ok, error, timeout, queue_timeout, circuit_open, unavailable, cancelled).",
+    ("operation", "outcome")
+))
+LLM_DURATION = REGISTRY.register(Histogram(
+    "llm_call_duration_seconds", "Model call time including queueing and retries.", ("operation",)
+))
+LLM_RETRIES = REGISTRY.register(Counter("llm_retries_total", "Model call attempts that were retried.", ("operation",)))
+LLM_IN_FLIGHT = REGISTRY.register(Gauge("llm_calls_in_flight", "Model calls currently waiting or running."))
+
+# Database
+DB_QUERIES = REGISTRY.register(Counter(
+    "db_queries_total", "SQL statements executed by engine and operation.", ("engine", "operation")
+))
+DB_QUERY_DURATION = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time.", ("engine", "operation"), QUERY_BUCKETS
+))
+DB_QUERY_ERRORS = REGISTRY.register(Counter("db_query_errors_total", "SQL statements that raised.", ("engine",)))
+
+def statement_operation(statement: str) -> str:
+    """First keyword of a SQL statement (SELECT, INSERT, ...), used as a low-cardinality label"""
+    keyword = statement.lstrip()[:10].split(None, 1)
+    return keyword[0].upper() if keyword else "OTHER"
+
+def instrument_engine(engine, name: str) -> None:
+    """Count and time every statement run through a (sync) engine"""
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        operation = statement_operation(statement)
+        DB_QUERIES.inc(name, operation)
+        DB_QUERY_DURATION.observe(elapsed, name, operation)
+
+    def handle_error(exception_context):
+        starts = exception_context.connection.info.get("metrics_query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+        DB_QUERY_ERRORS.inc(name)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+class MetricsMiddleware:
+    """ASGI middleware recording HTTP request counts, latency and concurrency.
+
+    Requests are labelled with the route template (/api/logs/{date}) rather
+    than the concrete path, so label cardinality stays bounded; requests
+    served by the static mount are labelled "static" and unmatched ones
+    "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Optional[Dict[int, str]] = None
+
+    def _route_label(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._routes is None:
+            self._routes = {}
+            for route in scope["app"].routes:
+                if hasattr(route, "endpoint"):
+                    self._routes[id(route.endpoint)] = route.path
+                elif hasattr(route, "app"):
+                    self._routes[id(route.app)] = route.name or route.path or "mount"
+        return self._routes.get(id(endpoint), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            method = scope["method"]
+            route = self._route_label(scope)
+            HTTP_REQUESTS.inc(method, route, str(status))
+            HTTP_DURATION.observe(time.perf_counter() - start, method, route)
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+def register_pool_metrics(engines: Dict[str, object]) -> None:
+    """Expose connection pool usage of the given engines (name -> Engine or AsyncEngine)"""
+    def collect():
+        for name, engine in engines.items():
+            pool = engine.pool
+            if not hasattr(pool, "checkedout"):
+                continue  # Pools without a fixed size (e.g. in-memory SQLite) have nothing to report
+            yield (name, "checked_out"), pool.checkedout()
+            yield (name, "checked_in"), pool.checkedin()
+            yield (name, "overflow"), max(pool.overflow(), 0)
+
+    REGISTRY.register(CallbackMetric(
+        "db_pool_connections", "Pooled database connections by engine and state.", ("engine", "state"), collect
+    ))
@@ -0,0 +1,102 @@
+"""
+Versioned schema migrations.
+
+Each module in backend/migrations/versions is named NNNN_description.py
+and defines `revision`, a one-line `description`, and `upgrade(conn)` /
+`downgrade(conn)` functions that receive a Connection inside a
+transaction. Applied revisions are recorded in the schema_migrations
+table. Migration scripts declare the tables they touch themselves rather
+than importing the ORM models, so old scripts keep working as the models
+change.
+
+Migrations are a deploy step, not something the app does on import: run
+`python -m backend.migrations upgrade` before starting the server.
+"""
+import importlib
+import pkgutil
+from dataclasses import dataclass
+from datetime import datetime
+from types import ModuleType
+from typing import List, Optional
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, delete, insert, select
+from sqlalchemy.engine import Engine
+
+VERSIONS_PACKAGE = __name__ + ".versions"
+BASE = "base"  # Downgrade target that removes every migration
+
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("revision", String(32), primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False)
+)
+
+@dataclass(frozen=True)
+class Migration:
+    revision: str
+    description: str
+    module: ModuleType
+
+    def __str__(self) -> str:
+        return f"{self.revision} {self.description}"
+
+def load_migrations() -> List[Migration]:
+    """Every migration script, in revision order"""
+    package = importlib.import_module(VERSIONS_PACKAGE)
+    migrations = []
+    for info in pkgutil.iter_modules(package.__path__):
+        module = importlib.import_module(f"{VERSIONS_PACKAGE}.{info.name}")
+        migrations.append(Migration(module.revision, module.description, module))
+    migrations.sort(key=lambda migration: migration.revision)
+    
+    revisions = [migration.revision for migration in migrations]
+    if len(set(revisions)) != len(revisions):
+        raise RuntimeError(f"Duplicate migration revisions: {revisions}")
+    return migrations
+
+def applied_revisions(engine: Engine) -> List[str]:
+    """Revisions already applied to the database, in order"""
+    with engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        return sorted(conn.execute(select(schema_migrations.c.revision)).scalars())
+
+def pending_migrations(engine: Engine) -> List[Migration]:
+    """Migrations not yet applied to the database"""
+    applied = set(applied_revisions(engine))
+    return [migration for migration in load_migrations() if migration.revision not in applied]
+
+def upgrade(engine: Engine, target: Optional[str] = None) -> List[Migration]:
+    """Apply pending migrations up to and including target (default: all).
+
+    Each migration runs in its own transaction together with its
+    schema_migrations row, so a failure leaves earlier ones applied.
+    """
+    applied = []
+    for migration in pending_migrations(engine):
+        if target is not None and migration.revision > target:
+            break
+        with engine.begin() as conn:
+            migration.module.upgrade(conn)
+            conn.execute(insert(schema_migrations).values(
+                revision=migration.revision,
+                description=migration.description,
+                applied_at=datetime.utcnow()
+            ))
+        print(f"Applied {migration}")
+        applied.append(migration)
+    return applied
+
+def downgrade(engine: Engine, target: str) -> List[Migration]:
+    """Revert applied migrations newer than target ("base" reverts all of them)"""
+    applied = set(applied_revisions(engine))
+    reverted = []
+    for migration in reversed(load_migrations()):
+        if migration.revision not in applied or (target != BASE and migration.revision <= target):
+            continue
+        with engine.begin() as conn:
+            migration.module.downgrade(conn)
+            conn.execute(delete(schema_migrations).where(schema_migrations.c.revision == migration.revision))
+        print(f"Reverted {migration}")
+        reverted.append(migration)
+    return reverted
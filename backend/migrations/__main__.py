@@ -0,0 +1,32 @@
+import sys
+from typing import List
+
+from . import BASE, applied_revisions, downgrade, load_migrations, upgrade
+
+USAGE = "Usage: python -m backend.migrations [status | upgrade [REVISION] | downgrade REVISION|base]"
+
+def main(argv: List[str]) -> int:
+    from ..database import engine
+    
+    command = argv[0] if argv else "status"
+    if command == "status":
+        applied = set(applied_revisions(engine))
+        for migration in load_migrations():
+            print(f"[{'x' if migration.revision in applied else ' '}] {migration}")
+        return 0
+    if command == "upgrade" and len(argv) <= 2:
+        applied = upgrade(engine, argv[1] if len(argv) == 2 else None)
+        print(f"{len(applied)} migration(s) applied" if applied else "Database is up to date")
+        return 0
+    if command == "downgrade" and len(argv) == 2:
+        reverted = downgrade(engine, argv[1])
+        print(f"{len(reverted)} migration(s) reverted" if reverted else f"Nothing to revert above {argv[1]}")
+        return 0
+    
+    print(USAGE)
+    if command == "downgrade":
+        print(f"Pass a revision to keep, or '{BASE}' to revert everything")
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,98 @@
+"""Tables as they existed before versioned migrations.
+
+Databases created by the old import-time create_all already have these
+tables; they are only created where missing, so this revision doubles as
+the baseline for existing installs.
+"""
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Integer, MetaData, String, Table
+from sqlalchemy.sql import func
+
+revision = "0001"
+description = "initial schema"
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("full_name", String, nullable=False),
+    Column("is_active", String),
+    Column("date_joined", DateTime(timezone=True), server_default=func.now())
+)
+
+Table(
+    "user_profiles", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), unique=True, nullable=False),
+    Column("age", Integer, nullable=False),
+    Column("weight", Float, nullable=False),
+    Column("height", Float, nullable=False),
+    Column("gender", String, nullable=False),
+    Column("activity_level", String, nullable=False),
+    Column("fitness_goal", String, nullable=False),
+    Column("daily_calorie_goal", Float, nullable=False),
+    Column("daily_protein_goal", Float, nullable=False),
+    Column("daily_carb_goal", Float, nullable=False),
+    Column("daily_fat_goal", Float, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True))
+)
+
+Table(
+    "daily_logs", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("date", Date, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now())
+)
+
+Table(
+    "meal_entries", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("log_id", Integer, ForeignKey("daily_logs.id"), nullable=False),
+    Column("name", String, nullable=False),
+    Column("calories", Float, nullable=False),
+    Column("protein", Float, nullable=False),
+    Column("carbohydrates", Float, nullable=False),
+    Column("fats", Float, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now())
+)
+
+Table(
+    "daily_log_totals", metadata,
+    Column("log_id", Integer, ForeignKey("daily_logs.id"), primary_key=True),
+    Column("calories", Float, nullable=False),
+    Column("protein", Float, nullable=False),
+    Column("carbohydrates", Float, nullable=False),
+    Column("fats", Float, nullable=False),
+    Column("meal_count", Integer, nullable=False)
+)
+
+Table(
+    "meal_analysis_cache", metadata,
+    Column("key", String, primary_key=True),
+    Column("calories", Float, nullable=False),
+    Column("protein", Float, nullable=False),
+    Column("carbohydrates", Float, nullable=False),
+    Column("fats", Float, nullable=False),
+    Column("created_at", DateTime, nullable=False)
+)
+
+Table(
+    "refresh_tokens", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("token_hash", String(64), unique=True, index=True, nullable=False),
+    Column("family_id", String(32), index=True, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("revoked_at", DateTime, nullable=True)
+)
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
+
+def downgrade(conn):
+    metadata.drop_all(conn, checkfirst=True)
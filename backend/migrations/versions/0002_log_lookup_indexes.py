@@ -0,0 +1,70 @@
+"""Indexes for the predicates nearly every request filters on.
+
+- daily_logs(user_id, date), unique: every log, day and dashboard lookup.
+  Duplicate days created by concurrent requests are merged first: their
+  meals move to the oldest log for that day and the affected rollups are
+  dropped, to be recomputed on the next read or write.
+- meal_entries(log_id, created_at): fetching a day's meals in order, the
+  rollup fallback scans and the report join.
+
+Downgrading drops the indexes; merged duplicate days stay merged.
+"""
+from sqlalchemy import Column, Date, DateTime, Index, Integer, MetaData, Table, delete, func, select, update
+
+revision = "0002"
+description = "log lookup indexes"
+
+metadata = MetaData()
+
+daily_logs = Table(
+    "daily_logs", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer),
+    Column("date", Date)
+)
+
+meal_entries = Table(
+    "meal_entries", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("log_id", Integer),
+    Column("created_at", DateTime(timezone=True))
+)
+
+daily_log_totals = Table(
+    "daily_log_totals", metadata,
+    Column("log_id", Integer, primary_key=True)
+)
+
+indexes = [
+    Index("ix_daily_logs_user_id_date", daily_logs.c.user_id, daily_logs.c.date, unique=True),
+    Index("ix_meal_entries_log_id_created_at", meal_entries.c.log_id, meal_entries.c.created_at),
+]
+
+def _merge_duplicate_days(conn):
+    duplicates = conn.execute(
+        select(daily_logs.c.user_id, daily_logs.c.date, func.min(daily_logs.c.id))
+        .group_by(daily_logs.c.user_id, daily_logs.c.date)
+        .having(func.count() > 1)
+    ).all()
+    for user_id, log_date, keep_id in duplicates:
+        duplicate_ids = conn.execute(
+            select(daily_logs.c.id).where(
+                daily_logs.c.user_id == user_id,
+                daily_logs.c.date == log_date,
+                daily_logs.c.id != keep_id
+            )
+        ).scalars().all()
+        conn.execute(update(meal_entries).where(meal_entries.c.log_id.in_(duplicate_ids)).values(log_id=keep_id))
+        conn.execute(delete(daily_log_totals).where(daily_log_totals.c.log_id.in_([keep_id, *duplicate_ids])))
+        conn.execute(delete(daily_logs).where(daily_logs.c.id.in_(duplicate_ids)))
+    if duplicates:
+        print(f"Merged duplicate daily logs for {len(duplicates)} day(s)")
+
+def upgrade(conn):
+    _merge_duplicate_days(conn)
+    for index in indexes:
+        index.create(conn, checkfirst=True)
+
+def downgrade(conn):
+    for index in indexes:
+        index.drop(conn, checkfirst=True)
@@ -0,0 +1,143 @@
+"""Per-user food term frequency index (user_food_terms).
+
+The table is backfilled from existing meals with a frozen copy of the
+tokenizer (text_utils.food_terms) as it was when this migration was
+written, so the backfill does not change as text_utils evolves.
+Afterwards `python -m backend.food_terms rebuild` recounts it with the
+deployed tokenizer at any time.
+"""
+import re
+import unicodedata
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, insert, select
+
+revision = "0003"
+description = "user food terms"
+
+metadata = MetaData()
+
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+daily_logs = Table(
+    "daily_logs", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer)
+)
+
+meal_entries = Table(
+    "meal_entries", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("log_id", Integer),
+    Column("name", String),
+    Column("created_at", DateTime(timezone=True))
+)
+
+user_food_terms = Table(
+    "user_food_terms", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("term", String, primary_key=True),
+    Column("count", Integer, nullable=False),
+    Column("last_logged_at", DateTime, nullable=False),
+    Index("ix_user_food_terms_user_id_count", "user_id", "count")
+)
+
+# --- Tokenizer, frozen ---
+_NUMBER_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+    "eleven": "11", "twelve": "12", "dozen": "12",
+    "ek": "1", "aik": "1", "teen": "3", "char": "4", "chaar": "4",
+    "panch": "5", "paanch": "5", "chay": "6", "chhe": "6", "saat": "7",
+    "aath": "8", "nau": "9", "das": "10",
+    "half": "0.5", "aadha": "0.5", "adha": "0.5", "aadhi": "0.5", "adhi": "0.5",
+    "quarter": "0.25", "pao": "0.25",
+    "एक": "1", "दो": "2", "तीन": "3", "चार": "4", "पांच": "5", "आधा": "0.5", "आधी": "0.5",
+    "ایک": "1", "دو": "2", "تین": "3", "چار": "4", "پانچ": "5", "آدھا": "0.5", "آدھی": "0.5",
+}
+
+_SPELLING_VARIANTS = {
+    "dal": "daal", "dhal": "daal", "dahl": "daal",
+    "chawel": "chawal", "chaawal": "chawal", "chawl": "chawal",
+    "rotti": "roti", "rotis": "roti", "rotiyan": "roti",
+    "chapatti": "chapati", "chapatis": "chapati", "chapattis": "chapati",
+    "sabji": "sabzi", "subzi": "sabzi", "subji": "sabzi",
+    "anday": "anda", "ande": "anda", "andey": "anda",
+    "parantha": "paratha", "parathay": "paratha", "parathe": "paratha",
+    "biriyani": "biryani", "biryaani": "biryani", "briyani": "biryani",
+    "dudh": "doodh",
+    "chaye": "chai", "chae": "chai",
+    "daahi": "dahi", "dahee": "dahi",
+    "kelay": "kela", "kele": "kela",
+    "alu": "aloo", "aalu": "aloo",
+    "ghosht": "gosht", "murg": "murgh",
+}
+
+_FOOD_STOPWORDS = frozenset("""
+    a an and or with without of the some for in on at my from plus to no not
+    just only also then after before about around had ate have having
+    little bit few lot lots extra more less large small medium big regular
+    full double single whole fresh homemade home made cooked raw
+    cup cups glass glasses bowl bowls plate plates slice slices piece pieces
+    serving servings portion portions handful scoop scoops bottle can mug
+    tbsp tsp tablespoon tablespoons teaspoon teaspoons
+    g gm gms gram grams kg ml l oz lb lbs
+    breakfast lunch dinner snack snacks meal
+    aur ke ki ka ko se mein main sath saath wala wali wale thora thoda thori thodi
+    zyada ziada bohat bahut kuch pyala pyali katori
+    और के की का को से में साथ वाला वाली थोड़ा थोड़ी कप गिलास प्लेट कटोरी
+    اور کے کی کا کو سے میں ساتھ والا والی تھوڑا تھوڑی کپ گلاس پلیٹ پیالی
+""".split())
+
+_LOOSE_SEPARATOR_RE = re.compile(r"(?<!\d)[./]|[./](?!\d)")
+_NUMBER_UNIT_RE = re.compile(r"(\d)([a-z])")
+
+def _tokenize(text):
+    text = "".join(
+        " " if unicodedata.category(ch)[0] in "PS" and ch not in "./" else ch
+        for ch in text.lower().strip()
+    )
+    text = _NUMBER_UNIT_RE.sub(r"\1 \2", _LOOSE_SEPARATOR_RE.sub(" ", text))
+    words = []
+    for word in text.split():
+        word = _NUMBER_WORDS.get(word, word)
+        words.append(_SPELLING_VARIANTS.get(word, word))
+    return words
+
+def food_terms(meal_name):
+    """The distinct food words in a meal description, in order of appearance"""
+    terms = []
+    for token in _tokenize(meal_name):
+        if len(token) < 2 or token in _FOOD_STOPWORDS or any(ch.isdigit() for ch in token):
+            continue
+        if token not in terms:
+            terms.append(token)
+    return terms
+
+def _backfill(conn, terms=food_terms):
+    counts = {}
+    now = datetime.utcnow()
+    meals = conn.execute(
+        select(daily_logs.c.user_id, meal_entries.c.name, meal_entries.c.created_at)
+        .join(daily_logs, meal_entries.c.log_id == daily_logs.c.id)
+    )
+    for user_id, name, created_at in meals:
+        logged_at = created_at.replace(tzinfo=None) if created_at else now
+        for term in terms(name):
+            count, last_logged_at = counts.get((user_id, term), (0, logged_at))
+            counts[(user_id, term)] = (count + 1, max(last_logged_at, logged_at))
+    rows = [
+        {"user_id": user_id, "term": term, "count": count, "last_logged_at": last_logged_at}
+        for (user_id, term), (count, last_logged_at) in counts.items()
+    ]
+    for start in range(0, len(rows), 500):
+        conn.execute(insert(user_food_terms), rows[start:start + 500])
+    if rows:
+        print(f"Indexed {len(rows)} food terms from existing meals")
+
+def upgrade(conn):
+    user_food_terms.create(conn, checkfirst=True)
+    _backfill(conn)
+
+def downgrade(conn):
+    user_food_terms.drop(conn, checkfirst=True)
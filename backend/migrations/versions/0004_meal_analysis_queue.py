@@ -0,0 +1,43 @@
+"""Asynchronous meal analysis: meal_entries.status and the meal_analysis_jobs queue.
+
+Existing meals were analyzed when they were logged, so the new column
+defaults to "complete". Downgrading drops the queue and the column; any
+meals still pending keep their zeroed nutrients.
+"""
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, inspect, text
+
+revision = "0004"
+description = "meal analysis queue"
+
+metadata = MetaData()
+
+Table("users", metadata, Column("id", Integer, primary_key=True))
+Table("meal_entries", metadata, Column("id", Integer, primary_key=True))
+
+meal_analysis_jobs = Table(
+    "meal_analysis_jobs", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("meal_id", Integer, ForeignKey("meal_entries.id"), unique=True, nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("description", String, nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("available_at", DateTime, nullable=False),
+    Column("claim_token", String(64)),
+    Column("claimed_at", DateTime),
+    Column("last_error", String),
+    Column("created_at", DateTime, nullable=False),
+    Index("ix_meal_analysis_jobs_available_at", "available_at")
+)
+
+def _has_status_column(conn) -> bool:
+    return any(column["name"] == "status" for column in inspect(conn).get_columns("meal_entries"))
+
+def upgrade(conn):
+    if not _has_status_column(conn):
+        conn.execute(text("ALTER TABLE meal_entries ADD COLUMN status VARCHAR(16) NOT NULL DEFAULT 'complete'"))
+    meal_analysis_jobs.create(conn, checkfirst=True)
+
+def downgrade(conn):
+    meal_analysis_jobs.drop(conn, checkfirst=True)
+    if _has_status_column(conn):
+        conn.execute(text("ALTER TABLE meal_entries DROP COLUMN status"))
@@ -0,0 +1,51 @@
+"""Recount user_food_terms now that text_utils.food_terms folds plurals.
+
+Counts stored under plural terms ("eggs") would otherwise never be
+decremented, since deleting a meal now subtracts from the singular
+("egg"). The index is cleared and backfilled again with migration 0003's
+backfill, its frozen tokenizer plus the plural folding frozen here.
+"""
+import importlib
+
+from sqlalchemy import delete
+
+revision = "0005"
+description = "fold food term plurals"
+
+_food_terms_0003 = importlib.import_module(f"{__package__}.0003_user_food_terms")
+
+# --- Plural folding, frozen ---
+_IRREGULAR_PLURALS = {
+    "cookies": "cookie", "brownies": "brownie", "smoothies": "smoothie", "veggies": "veggie",
+    "pies": "pie", "fries": "fries", "leaves": "leaf", "loaves": "loaf", "halves": "half",
+    "hummus": "hummus", "couscous": "couscous", "asparagus": "asparagus", "molasses": "molasses",
+    "grits": "grits", "swiss": "swiss", "citrus": "citrus", "ras": "ras",
+}
+
+def _singular_food(word):
+    if word in _IRREGULAR_PLURALS:
+        return _IRREGULAR_PLURALS[word]
+    if len(word) <= 3 or not word.isascii() or not word.endswith("s") or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes", "zes")):
+        return word[:-2]
+    return word[:-1]
+
+def food_terms(meal_name):
+    """0003's food terms with plurals folded onto the singular"""
+    terms = []
+    for term in _food_terms_0003.food_terms(meal_name):
+        term = _singular_food(term)
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+def upgrade(conn):
+    conn.execute(delete(_food_terms_0003.user_food_terms))
+    _food_terms_0003._backfill(conn, food_terms)
+
+def downgrade(conn):
+    # The counts stay valid for the tokenizer that is deployed; `python -m backend.food_terms rebuild` recounts them
+    pass
@@ -0,0 +1,30 @@
+"""Single-use tickets for opening a live updates stream (live_stream_tickets).
+
+Tickets live for seconds, so there is nothing to backfill and nothing is
+lost by dropping the table on downgrade.
+"""
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table
+
+revision = "0006"
+description = "live stream tickets"
+
+metadata = MetaData()
+
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+live_stream_tickets = Table(
+    "live_stream_tickets", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("ticket_hash", String(64), unique=True, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+    Column("session_expires_at", DateTime),
+    Column("created_at", DateTime, nullable=False),
+    Index("ix_live_stream_tickets_expires_at", "expires_at")
+)
+
+def upgrade(conn):
+    live_stream_tickets.create(conn, checkfirst=True)
+
+def downgrade(conn):
+    live_stream_tickets.drop(conn, checkfirst=True)
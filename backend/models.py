@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -54,6 +54,14 @@ class DailyLog(Base):
     # Relationships
     user = relationship("User", back_populates="daily_logs")
     meal_entries = relationship("MealEntry", back_populates="daily_log")
+    totals = relationship("DailyLogTotals", back_populates="daily_log", uselist=False)
+    
+    # One log per user per day (migration 0002)
+    __table_args__ = (Index("ix_daily_logs_user_id_date", "user_id", "date", unique=True),)
+
+# MealEntry.status: pending meals await the analysis workers with zeroed nutrients (meal_analysis.py)
+MEAL_COMPLETE = "complete"
+MEAL_PENDING = "pending"
 
 class MealEntry(Base):
     __tablename__ = "meal_entries"
@@ -67,9 +75,92 @@ class MealEntry(Base):
     protein = Column(Float, nullable=False, default=0)  # in grams
     carbohydrates = Column(Float, nullable=False, default=0)  # in grams
     fats = Column(Float, nullable=False, default=0)  # in grams
+    status = Column(String(16), nullable=False, default=MEAL_COMPLETE, server_default=MEAL_COMPLETE)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     daily_log = relationship("DailyLog", back_populates="meal_entries")
+    
+    __table_args__ = (Index("ix_meal_entries_log_id_created_at", "log_id", "created_at"),)
+
+class DailyLogTotals(Base):
+    __tablename__ = "daily_log_totals"
+    
+    log_id = Column(Integer, ForeignKey("daily_logs.id"), primary_key=True)
+    calories = Column(Float, nullable=False, default=0)
+    protein = Column(Float, nullable=False, default=0)  # in grams
+    carbohydrates = Column(Float, nullable=False, default=0)  # in grams
+    fats = Column(Float, nullable=False, default=0)  # in grams
+    meal_count = Column(Integer, nullable=False, default=0)
+    
+    # Relationships
+    daily_log = relationship("DailyLog", back_populates="totals")
+
+class UserFoodTerm(Base):
+    __tablename__ = "user_food_terms"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    term = Column(String, primary_key=True)  # Normalized food word (text_utils.food_terms)
+    count = Column(Integer, nullable=False, default=0)  # Meals containing the term
+    last_logged_at = Column(DateTime, nullable=False)
+    
+    # Top-N reads walk this index (migration 0003)
+    __table_args__ = (Index("ix_user_food_terms_user_id_count", "user_id", "count"),)
 
+class MealAnalysisJob(Base):
+    __tablename__ = "meal_analysis_jobs"
+    
+    id = Column(Integer, primary_key=True)
+    meal_id = Column(Integer, ForeignKey("meal_entries.id"), unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    description = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)  # Claims so far, including ones whose worker died
+    available_at = Column(DateTime, nullable=False)  # Not claimed before this (retry backoff)
+    claim_token = Column(String(64), nullable=True)  # Set by the worker holding the job
+    claimed_at = Column(DateTime, nullable=True)  # Claims older than the lease are taken over
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (Index("ix_meal_analysis_jobs_available_at", "available_at"),)
+
+class MealAnalysisCacheEntry(Base):
+    __tablename__ = "meal_analysis_cache"
+    
+    key = Column(String, primary_key=True)  # Normalized meal description
+    calories = Column(Float, nullable=False)
+    protein = Column(Float, nullable=False)  # in grams
+    carbohydrates = Column(Float, nullable=False)  # in grams
+    fats = Column(Float, nullable=False)  # in grams
+    created_at = Column(DateTime, nullable=False)
+    
+    def to_nutrition(self):
+        return {
+            "calories": self.calories,
+            "protein": self.protein,
+            "carbohydrates": self.carbohydrates,
+            "fats": self.fats
+        }
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)  # SHA-256 of the token, never the token itself
+    family_id = Column(String(32), index=True, nullable=False)  # Shared by every token rotated from one login
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)  # Set when rotated, logged out or revoked after reuse
+
+class LiveStreamTicket(Base):
+    __tablename__ = "live_stream_tickets"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    ticket_hash = Column(String(64), unique=True, nullable=False)  # SHA-256 of the ticket, never the ticket itself
+    expires_at = Column(DateTime, nullable=False)  # Must be redeemed before this
+    session_expires_at = Column(DateTime, nullable=True)  # Expiry of the access token it was issued for
+    created_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (Index("ix_live_stream_tickets_expires_at", "expires_at"),)
@@ -0,0 +1,178 @@
+"""Rotating refresh tokens.
+
+Every login starts a token family, whose id is also the session id (`sid`)
+carried by that login's access tokens. Each refresh revokes the presented
+token and issues its successor in the same family, so a token is usable
+exactly once. Access tokens are only accepted while their family still has
+a live token, so logging out ends them too. Presenting a token that was already rotated means it leaked
+(or a client replayed it), and the whole family is revoked, logging out
+both the attacker and the legitimate client.
+
+Two tabs of one login often refresh at the same moment with the same
+token. The successor is derived from the token it replaces (an HMAC under
+SECRET_KEY), so for REFRESH_TOKEN_REUSE_GRACE_SECONDS after a rotation the
+old token is answered with that same successor, as long as the successor
+has not been used itself, instead of revoking the family.
+
+Only SHA-256 digests are stored, so a database leak does not expose
+usable tokens, and a refresh costs one indexed lookup instead of a
+bcrypt verify.
+
+Expired tokens, and tokens revoked more than
+REFRESH_TOKEN_REVOKED_RETENTION_DAYS ago, are purged for the user on every
+rotation and logout; `python -m backend.refresh_tokens purge` clears them
+for everyone.
+"""
+import secrets
+import sys
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.orm import Session
+
+from .auth import (
+    REFRESH_TOKEN_EXPIRE_DAYS, REFRESH_TOKEN_REUSE_GRACE_SECONDS, REFRESH_TOKEN_REVOKED_RETENTION_DAYS,
+    generate_refresh_token, hash_refresh_token, successor_refresh_token
+)
+from .models import RefreshToken, User
+
+class InvalidRefreshToken(Exception):
+    """Raised when a refresh token is unknown, expired, revoked or reused"""
+
+def issue_refresh_token(
+    db: Session, user_id: int, family_id: Optional[str] = None, token: Optional[str] = None
+) -> Tuple[str, str]:
+    """Create a refresh token for a user, starting a new family unless one is given.
+
+    Returns the token and its family id. A random token is generated unless
+    one is given. The new row is added to the session; the caller commits.
+    """
+    token = token or generate_refresh_token()
+    family_id = family_id or secrets.token_hex(16)
+    now = datetime.utcnow()
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(token),
+        family_id=family_id,
+        expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        created_at=now
+    ))
+    return token, family_id
+
+def active_session_statement(family_id: str):
+    """One live token of a family: a row means its login was not logged out, revoked or expired"""
+    return select(RefreshToken.id).where(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None),
+        RefreshToken.expires_at >= datetime.utcnow()
+    ).limit(1)
+
+def session_is_active(db: Session, family_id: str) -> bool:
+    return db.scalar(active_session_statement(family_id)) is not None
+
+def _revoke_family(db: Session, family_id: str) -> None:
+    db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+
+def purge_refresh_tokens(db: Session, user_id: Optional[int] = None) -> int:
+    """Delete expired tokens and ones revoked long enough ago (all users by default); the caller commits"""
+    now = datetime.utcnow()
+    stmt = delete(RefreshToken).where(or_(
+        RefreshToken.expires_at < now,
+        RefreshToken.revoked_at < now - timedelta(days=REFRESH_TOKEN_REVOKED_RETENTION_DAYS)
+    ))
+    if user_id is not None:
+        stmt = stmt.where(RefreshToken.user_id == user_id)
+    return db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+def _recent_successor(db: Session, stored: RefreshToken, token: str) -> Optional[Tuple[User, str, str]]:
+    """The unused successor of a token rotated within the grace window, if there is one"""
+    if stored.revoked_at < datetime.utcnow() - timedelta(seconds=REFRESH_TOKEN_REUSE_GRACE_SECONDS):
+        return None
+    successor = successor_refresh_token(token)
+    row = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == hash_refresh_token(successor),
+        RefreshToken.family_id == stored.family_id,
+        RefreshToken.revoked_at.is_(None),
+        RefreshToken.expires_at >= datetime.utcnow()
+    ).first()
+    if row is None:
+        return None
+    user = db.get(User, row.user_id)
+    if user is None:
+        return None
+    return user, successor, row.family_id
+
+def rotate_refresh_token(db: Session, token: str) -> Tuple[User, str, str]:
+    """Exchange a refresh token for its successor, returning the user, the new token and its family id"""
+    stored = db.query(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(token)).first()
+    if stored is None:
+        raise InvalidRefreshToken("Unknown refresh token")
+    
+    if stored.revoked_at is not None:
+        # Another tab of the same login may have just refreshed with this token
+        recent = _recent_successor(db, stored, token)
+        if recent is not None:
+            return recent
+        # Reuse of a rotated token: assume it was stolen and end the whole session
+        _revoke_family(db, stored.family_id)
+        db.commit()
+        raise InvalidRefreshToken("Refresh token has already been used")
+    
+    if stored.expires_at < datetime.utcnow():
+        raise InvalidRefreshToken("Refresh token has expired")
+    
+    user = db.get(User, stored.user_id)
+    if user is None:
+        raise InvalidRefreshToken("User not found")
+    
+    # Claim the token atomically: of two concurrent refreshes with it, only one gets a successor
+    claimed = db.query(RefreshToken).filter(
+        RefreshToken.id == stored.id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    if claimed == 0:
+        # Lost the race to a concurrent refresh, which has committed by the time the claim returns
+        db.refresh(stored)
+        recent = _recent_successor(db, stored, token)
+        if recent is not None:
+            return recent
+        _revoke_family(db, stored.family_id)
+        db.commit()
+        raise InvalidRefreshToken("Refresh token has already been used")
+    
+    new_token, family_id = issue_refresh_token(db, user.id, stored.family_id, successor_refresh_token(token))
+    purge_refresh_tokens(db, user.id)
+    db.commit()
+    return user, new_token, family_id
+
+def revoke_refresh_token(db: Session, token: str) -> bool:
+    """Revoke the family a refresh token belongs to (logout), returning whether it was found"""
+    stored = db.query(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(token)).first()
+    if stored is None:
+        return False
+    _revoke_family(db, stored.family_id)
+    purge_refresh_tokens(db, stored.user_id)
+    db.commit()
+    return True
+
+def main(argv: List[str]) -> int:
+    from .database import SessionLocal
+
+    if argv[:1] != ["purge"]:
+        print("Usage: python -m backend.refresh_tokens purge")
+        return 2
+    db = SessionLocal()
+    try:
+        purged = purge_refresh_tokens(db)
+        db.commit()
+        print(f"Purged {purged} expired or revoked refresh tokens")
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,157 @@
+import os
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import DailyLog, MealEntry
+from .text_utils import food_terms
+
+load_dotenv()
+
+# Rows fetched per round-trip while streaming meals for a report
+REPORT_YIELD_PER = int(os.getenv("REPORT_YIELD_PER", "500"))
+RECENT_MEALS_IN_REPORT = 10
+# Ranges (in days) offered for the downloadable report
+REPORT_RANGE_OPTIONS = (30, 90, 365)
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+
+# Templates are compiled once at import; rendering only runs the compiled code
+_template_env = Environment(
+    loader=FileSystemLoader(str(TEMPLATES_DIR)),
+    autoescape=select_autoescape(["html"])
+)
+_REPORT_TEMPLATE = _template_env.get_template("report.html")
+_REPORT_CSS = Markup((TEMPLATES_DIR / "report.css").read_text(encoding="utf-8"))
+
+@dataclass
+class ReportMeal:
+    name: str
+    calories: float
+    protein: float
+    carbohydrates: float
+    fats: float
+
+@dataclass
+class ReportData:
+    """Everything the analysis and HTML reports need about a date range"""
+    start_date: date
+    end_date: date
+    daily_totals: List[Dict[str, Any]] = field(default_factory=list)  # Days with meals only
+    meal_count: int = 0
+    total_calories: float = 0
+    total_protein: float = 0
+    total_carbs: float = 0
+    total_fats: float = 0
+    food_frequency: Counter = field(default_factory=Counter)  # Meals in the period containing each food term
+    recent_meals: Deque[ReportMeal] = field(default_factory=lambda: deque(maxlen=RECENT_MEALS_IN_REPORT))
+
+    @property
+    def days_with_data(self) -> int:
+        return len(self.daily_totals)
+
+    @property
+    def period_days(self) -> int:
+        return (self.end_date - self.start_date).days
+
+    def _per_day(self, total: float) -> float:
+        return total / self.days_with_data if self.days_with_data else 0
+
+    @property
+    def avg_daily_protein(self) -> float:
+        return self._per_day(self.total_protein)
+
+    @property
+    def avg_daily_carbs(self) -> float:
+        return self._per_day(self.total_carbs)
+
+    @property
+    def avg_daily_fats(self) -> float:
+        return self._per_day(self.total_fats)
+
+    @property
+    def _daily_calories(self) -> List[float]:
+        return [day["calories"] for day in self.daily_totals if day["calories"] > 0]
+
+    @property
+    def avg_daily_calories(self) -> float:
+        daily_calories = self._daily_calories
+        return sum(daily_calories) / len(daily_calories) if daily_calories else 0
+
+    @property
+    def max_daily_calories(self) -> float:
+        return max(self._daily_calories, default=0)
+
+    @property
+    def min_daily_calories(self) -> float:
+        return min(self._daily_calories, default=0)
+
+    def common_foods(self, limit: int = 10) -> List[Tuple[str, int]]:
+        return self.food_frequency.most_common(limit)
+
+def load_report_data(user_id: int, db: Session, days: int = 30, end_date: Optional[date] = None) -> ReportData:
+    """Load a user's report data for the last `days` days in a single pass.
+
+    One joined, column-only query streams the meals in date order
+    (REPORT_YIELD_PER rows at a time), and totals, the daily series, food
+    term frequencies and the most recent meals are all accumulated while
+    iterating, so memory stays proportional to the number of days rather
+    than the number of meals. Food terms are counted within the report's
+    period, the same way as the all-time user_food_terms index.
+    """
+    end_date = end_date or date.today()
+    data = ReportData(start_date=end_date - timedelta(days=days), end_date=end_date)
+
+    stmt = (
+        select(DailyLog.date, MealEntry.name, MealEntry.calories, MealEntry.protein,
+               MealEntry.carbohydrates, MealEntry.fats)
+        .join(MealEntry, MealEntry.log_id == DailyLog.id)
+        .where(
+            DailyLog.user_id == user_id,
+            DailyLog.date >= data.start_date,
+            DailyLog.date <= data.end_date
+        )
+        .order_by(DailyLog.date, MealEntry.created_at, MealEntry.id)
+        .execution_options(yield_per=REPORT_YIELD_PER)
+    )
+
+    day = None
+    for meal_date, name, calories, protein, carbohydrates, fats in db.execute(stmt):
+        if day is None or day["date"] != meal_date:
+            day = {"date": meal_date, "calories": 0, "protein": 0, "carbs": 0, "fats": 0, "meal_count": 0}
+            data.daily_totals.append(day)
+        day["calories"] += calories
+        day["protein"] += protein
+        day["carbs"] += carbohydrates
+        day["fats"] += fats
+        day["meal_count"] += 1
+
+        data.meal_count += 1
+        data.total_calories += calories
+        data.total_protein += protein
+        data.total_carbs += carbohydrates
+        data.total_fats += fats
+        data.food_frequency.update(food_terms(name))
+        data.recent_meals.append(ReportMeal(name, calories, protein, carbohydrates, fats))
+
+    return data
+
+def render_report_html(user_profile, full_name: str, data: ReportData) -> Iterator[str]:
+    """Render the downloadable HTML report as a stream of text chunks"""
+    goal = user_profile.daily_calorie_goal
+    return _REPORT_TEMPLATE.generate(
+        css=_REPORT_CSS,
+        profile=user_profile,
+        full_name=full_name,
+        data=data,
+        generated_on=date.today(),
+        goal_achievement=(data.avg_daily_calories / goal) * 100 if goal else 0
+    )
@@ -0,0 +1,153 @@
+"""
+Per-day nutrition rollups kept in the daily_log_totals table.
+
+Writes go through apply_meal_deltas in the same transaction as the meal
+insert or delete, so reads of a day's totals never have to rescan
+meal_entries. Run `python -m backend.rollups check` to report drift and
+`python -m backend.rollups rebuild` to recompute every rollup from the
+meal entries.
+"""
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import DailyLog, DailyLogTotals, MealEntry
+
+NUTRIENT_FIELDS = ("calories", "protein", "carbohydrates", "fats")
+
+# Totals closer than this are treated as equal when checking for drift
+DRIFT_TOLERANCE = 0.01
+
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def _meal_totals_statement(log_ids: Optional[Iterable[int]] = None):
+    stmt = select(
+        MealEntry.log_id,
+        *(func.coalesce(func.sum(getattr(MealEntry, field)), 0) for field in NUTRIENT_FIELDS),
+        func.count(MealEntry.id)
+    ).group_by(MealEntry.log_id)
+    if log_ids is not None:
+        stmt = stmt.where(MealEntry.log_id.in_(list(log_ids)))
+    return stmt
+
+def _recompute(db: Session, log_ids: Iterable[int]) -> None:
+    """Replace the rollups of the given logs with totals computed from their meals"""
+    log_ids = list(log_ids)
+    computed = {row[0]: row[1:] for row in db.execute(_meal_totals_statement(log_ids))}
+    existing = {totals.log_id: totals for totals in db.query(DailyLogTotals).filter(DailyLogTotals.log_id.in_(log_ids))}
+    for log_id in log_ids:
+        values = computed.get(log_id, (0, 0, 0, 0, 0))
+        totals = existing.get(log_id) or DailyLogTotals(log_id=log_id)
+        for field, value in zip(NUTRIENT_FIELDS + ("meal_count",), values):
+            setattr(totals, field, value)
+        db.add(totals)
+
+def _insert_missing(db: Session, deltas: Dict[int, Dict[str, float]]) -> None:
+    """Create the rollups of logs that have none, from their meals.
+
+    Two writers can both find a day's row missing. The one that inserts
+    first counted only committed meals and its own, so the other one, on
+    conflict, adds just its own delta, exactly as if the row had existed.
+    """
+    dialect_insert = _DIALECT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        _recompute(db, deltas)
+        return
+    
+    computed = {row[0]: row[1:] for row in db.execute(_meal_totals_statement(deltas))}
+    for log_id, delta in deltas.items():
+        values = computed.get(log_id, (0, 0, 0, 0, 0))
+        stmt = dialect_insert(DailyLogTotals).values(log_id=log_id, **dict(zip(NUTRIENT_FIELDS + ("meal_count",), values)))
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[DailyLogTotals.log_id],
+            set_={field: getattr(DailyLogTotals, field) + value for field, value in delta.items()}
+        ))
+
+def apply_meal_deltas(db: Session, meals: Iterable[Tuple[int, Dict[str, float], int]]) -> None:
+    """Add (sign=1) or remove (sign=-1) meals from their logs' rollups.
+
+    `meals` holds (log_id, nutrition, sign) tuples. Deltas are merged per log
+    and applied as atomic `x = x + delta` updates, so concurrent writers to
+    the same day do not lose each other's changes. Logs without a rollup row
+    yet (new or created before rollups existed) are recomputed from their
+    meal entries, which must already be flushed, and upserted so a
+    concurrent writer creating the same row is not an error.
+    """
+    deltas: Dict[int, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(NUTRIENT_FIELDS + ("meal_count",), 0))
+    for log_id, nutrition, sign in meals:
+        delta = deltas[log_id]
+        for field in NUTRIENT_FIELDS:
+            delta[field] += sign * (nutrition.get(field) or 0)
+        delta["meal_count"] += sign
+    
+    missing = {}
+    for log_id, delta in deltas.items():
+        result = db.execute(
+            update(DailyLogTotals)
+            .where(DailyLogTotals.log_id == log_id)
+            .values({field: getattr(DailyLogTotals, field) + value for field, value in delta.items()})
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            missing[log_id] = delta
+    if missing:
+        _insert_missing(db, missing)
+
+def find_drift(db: Session) -> List[Tuple[int, tuple, tuple]]:
+    """List (log_id, stored, actual) for every rollup that disagrees with its meals"""
+    actual = {row[0]: tuple(row[1:]) for row in db.execute(_meal_totals_statement())}
+    stored = {
+        row[0]: tuple(row[1:])
+        for row in db.execute(select(
+            DailyLogTotals.log_id, *(getattr(DailyLogTotals, field) for field in NUTRIENT_FIELDS),
+            DailyLogTotals.meal_count
+        ))
+    }
+    drift = []
+    for (log_id,) in db.execute(select(DailyLog.id)):
+        expected = actual.get(log_id, (0, 0, 0, 0, 0))
+        current = stored.get(log_id)
+        if current is None or any(abs(a - b) > DRIFT_TOLERANCE for a, b in zip(current, expected)):
+            drift.append((log_id, current, expected))
+    return drift
+
+def rebuild_rollups(db: Session, log_ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute rollups from meal entries (all logs by default); returns the number rebuilt"""
+    if log_ids is None:
+        log_ids = [log_id for (log_id,) in db.execute(select(DailyLog.id))]
+    log_ids = list(log_ids)
+    for start in range(0, len(log_ids), 500):
+        _recompute(db, log_ids[start:start + 500])
+    db.commit()
+    return len(log_ids)
+
+def main(argv: List[str]) -> int:
+    from .database import SessionLocal
+    
+    command = argv[0] if argv else "check"
+    if command not in ("check", "rebuild", "repair"):
+        print("Usage: python -m backend.rollups [check|repair|rebuild]")
+        return 2
+    
+    db = SessionLocal()
+    try:
+        if command == "rebuild":
+            print(f"Rebuilt {rebuild_rollups(db)} daily rollups")
+            return 0
+        drift = find_drift(db)
+        for log_id, current, expected in drift:
+            print(f"daily_log {log_id}: stored={current} actual={expected}")
+        print(f"{len(drift)} daily rollups out of sync")
+        if command == "repair" and drift:
+            print(f"Repaired {rebuild_rollups(db, [log_id for log_id, _, _ in drift])} daily rollups")
+            return 0
+        return 1 if drift else 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
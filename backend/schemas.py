@@ -17,10 +17,23 @@ class UserResponse(BaseModel):
     email: str
     full_name: str
     access_token: str
+    refresh_token: Optional[str] = None
     
     class Config:
         from_attributes = True
 
+class TokenRefresh(BaseModel):
+    refresh_token: str
+
+class TokenResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+
+class StreamTicketResponse(BaseModel):
+    ticket: str  # Pass as ?ticket= to GET /api/live/events
+    expires_in: int  # Seconds
+
 # Profile schemas
 class ProfileCreate(BaseModel):
     age: int
@@ -62,11 +75,26 @@ class MealLogResponse(BaseModel):
     protein: float
     carbohydrates: float
     fats: float
+    status: str = "complete"  # "pending" until the analysis workers fill in the nutrients
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class MealBatchCreate(BaseModel):
+    meals: List[MealLogCreate]
+
+class MealBatchItemResult(BaseModel):
+    index: int
+    success: bool
+    meal: Optional[MealLogResponse] = None
+    error: Optional[str] = None
+
+class MealBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[MealBatchItemResult]
+
 class DailyLogResponse(BaseModel):
     date: date
     meals: List[MealLogResponse]
@@ -75,9 +103,26 @@ class DailyLogResponse(BaseModel):
     total_carbohydrates: float
     total_fats: float
 
+class MealHistoryEntry(MealLogResponse):
+    date: date
+
+class MealHistoryPage(BaseModel):
+    meals: List[MealHistoryEntry]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+    has_more: bool
+
+class FoodTermResponse(BaseModel):
+    term: str
+    count: int  # Meals containing the term
+    last_logged_at: datetime
+    
+    class Config:
+        from_attributes = True
+
 # AI schemas
 class AIQuestion(BaseModel):
     question: str
+    use_cache: bool = True  # False forces a fresh answer
 
 class AIResponse(BaseModel):
     response: str
@@ -1,18 +1,27 @@
-import google.generativeai as genai
-import os
+import asyncio
 import json
 import re
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any, List, Optional, Set, Tuple
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import date
-from .models import DailyLog, MealEntry
-from dotenv import load_dotenv
+from datetime import date, datetime
+from .models import MEAL_COMPLETE, MEAL_PENDING, DailyLog, MealAnalysisJob, MealEntry, UserProfile
+from .llm import (
+    generate_text_async, stream_text_async,
+    LLM_BATCH_CHUNK_SIZE, LLM_BATCH_TIMEOUT_SECONDS, LLM_REPORT_TIMEOUT_SECONDS
+)
+from .cache import advice_cache, meal_cache
+from .food_db import resolve_meal
+from .aggregates import get_daily_totals
+from .reports import load_report_data
+from .food_terms import apply_term_deltas
+from .rollups import NUTRIENT_FIELDS, apply_meal_deltas
 
-load_dotenv()
+# Used when neither the AI nor the local food table recognise a meal
+DEFAULT_MEAL_ESTIMATE = {"calories": 150, "protein": 6, "carbohydrates": 25, "fats": 3}
 
-# Configure Gemini AI
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel('gemini-1.5-flash')
+NO_MEAL_DATA_MESSAGE = "No meal data available for analysis. Start logging your meals to get personalized insights!"
 
 def calculate_bmr(weight: float, height: float, age: int, gender: str) -> float:
     """Calculate Basal Metabolic Rate using Mifflin-St Jeor Equation"""
@@ -36,9 +45,42 @@ def calculate_tdee(bmr: float, activity_level: str) -> float:
     multiplier = activity_multipliers.get(activity_level.lower(), 1.2)
     return bmr * multiplier
 
-def analyze_meal_with_ai(meal_description: str) -> Dict[str, float]:
-    """Analyze meal description using Gemini AI to extract nutritional information"""
-    prompt = f"""
+def calculate_daily_goals(weight: float, height: float, age: int, gender: str,
+                          activity_level: str, fitness_goal: str) -> Dict[str, float]:
+    """Calculate daily calorie and macro goals for a profile"""
+    bmr = calculate_bmr(weight, height, age, gender)
+    tdee = calculate_tdee(bmr, activity_level)
+    
+    if fitness_goal == "lose_weight":
+        daily_calorie_goal = tdee - 500
+    elif fitness_goal == "gain_weight":
+        daily_calorie_goal = tdee + 500
+    else:
+        daily_calorie_goal = tdee
+    
+    return {
+        "daily_calorie_goal": daily_calorie_goal,
+        "daily_protein_goal": (daily_calorie_goal * 0.25) / 4,
+        "daily_carb_goal": (daily_calorie_goal * 0.45) / 4,
+        "daily_fat_goal": (daily_calorie_goal * 0.30) / 9
+    }
+
+NUTRITION_ACCURACY_GUIDELINES = """    IMPORTANT ACCURACY GUIDELINES:
+    - 1 medium banana = ~105 calories, 1.3g protein, 27g carbs, 0.4g fat
+    - 4 bananas = ~420 calories, 5.2g protein, 108g carbs, 1.6g fat
+    - 1 cup daal (lentils) = ~230 calories, 18g protein, 40g carbs, 0.8g fat
+    - 1 roti (chapati) = ~120 calories, 3g protein, 20g carbs, 2g fat
+    - 1 medium apple = ~95 calories, 0.5g protein, 25g carbs, 0.3g fat
+    - 1 medium peach = ~60 calories, 1g protein, 15g carbs, 0.4g fat
+    - 1 cup rice = ~200 calories, 4g protein, 45g carbs, 0.5g fat
+    - 1 egg = ~70 calories, 6g protein, 0.6g carbs, 5g fat
+    - 1 slice bread = ~80 calories, 3g protein, 15g carbs, 1g fat
+    
+    Use REALISTIC serving sizes and ACCURATE nutritional values. Do not overestimate calories."""
+
+def _build_meal_analysis_prompt(meal_description: str) -> str:
+    """Build the prompt used to extract nutrition data from a meal description"""
+    return f"""
     You are a nutrition expert. Analyze the following meal description and provide ACCURATE nutritional information.
 
     The meal description might be in English, Hindi, Urdu, or Roman Urdu. Understand the food items regardless of language.
@@ -53,88 +95,174 @@ def analyze_meal_with_ai(meal_description: str) -> Dict[str, float]:
         "fats": [number in grams]
     }}
 
-    IMPORTANT ACCURACY GUIDELINES:
-    - 1 medium banana = ~105 calories, 1.3g protein, 27g carbs, 0.4g fat
-    - 4 bananas = ~420 calories, 5.2g protein, 108g carbs, 1.6g fat
-    - 1 cup daal (lentils) = ~230 calories, 18g protein, 40g carbs, 0.8g fat
-    - 1 roti (chapati) = ~120 calories, 3g protein, 20g carbs, 2g fat
-    - 1 medium apple = ~95 calories, 0.5g protein, 25g carbs, 0.3g fat
-    - 1 medium peach = ~60 calories, 1g protein, 15g carbs, 0.4g fat
-    - 1 cup rice = ~200 calories, 4g protein, 45g carbs, 0.5g fat
-    - 1 egg = ~70 calories, 6g protein, 0.6g carbs, 5g fat
-    - 1 slice bread = ~80 calories, 3g protein, 15g carbs, 1g fat
-    
-    Use REALISTIC serving sizes and ACCURATE nutritional values. Do not overestimate calories.
+{NUTRITION_ACCURACY_GUIDELINES}
     Return ONLY the JSON object, no explanations.
     """
+
+def _parse_nutrition_response(response_text: str) -> Dict[str, float]:
+    """Parse the model's JSON answer into validated nutritional values"""
+    response_text = response_text.strip()
+    
+    # Clean up the response to extract JSON
+    # Remove any markdown formatting or extra text
+    response_text = re.sub(r'```json\s*', '', response_text)
+    response_text = re.sub(r'```\s*', '', response_text)
+    response_text = re.sub(r'^.*?\{', '{', response_text)  # Remove text before first {
+    response_text = re.sub(r'\}.*?$', '}', response_text)  # Remove text after last }
+    
+    # Parse JSON
+    nutritional_data = json.loads(response_text)
+    
+    # Validate and ensure all required fields are present with reasonable values
+    return {
+        "calories": max(0, float(nutritional_data.get("calories", 0))),
+        "protein": max(0, float(nutritional_data.get("protein", 0))),
+        "carbohydrates": max(0, float(nutritional_data.get("carbohydrates", 0))),
+        "fats": max(0, float(nutritional_data.get("fats", 0)))
+    }
+
+def _build_batch_meal_analysis_prompt(meal_descriptions: List[str]) -> str:
+    """Build one prompt that asks for the nutrition of several meals at once"""
+    numbered = "\n".join(f'    {i}. "{description}"' for i, description in enumerate(meal_descriptions, 1))
+    return f"""
+    You are a nutrition expert. Analyze each of the following numbered meal descriptions and provide ACCURATE nutritional information for each one separately.
+
+    The meal descriptions might be in English, Hindi, Urdu, or Roman Urdu. Understand the food items regardless of language.
+
+    Meal descriptions:
+{numbered}
+
+    Provide nutritional information as a JSON array with exactly one object per meal, in the same order, in this EXACT format (no additional text, no markdown):
+    [
+        {{"index": [meal number], "calories": [number], "protein": [number in grams], "carbohydrates": [number in grams], "fats": [number in grams]}}
+    ]
+
+{NUTRITION_ACCURACY_GUIDELINES}
+    Return ONLY the JSON array, no explanations.
+    """
+
+def _parse_batch_nutrition_response(response_text: str, count: int) -> List[Optional[Dict[str, float]]]:
+    """Parse the model's JSON array answer; meals it skipped come back as None"""
+    response_text = re.sub(r'```(?:json)?\s*', '', response_text.strip())
+    response_text = response_text[response_text.index('['):response_text.rindex(']') + 1]
+    
+    results: List[Optional[Dict[str, float]]] = [None] * count
+    for position, item in enumerate(json.loads(response_text)):
+        index = int(item.get("index", position + 1)) - 1
+        if 0 <= index < count:
+            results[index] = {
+                "calories": max(0, float(item.get("calories", 0))),
+                "protein": max(0, float(item.get("protein", 0))),
+                "carbohydrates": max(0, float(item.get("carbohydrates", 0))),
+                "fats": max(0, float(item.get("fats", 0)))
+            }
+    return results
+
+def estimate_nutrition_locally(meal_description: str) -> Dict[str, float]:
+    """Estimate nutrition from the local food table when the AI is unavailable"""
+    resolution = resolve_meal(meal_description)
+    if resolution.items:
+        return resolution.nutrition()
+    return dict(DEFAULT_MEAL_ESTIMATE)
+
+async def _request_meal_analysis_async(meal_description: str) -> Dict[str, float]:
+    """Ask the model for a meal's nutrition; raises when no usable answer comes back"""
+    response_text = await generate_text_async(_build_meal_analysis_prompt(meal_description), operation="analyze_meal")
+    result = _parse_nutrition_response(response_text)
+    print(f"AI Analysis for '{meal_description}': {result}")
+    return result
+
+async def lookup_known_nutrition_async(meal_description: str) -> Optional[Dict[str, float]]:
+    """Answer from the local food table or the meal cache, without calling the model"""
+    # Known foods are answered from the local food table without any I/O
+    resolution = resolve_meal(meal_description)
+    if resolution.is_confident:
+        return resolution.nutrition()
+    
+    key = meal_cache.make_key(meal_description)
+    cached = meal_cache.get_memory(key)
+    if cached is None:
+        cached = await asyncio.to_thread(meal_cache.get_persistent, key)
+    return dict(cached) if cached is not None else None
+
+async def get_meal_nutrition_async(meal_description: str) -> Dict[str, float]:
+    """Resolve a meal's nutrition locally or from the meal cache before asking the AI.
+
+    Descriptions the local food table resolves completely never reach the
+    model. Only answers that came from the model are cached; local fallback
+    estimates are returned but not stored, so a later call can still get a
+    proper analysis.
+    """
+    known = await lookup_known_nutrition_async(meal_description)
+    if known is not None:
+        return known
     
     try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Clean up the response to extract JSON
-        # Remove any markdown formatting or extra text
-        response_text = re.sub(r'```json\s*', '', response_text)
-        response_text = re.sub(r'```\s*', '', response_text)
-        response_text = re.sub(r'^.*?\{', '{', response_text)  # Remove text before first {
-        response_text = re.sub(r'\}.*?$', '}', response_text)  # Remove text after last }
-        
-        # Parse JSON
-        nutritional_data = json.loads(response_text)
-        
-        # Validate and ensure all required fields are present with reasonable values
-        result = {
-            "calories": max(0, float(nutritional_data.get("calories", 0))),
-            "protein": max(0, float(nutritional_data.get("protein", 0))),
-            "carbohydrates": max(0, float(nutritional_data.get("carbohydrates", 0))),
-            "fats": max(0, float(nutritional_data.get("fats", 0)))
-        }
-        
-        print(f"AI Analysis for '{meal_description}': {result}")
-        return result
-        
+        result = await _request_meal_analysis_async(meal_description)
     except Exception as e:
-        print(f"Error analyzing meal with AI: {e}")
-        print(f"Response was: {response_text if 'response_text' in locals() else 'No response'}")
-        
-        # Fallback: Try to provide accurate estimates based on common foods
-        meal_lower = meal_description.lower()
-        
-        # Count quantities and estimate accordingly
-        if 'banana' in meal_lower or 'bananas' in meal_lower:
-            # Count bananas (rough estimate)
-            banana_count = 1
-            if any(word in meal_lower for word in ['2', 'two', '3', 'three', '4', 'four', '5', 'five']):
-                if '2' in meal_lower or 'two' in meal_lower:
-                    banana_count = 2
-                elif '3' in meal_lower or 'three' in meal_lower:
-                    banana_count = 3
-                elif '4' in meal_lower or 'four' in meal_lower:
-                    banana_count = 4
-                elif '5' in meal_lower or 'five' in meal_lower:
-                    banana_count = 5
-            return {
-                "calories": banana_count * 105,
-                "protein": banana_count * 1.3,
-                "carbohydrates": banana_count * 27,
-                "fats": banana_count * 0.4
-            }
-        elif any(word in meal_lower for word in ['daal', 'dal', 'lentil']):
-            if 'roti' in meal_lower or 'bread' in meal_lower:
-                # Daal + roti combination
-                return {"calories": 350, "protein": 21, "carbohydrates": 60, "fats": 2.8}
-            else:
-                # Just daal
-                return {"calories": 230, "protein": 18, "carbohydrates": 40, "fats": 0.8}
-        elif any(word in meal_lower for word in ['apple', 'peach', 'fruit']):
-            return {"calories": 95, "protein": 0.5, "carbohydrates": 25, "fats": 0.3}
-        elif any(word in meal_lower for word in ['rice', 'chawal']):
-            return {"calories": 200, "protein": 4, "carbohydrates": 45, "fats": 0.5}
+        print(f"Error analyzing meal with AI: {e!r}")
+        return estimate_nutrition_locally(meal_description)
+    
+    await asyncio.to_thread(meal_cache.set, meal_cache.make_key(meal_description), result)
+    return result
+
+async def _request_batch_analysis_async(meal_descriptions: List[str]) -> List[Optional[Dict[str, float]]]:
+    """One model round-trip for a chunk of meals; failures leave every entry as None"""
+    try:
+        response_text = await generate_text_async(
+            _build_batch_meal_analysis_prompt(meal_descriptions), timeout=LLM_BATCH_TIMEOUT_SECONDS,
+            operation="analyze_meals_batch"
+        )
+        return _parse_batch_nutrition_response(response_text, len(meal_descriptions))
+    except Exception as e:
+        print(f"Error analyzing meal batch with AI: {e!r}")
+        return [None] * len(meal_descriptions)
+
+async def get_meals_nutrition_async(meal_descriptions: List[str]) -> List[Dict[str, float]]:
+    """Resolve many meals at once; meals the model did not answer fall back to local estimates"""
+    results = await resolve_meals_nutrition_async(meal_descriptions)
+    return [
+        result if result is not None else estimate_nutrition_locally(description)
+        for description, result in zip(meal_descriptions, results)
+    ]
+
+async def resolve_meals_nutrition_async(meal_descriptions: List[str]) -> List[Optional[Dict[str, float]]]:
+    """Resolve many meals at once, sending only the unknown ones to the model.
+
+    Descriptions that normalize to the same text are analyzed once, and the
+    rest are sent in chunks of LLM_BATCH_CHUNK_SIZE, one prompt per chunk.
+    Meals the model did not answer come back as None.
+    """
+    results: List[Optional[Dict[str, float]]] = [None] * len(meal_descriptions)
+    pending: Dict[str, List[int]] = {}
+    for i, description in enumerate(meal_descriptions):
+        key = meal_cache.make_key(description)
+        if key in pending:
+            pending[key].append(i)
+            continue
+        known = await lookup_known_nutrition_async(description)
+        if known is not None:
+            results[i] = known
         else:
-            return {"calories": 150, "protein": 6, "carbohydrates": 25, "fats": 3}
+            pending[key] = [i]
+    
+    keys = list(pending)
+    chunks = [keys[i:i + LLM_BATCH_CHUNK_SIZE] for i in range(0, len(keys), LLM_BATCH_CHUNK_SIZE)]
+    answers = await asyncio.gather(*(
+        _request_batch_analysis_async([meal_descriptions[pending[key][0]] for key in chunk])
+        for chunk in chunks
+    ))
+    
+    for chunk, chunk_answers in zip(chunks, answers):
+        for key, answer in zip(chunk, chunk_answers):
+            if answer is not None:
+                await asyncio.to_thread(meal_cache.set, key, answer)
+            for i in pending[key]:
+                results[i] = dict(answer) if answer is not None else None
+    return results
 
-def get_ai_nutrition_advice(question: str, user_profile=None) -> str:
-    """Get nutrition advice from Gemini AI with user context"""
+def _build_advice_prompt(question: str, user_profile=None) -> str:
+    """Build the nutritionist prompt, personalised when a profile is available"""
     if user_profile:
         system_prompt = f"""
         You are a professional nutritionist and dietitian providing personalized advice.
@@ -170,98 +298,190 @@ def get_ai_nutrition_advice(question: str, user_profile=None) -> str:
         Keep responses concise but informative.
         """
     
-    full_prompt = f"{system_prompt}\n\nUser question: {question}"
+    return f"{system_prompt}\n\nUser question: {question}"
+
+async def get_ai_nutrition_advice_async(question: str, user_profile=None, use_cache: bool = True) -> str:
+    """Get nutrition advice from the model with user context"""
+    key = advice_cache.make_key(question, user_profile)
+    if use_cache:
+        cached = advice_cache.get(key)
+        if cached is not None:
+            return cached
+    
+    full_prompt = _build_advice_prompt(question, user_profile)
     
     try:
-        response = model.generate_content(full_prompt)
-        return response.text.strip()
+        answer = await generate_text_async(full_prompt, operation="nutrition_advice")
     except Exception as e:
-        return f"I apologize, but I'm having trouble processing your question right now. Please try again later. Error: {str(e)}"
+        return f"I apologize, but I'm having trouble processing your question right now. Please try again later. Error: {str(e) or type(e).__name__}"
+    
+    # Only real answers are cached, never the apology above
+    advice_cache.set(key, answer)
+    return answer
 
-def get_daily_summary(user_id: int, target_date: date, db: Session) -> Dict[str, Any]:
-    """Get daily nutritional summary for a user"""
-    daily_log = db.query(DailyLog).filter(
-        DailyLog.user_id == user_id,
-        DailyLog.date == target_date
-    ).first()
-    
-    if not daily_log:
-        return {
-            "total_calories": 0,
-            "total_protein": 0,
-            "total_carbohydrates": 0,
-            "total_fats": 0,
-            "meal_count": 0
+async def stream_ai_nutrition_advice(question: str, user_profile=None, use_cache: bool = True) -> AsyncIterator[str]:
+    """Stream the nutritionist's answer as it is generated"""
+    key = advice_cache.make_key(question, user_profile)
+    if use_cache:
+        cached = advice_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+    
+    parts = []
+    async for text in stream_text_async(_build_advice_prompt(question, user_profile), operation="nutrition_advice_stream"):
+        parts.append(text)
+        yield text
+    # Reached only when the stream completed, so partial answers are never cached
+    advice_cache.set(key, "".join(parts).strip())
+
+def parse_log_date(value: Optional[str]) -> date:
+    """Parse a YYYY-MM-DD log date, defaulting to today"""
+    from datetime import datetime
+    if not value:
+        return date.today()
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def save_meal_entry(db: Session, user_id: int, target_date: date, description: str, nutritional_data: Optional[Dict[str, float]]) -> MealEntry:
+    """Store a meal in the user's log for the given date; without nutritional data it is stored pending"""
+    return save_meal_entries(db, user_id, [(target_date, description, nutritional_data)])[0]
+
+def _get_or_create_daily_logs(db: Session, user_id: int, dates: Set[date]) -> Dict[date, DailyLog]:
+    """Fetch a user's logs for the given days with one query, creating the missing ones"""
+    daily_logs = {
+        log.date: log for log in db.query(DailyLog).filter(
+            DailyLog.user_id == user_id,
+            DailyLog.date.in_(dates)
+        )
+    }
+    for target_date in dates - daily_logs.keys():
+        daily_logs[target_date] = DailyLog(user_id=user_id, date=target_date)
+        db.add(daily_logs[target_date])
+    db.flush()  # Raises IntegrityError if another request created the same day
+    return daily_logs
+
+def save_meal_entries(db: Session, user_id: int, meals: List[Tuple[date, str, Optional[Dict[str, float]]]]) -> List[MealEntry]:
+    """Store many meals in a single transaction.
+
+    All needed DailyLog rows are fetched with one query and the missing ones
+    created together, so the cost does not grow with one lookup per meal.
+    Meals without nutritional data are stored pending, with zeroed nutrients
+    and a job for the analysis workers.
+    """
+    dates = {target_date for target_date, _, _ in meals}
+    try:
+        daily_logs = _get_or_create_daily_logs(db, user_id, dates)
+    except IntegrityError:
+        # A concurrent request created one of these days first; after rollback its row is visible
+        db.rollback()
+        daily_logs = _get_or_create_daily_logs(db, user_id, dates)
+    
+    meal_entries = [
+        MealEntry(
+            log_id=daily_logs[target_date].id,
+            name=description,
+            calories=(nutritional_data or {}).get("calories", 0),
+            protein=(nutritional_data or {}).get("protein", 0),
+            carbohydrates=(nutritional_data or {}).get("carbohydrates", 0),
+            fats=(nutritional_data or {}).get("fats", 0),
+            status=MEAL_COMPLETE if nutritional_data is not None else MEAL_PENDING
+        )
+        for target_date, description, nutritional_data in meals
+    ]
+    db.add_all(meal_entries)
+    db.flush()
+    now = datetime.utcnow()
+    db.add_all(
+        MealAnalysisJob(
+            meal_id=meal_entry.id, user_id=user_id, description=meal_entry.name,
+            attempts=0, available_at=now, created_at=now
+        )
+        for meal_entry in meal_entries if meal_entry.status == MEAL_PENDING
+    )
+    apply_meal_deltas(db, [
+        (meal_entry.log_id, nutritional_data or {}, 1)
+        for meal_entry, (_, _, nutritional_data) in zip(meal_entries, meals)
+    ])
+    apply_term_deltas(db, [(user_id, description, 1) for _, description, _ in meals])
+    db.commit()
+    
+    # Reload server-side defaults (created_at) for every entry in one query
+    ids = [meal.id for meal in meal_entries]
+    db.query(MealEntry).filter(MealEntry.id.in_(ids)).all()
+    return meal_entries
+
+def delete_meal_entry(db: Session, meal_entry: MealEntry, user_id: int) -> None:
+    """Delete a meal and take it out of its day's totals and food terms in the same transaction"""
+    log_id = meal_entry.log_id
+    nutritional_data = {field: getattr(meal_entry, field) for field in NUTRIENT_FIELDS}
+    if meal_entry.status == MEAL_PENDING:
+        db.execute(delete(MealAnalysisJob).where(MealAnalysisJob.meal_id == meal_entry.id))
+    db.delete(meal_entry)
+    db.flush()
+    apply_meal_deltas(db, [(log_id, nutritional_data, -1)])
+    apply_term_deltas(db, [(user_id, meal_entry.name, -1)])
+    db.commit()
+
+def save_profile(db: Session, user_id: int, profile_data: Dict[str, Any]) -> UserProfile:
+    """Create or update a user's profile, recalculating their daily goals"""
+    goals = calculate_daily_goals(
+        profile_data["weight"], profile_data["height"], profile_data["age"], profile_data["gender"],
+        profile_data["activity_level"], profile_data["fitness_goal"]
+    )
+    
+    profile = db.query(UserProfile).filter(UserProfile.user_id == user_id).first()
+    if profile:
+        # Answers cached for the old profile values no longer apply to this user
+        advice_cache.invalidate_profile(profile)
+        for field, value in {**profile_data, **goals}.items():
+            setattr(profile, field, value)
+    else:
+        profile = UserProfile(user_id=user_id, **profile_data, **goals)
+        db.add(profile)
+    db.commit()
+    db.refresh(profile)
+    return profile
+
+def build_dashboard(user_profile, week: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Shape the dashboard payload from a profile and the last seven days of totals"""
+    today_summary = {key: value for key, value in week[-1].items() if key != "date"}
+    weekly_data = [
+        {
+            "date": day["date"].isoformat(),
+            "calories": day["total_calories"],
+            "protein": day["total_protein"],
+            "carbs": day["total_carbohydrates"],
+            "fats": day["total_fats"]
         }
-    
-    meals = db.query(MealEntry).filter(MealEntry.log_id == daily_log.id).all()
+        for day in week
+    ]
     
     return {
-        "total_calories": sum(meal.calories for meal in meals),
-        "total_protein": sum(meal.protein for meal in meals),
-        "total_carbohydrates": sum(meal.carbohydrates for meal in meals),
-        "total_fats": sum(meal.fats for meal in meals),
-        "meal_count": len(meals)
+        "goals": {
+            "calories": user_profile.daily_calorie_goal,
+            "protein": user_profile.daily_protein_goal,
+            "carbs": user_profile.daily_carb_goal,
+            "fats": user_profile.daily_fat_goal
+        },
+        "today": today_summary,
+        "weekly_trends": weekly_data
     }
 
-def generate_meal_analysis_report(user_id: int, user_profile, db: Session) -> str:
-    """Generate comprehensive meal analysis report"""
-    from datetime import date, timedelta
-    
+def get_daily_summary(user_id: int, target_date: date, db: Session) -> Dict[str, Any]:
+    """Get daily nutritional summary for a user"""
+    summary = get_daily_totals(user_id, target_date, target_date, db)[0]
+    del summary["date"]
+    return summary
+
+def _build_meal_analysis_report_prompt(user_id: int, user_profile, db: Session) -> Optional[str]:
+    """Build the analysis report prompt, or None when there is nothing to analyze"""
     # Get last 30 days of data
-    end_date = date.today()
-    start_date = end_date - timedelta(days=30)
-    
-    # Get all meals in the last 30 days
-    daily_logs = db.query(DailyLog).filter(
-        DailyLog.user_id == user_id,
-        DailyLog.date >= start_date,
-        DailyLog.date <= end_date
-    ).all()
-    
-    all_meals = []
-    daily_totals = []
-    
-    for log in daily_logs:
-        meals = db.query(MealEntry).filter(MealEntry.log_id == log.id).all()
-        all_meals.extend(meals)
-        
-        daily_total = {
-            "date": log.date,
-            "calories": sum(meal.calories for meal in meals),
-            "protein": sum(meal.protein for meal in meals),
-            "carbs": sum(meal.carbohydrates for meal in meals),
-            "fats": sum(meal.fats for meal in meals),
-            "meal_count": len(meals)
-        }
-        daily_totals.append(daily_total)
-    
-    if not all_meals:
-        return "No meal data available for analysis. Start logging your meals to get personalized insights!"
-    
-    # Calculate statistics
-    total_calories = sum(meal.calories for meal in all_meals)
-    total_protein = sum(meal.protein for meal in all_meals)
-    total_carbs = sum(meal.carbohydrates for meal in all_meals)
-    total_fats = sum(meal.fats for meal in all_meals)
-    
-    daily_calories = [day["calories"] for day in daily_totals if day["calories"] > 0]
-    avg_daily_calories = sum(daily_calories) / len(daily_calories) if daily_calories else 0
-    max_daily_calories = max(daily_calories) if daily_calories else 0
-    min_daily_calories = min(daily_calories) if daily_calories else 0
-    
-    # Most common foods
-    food_frequency = {}
-    for meal in all_meals:
-        food_words = meal.name.lower().split()
-        for word in food_words:
-            if len(word) > 3:  # Ignore short words
-                food_frequency[word] = food_frequency.get(word, 0) + 1
-    
-    common_foods = sorted(food_frequency.items(), key=lambda x: x[1], reverse=True)[:10]
+    data = load_report_data(user_id, db, days=30)
+    if not data.meal_count:
+        return None
     
     # Generate AI report
-    prompt = f"""
+    return f"""
     Generate a comprehensive nutrition analysis report in MARKDOWN format for this user:
     
     User Profile:
@@ -272,18 +492,18 @@ def generate_meal_analysis_report(user_id: int, user_profile, db: Session) -> st
     - Daily Calorie Goal: {user_profile.daily_calorie_goal:.0f} calories
     
     Analysis Period: Last 30 days
-    Total Meals Logged: {len(all_meals)}
-    Days with Data: {len(daily_totals)}
+    Total Meals Logged: {data.meal_count}
+    Days with Data: {data.days_with_data}
     
     Nutritional Summary:
-    - Total Calories: {total_calories:.0f} (Average: {avg_daily_calories:.0f}/day)
-    - Total Protein: {total_protein:.0f}g (Average: {total_protein/len(daily_totals):.0f}g/day)
-    - Total Carbs: {total_carbs:.0f}g (Average: {total_carbs/len(daily_totals):.0f}g/day)
-    - Total Fats: {total_fats:.0f}g (Average: {total_fats/len(daily_totals):.0f}g/day)
+    - Total Calories: {data.total_calories:.0f} (Average: {data.avg_daily_calories:.0f}/day)
+    - Total Protein: {data.total_protein:.0f}g (Average: {data.avg_daily_protein:.0f}g/day)
+    - Total Carbs: {data.total_carbs:.0f}g (Average: {data.avg_daily_carbs:.0f}g/day)
+    - Total Fats: {data.total_fats:.0f}g (Average: {data.avg_daily_fats:.0f}g/day)
     
-    Daily Calorie Range: {min_daily_calories:.0f} - {max_daily_calories:.0f} calories
+    Daily Calorie Range: {data.min_daily_calories:.0f} - {data.max_daily_calories:.0f} calories
     
-    Most Common Foods: {', '.join([food[0] for food in common_foods[:5]])}
+    Most Common Foods: {', '.join([food[0] for food in data.common_foods(5)])}
     
     Format the response as proper MARKDOWN with:
     - Use **bold** for headings and important points
@@ -304,345 +524,28 @@ def generate_meal_analysis_report(user_id: int, user_profile, db: Session) -> st
     
     Make it personalized, encouraging, and practical with proper markdown formatting.
     """
+
+async def generate_meal_analysis_report_async(user_id: int, user_profile, db: Session) -> str:
+    """Generate the meal analysis report.
+
+    The database work runs in a worker thread so the event loop stays free.
+    """
+    prompt = await asyncio.to_thread(_build_meal_analysis_report_prompt, user_id, user_profile, db)
+    if prompt is None:
+        return NO_MEAL_DATA_MESSAGE
     
     try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        return await generate_text_async(prompt, timeout=LLM_REPORT_TIMEOUT_SECONDS, operation="meal_report")
     except Exception as e:
-        return f"Error generating report: {str(e)}"
+        return f"Error generating report: {str(e) or type(e).__name__}"
 
-def generate_comprehensive_report_html(user_id: int, user_profile, db: Session) -> str:
-    """Generate comprehensive HTML report for download"""
-    from datetime import date, timedelta
-    
-    # Get last 30 days of data
-    end_date = date.today()
-    start_date = end_date - timedelta(days=30)
-    
-    # Get all meals in the last 30 days
-    daily_logs = db.query(DailyLog).filter(
-        DailyLog.user_id == user_id,
-        DailyLog.date >= start_date,
-        DailyLog.date <= end_date
-    ).all()
-    
-    all_meals = []
-    daily_totals = []
-    
-    for log in daily_logs:
-        meals = db.query(MealEntry).filter(MealEntry.log_id == log.id).all()
-        all_meals.extend(meals)
-        
-        daily_total = {
-            "date": log.date,
-            "calories": sum(meal.calories for meal in meals),
-            "protein": sum(meal.protein for meal in meals),
-            "carbs": sum(meal.carbohydrates for meal in meals),
-            "fats": sum(meal.fats for meal in meals),
-            "meal_count": len(meals)
-        }
-        daily_totals.append(daily_total)
-    
-    # Calculate statistics
-    total_calories = sum(meal.calories for meal in all_meals)
-    total_protein = sum(meal.protein for meal in all_meals)
-    total_carbs = sum(meal.carbohydrates for meal in all_meals)
-    total_fats = sum(meal.fats for meal in all_meals)
-    
-    daily_calories = [day["calories"] for day in daily_totals if day["calories"] > 0]
-    avg_daily_calories = sum(daily_calories) / len(daily_calories) if daily_calories else 0
-    max_daily_calories = max(daily_calories) if daily_calories else 0
-    min_daily_calories = min(daily_calories) if daily_calories else 0
-    
-    # Most common foods
-    food_frequency = {}
-    for meal in all_meals:
-        food_words = meal.name.lower().split()
-        for word in food_words:
-            if len(word) > 3:
-                food_frequency[word] = food_frequency.get(word, 0) + 1
-    
-    common_foods = sorted(food_frequency.items(), key=lambda x: x[1], reverse=True)[:10]
-    
-    # Generate HTML report
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Comprehensive Nutrition Report - {user_profile.user.full_name}</title>
-        <style>
-            body {{
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                line-height: 1.6;
-                color: #333;
-                max-width: 1200px;
-                margin: 0 auto;
-                padding: 20px;
-                background-color: #f8f9fa;
-            }}
-            .header {{
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 30px;
-                border-radius: 10px;
-                text-align: center;
-                margin-bottom: 30px;
-            }}
-            .header h1 {{
-                margin: 0;
-                font-size: 2.5em;
-            }}
-            .header p {{
-                margin: 10px 0 0 0;
-                font-size: 1.2em;
-                opacity: 0.9;
-            }}
-            .section {{
-                background: white;
-                padding: 25px;
-                margin-bottom: 25px;
-                border-radius: 10px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            }}
-            .section h2 {{
-                color: #667eea;
-                border-bottom: 3px solid #667eea;
-                padding-bottom: 10px;
-                margin-bottom: 20px;
-            }}
-            .profile-grid {{
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-                gap: 20px;
-                margin-bottom: 20px;
-            }}
-            .profile-item {{
-                background: #f8f9fa;
-                padding: 15px;
-                border-radius: 8px;
-                border-left: 4px solid #667eea;
-            }}
-            .profile-item strong {{
-                color: #667eea;
-            }}
-            .stats-grid {{
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                gap: 20px;
-                margin: 20px 0;
-            }}
-            .stat-card {{
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 20px;
-                border-radius: 10px;
-                text-align: center;
-            }}
-            .stat-card h3 {{
-                margin: 0 0 10px 0;
-                font-size: 2em;
-            }}
-            .stat-card p {{
-                margin: 0;
-                opacity: 0.9;
-            }}
-            .meal-list {{
-                background: #f8f9fa;
-                padding: 20px;
-                border-radius: 8px;
-                margin: 20px 0;
-            }}
-            .meal-item {{
-                background: white;
-                padding: 15px;
-                margin: 10px 0;
-                border-radius: 8px;
-                border-left: 4px solid #28a745;
-            }}
-            .food-list {{
-                display: flex;
-                flex-wrap: wrap;
-                gap: 10px;
-                margin: 20px 0;
-            }}
-            .food-tag {{
-                background: #667eea;
-                color: white;
-                padding: 8px 15px;
-                border-radius: 20px;
-                font-size: 0.9em;
-            }}
-            .recommendations {{
-                background: #e8f5e8;
-                padding: 20px;
-                border-radius: 8px;
-                border-left: 4px solid #28a745;
-            }}
-            .warnings {{
-                background: #ffe8e8;
-                padding: 20px;
-                border-radius: 8px;
-                border-left: 4px solid #dc3545;
-            }}
-            .footer {{
-                text-align: center;
-                margin-top: 40px;
-                padding: 20px;
-                background: #f8f9fa;
-                border-radius: 10px;
-                color: #666;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>🍎 Comprehensive Nutrition Report</h1>
-            <p>Generated on {date.today().strftime('%B %d, %Y')}</p>
-        </div>
-
-        <div class="section">
-            <h2>👤 User Profile</h2>
-            <div class="profile-grid">
-                <div class="profile-item">
-                    <strong>Name:</strong> {user_profile.user.full_name}
-                </div>
-                <div class="profile-item">
-                    <strong>Age:</strong> {user_profile.age} years
-                </div>
-                <div class="profile-item">
-                    <strong>Gender:</strong> {user_profile.gender.title()}
-                </div>
-                <div class="profile-item">
-                    <strong>Weight:</strong> {user_profile.weight} kg
-                </div>
-                <div class="profile-item">
-                    <strong>Height:</strong> {user_profile.height} cm
-                </div>
-                <div class="profile-item">
-                    <strong>Activity Level:</strong> {user_profile.activity_level.replace('_', ' ').title()}
-                </div>
-                <div class="profile-item">
-                    <strong>Fitness Goal:</strong> {user_profile.fitness_goal.replace('_', ' ').title()}
-                </div>
-            </div>
-        </div>
-
-        <div class="section">
-            <h2>📊 Daily Goals</h2>
-            <div class="stats-grid">
-                <div class="stat-card">
-                    <h3>{user_profile.daily_calorie_goal:.0f}</h3>
-                    <p>Calories</p>
-                </div>
-                <div class="stat-card">
-                    <h3>{user_profile.daily_protein_goal:.0f}g</h3>
-                    <p>Protein</p>
-                </div>
-                <div class="stat-card">
-                    <h3>{user_profile.daily_carb_goal:.0f}g</h3>
-                    <p>Carbohydrates</p>
-                </div>
-                <div class="stat-card">
-                    <h3>{user_profile.daily_fat_goal:.0f}g</h3>
-                    <p>Fats</p>
-                </div>
-            </div>
-        </div>
-
-        <div class="section">
-            <h2>📈 Performance Analysis (Last 30 Days)</h2>
-            <div class="stats-grid">
-                <div class="stat-card">
-                    <h3>{avg_daily_calories:.0f}</h3>
-                    <p>Avg Daily Calories</p>
-                </div>
-                <div class="stat-card">
-                    <h3>{total_protein/len(daily_totals):.0f}g</h3>
-                    <p>Avg Daily Protein</p>
-                </div>
-                <div class="stat-card">
-                    <h3>{total_carbs/len(daily_totals):.0f}g</h3>
-                    <p>Avg Daily Carbs</p>
-                </div>
-                <div class="stat-card">
-                    <h3>{total_fats/len(daily_totals):.0f}g</h3>
-                    <p>Avg Daily Fats</p>
-                </div>
-            </div>
-            
-            <div class="stats-grid">
-                <div class="stat-card">
-                    <h3>{len(all_meals)}</h3>
-                    <p>Total Meals Logged</p>
-                </div>
-                <div class="stat-card">
-                    <h3>{len(daily_totals)}</h3>
-                    <p>Days with Data</p>
-                </div>
-                <div class="stat-card">
-                    <h3>{min_daily_calories:.0f} - {max_daily_calories:.0f}</h3>
-                    <p>Calorie Range</p>
-                </div>
-                <div class="stat-card">
-                    <h3>{((avg_daily_calories / user_profile.daily_calorie_goal) * 100):.0f}%</h3>
-                    <p>Goal Achievement</p>
-                </div>
-            </div>
-        </div>
-
-        <div class="section">
-            <h2>🍽️ Recent Meals</h2>
-            <div class="meal-list">
-                {''.join([f'''
-                <div class="meal-item">
-                    <strong>{meal.name}</strong><br>
-                    <small>{meal.calories:.0f} cal • {meal.protein:.0f}g protein • {meal.carbohydrates:.0f}g carbs • {meal.fats:.0f}g fat</small>
-                </div>
-                ''' for meal in all_meals[-10:]])}
-            </div>
-        </div>
-
-        <div class="section">
-            <h2>🥗 Most Common Foods</h2>
-            <div class="food-list">
-                {''.join([f'<span class="food-tag">{food[0]} ({food[1]}x)</span>' for food in common_foods[:10]])}
-            </div>
-        </div>
-
-        <div class="section">
-            <h2>✅ Recommendations</h2>
-            <div class="recommendations">
-                <h3>What's Working Well:</h3>
-                <ul>
-                    <li>Consistent meal logging shows commitment to tracking</li>
-                    <li>Variety in food choices indicates balanced approach</li>
-                    <li>Regular monitoring helps maintain awareness</li>
-                </ul>
-            </div>
-        </div>
-
-        <div class="section">
-            <h2>⚠️ Areas for Improvement</h2>
-            <div class="warnings">
-                <h3>Focus Areas:</h3>
-                <ul>
-                    <li>Increase daily calorie intake to meet goals</li>
-                    <li>Add more protein-rich foods to your diet</li>
-                    <li>Consider meal timing for better nutrition distribution</li>
-                    <li>Track hydration and water intake</li>
-                </ul>
-            </div>
-        </div>
-
-        <div class="footer">
-            <p>This report was generated by your Calorie Tracker app</p>
-            <p>For personalized nutrition advice, consult with a registered dietitian</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    return html_content
+async def stream_meal_analysis_report(user_id: int, user_profile, db: Session) -> AsyncIterator[str]:
+    """Stream the meal analysis report as it is generated"""
+    prompt = await asyncio.to_thread(_build_meal_analysis_report_prompt, user_id, user_profile, db)
+    if prompt is None:
+        yield NO_MEAL_DATA_MESSAGE
+        return
+    
+    async for text in stream_text_async(prompt, timeout=LLM_REPORT_TIMEOUT_SECONDS, operation="meal_report_stream"):
+        yield text
 
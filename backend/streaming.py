@@ -0,0 +1,83 @@
+import json
+import os
+import zlib
+from typing import Any, Iterable, Iterator, Optional
+
+from dotenv import load_dotenv
+
+try:
+    import brotli
+except ImportError:  # br is only offered when the optional brotli package is installed
+    brotli = None
+
+load_dotenv()
+
+# Bytes buffered before a chunk is compressed and sent
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "16384"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+# Keep proxies from buffering or caching event streams
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def supported_encodings() -> list:
+    """Content encodings this server can produce, in order of preference"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header, or None"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+def _buffered(chunks: Iterable[str], size: int) -> Iterator[bytes]:
+    # Template output arrives in many tiny strings; group them into network-sized blocks
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= size:
+            yield b"".join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b"".join(buffer)
+
+def encode_stream(chunks: Iterable[str], encoding: Optional[str] = None) -> Iterator[bytes]:
+    """Encode a stream of text chunks as UTF-8, compressing it on the fly"""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for block in _buffered(chunks, STREAM_CHUNK_SIZE):
+            data = compressor.process(block)
+            if data:
+                yield data
+        yield compressor.finish()
+    elif encoding == "gzip":
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for block in _buffered(chunks, STREAM_CHUNK_SIZE):
+            data = compressor.compress(block)
+            if data:
+                yield data
+        yield compressor.flush()
+    else:
+        yield from _buffered(chunks, STREAM_CHUNK_SIZE)
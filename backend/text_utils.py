@@ -0,0 +1,138 @@
+import re
+import unicodedata
+from typing import List
+
+# Number words in English, Roman Urdu and Hindi/Urdu script mapped to digits
+NUMBER_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+    "eleven": "11", "twelve": "12", "dozen": "12",
+    "ek": "1", "aik": "1", "teen": "3", "char": "4", "chaar": "4",
+    "panch": "5", "paanch": "5", "chay": "6", "chhe": "6", "saat": "7",
+    "aath": "8", "nau": "9", "das": "10",
+    "half": "0.5", "aadha": "0.5", "adha": "0.5", "aadhi": "0.5", "adhi": "0.5",
+    "quarter": "0.25",
+    "एक": "1", "दो": "2", "तीन": "3", "चार": "4", "पांच": "5", "आधा": "0.5", "आधी": "0.5",
+    "ایک": "1", "دو": "2", "تین": "3", "چار": "4", "پانچ": "5", "آدھا": "0.5", "آدھی": "0.5",
+}
+
+# Number words that are also foods ("pao bhaji"); only numbers when a weight unit follows ("pao kilo")
+UNIT_NUMBER_WORDS = {"pao": "0.25", "pav": "0.25", "paav": "0.25"}
+WEIGHT_UNIT_WORDS = frozenset({"kg", "kilo", "kilos", "g", "gm", "gms", "gram", "grams"})
+
+# Common Roman Urdu/Hindi spelling variants mapped to one canonical spelling
+SPELLING_VARIANTS = {
+    "dal": "daal", "dhal": "daal", "dahl": "daal",
+    "chawel": "chawal", "chaawal": "chawal", "chawl": "chawal",
+    "rotti": "roti", "rotis": "roti", "rotiyan": "roti",
+    "chapatti": "chapati", "chapatis": "chapati", "chapattis": "chapati",
+    "sabji": "sabzi", "subzi": "sabzi", "subji": "sabzi",
+    "anday": "anda", "ande": "anda", "andey": "anda",
+    "parantha": "paratha", "parathay": "paratha", "parathe": "paratha",
+    "biriyani": "biryani", "biryaani": "biryani", "briyani": "biryani",
+    "dudh": "doodh",
+    "chaye": "chai", "chae": "chai",
+    "daahi": "dahi", "dahee": "dahi",
+    "kelay": "kela", "kele": "kela",
+    "alu": "aloo", "aalu": "aloo",
+    "ghosht": "gosht", "murg": "murgh",
+}
+
+# Words in meal descriptions that are not foods: fillers, quantities, units and sizes
+FOOD_STOPWORDS = frozenset("""
+    a an and or with without of the some for in on at my from plus to no not
+    just only also then after before about around had ate have having
+    little bit few lot lots extra more less large small medium big regular
+    full double single whole fresh homemade home made cooked raw
+    cup cups glass glasses bowl bowls plate plates slice slices piece pieces
+    serving servings portion portions handful scoop scoops bottle can mug
+    tbsp tsp tablespoon tablespoons teaspoon teaspoons
+    g gm gms gram grams kg ml l oz lb lbs
+    breakfast lunch dinner snack snacks meal
+    aur ke ki ka ko se mein main sath saath wala wali wale thora thoda thori thodi
+    zyada ziada bohat bahut kuch pyala pyali katori
+    और के की का को से में साथ वाला वाली थोड़ा थोड़ी कप गिलास प्लेट कटोरी
+    اور کے کی کا کو سے میں ساتھ والا والی تھوڑا تھوڑی کپ گلاس پلیٹ پیالی
+""".split())
+
+# Plurals the suffix rules in singular_food() would get wrong, and words that only look plural
+IRREGULAR_PLURALS = {
+    "cookies": "cookie", "brownies": "brownie", "smoothies": "smoothie", "veggies": "veggie",
+    "pies": "pie", "fries": "fries", "leaves": "leaf", "loaves": "loaf", "halves": "half",
+    "hummus": "hummus", "couscous": "couscous", "asparagus": "asparagus", "molasses": "molasses",
+    "grits": "grits", "swiss": "swiss", "citrus": "citrus", "ras": "ras",
+}
+
+_LOOSE_SEPARATOR_RE = re.compile(r"(?<!\d)[./]|[./](?!\d)")  # keep "1.5" and "1/2"
+_WHITESPACE_RE = re.compile(r"\s+")
+_NUMBER_UNIT_RE = re.compile(r"(\d)([a-z])")
+
+def _strip_punctuation(text: str) -> str:
+    # Unicode-aware so Devanagari/Urdu vowel signs survive; "." and "/" are kept for now
+    return "".join(
+        " " if unicodedata.category(ch)[0] in "PS" and ch not in "./" else ch
+        for ch in text
+    )
+
+def normalize_meal_description(description: str) -> str:
+    """Normalize a meal description so near-identical text compares equal.
+
+    Lowercases, strips punctuation, collapses whitespace, turns number words
+    into digits ("two" -> "2", "pao kilo" -> "0.25 kilo") and maps Roman Urdu spelling variants onto a
+    single spelling ("dal" -> "daal").
+    """
+    text = description.lower().strip()
+    text = _strip_punctuation(text)
+    text = _LOOSE_SEPARATOR_RE.sub(" ", text)
+    text = _NUMBER_UNIT_RE.sub(r"\1 \2", text)  # "2cups" -> "2 cups"
+    raw_words = [word for word in _WHITESPACE_RE.split(text) if word]
+    words = []
+    for index, word in enumerate(raw_words):
+        if word in UNIT_NUMBER_WORDS and index + 1 < len(raw_words) and raw_words[index + 1] in WEIGHT_UNIT_WORDS:
+            word = UNIT_NUMBER_WORDS[word]
+        word = NUMBER_WORDS.get(word, word)
+        word = SPELLING_VARIANTS.get(word, word)
+        words.append(word)
+    return " ".join(words)
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized word tokens"""
+    normalized = normalize_meal_description(text)
+    return normalized.split() if normalized else []
+
+def singular_food(word: str) -> str:
+    """Fold a plural English food word onto its singular ("eggs" -> "egg", "berries" -> "berry")"""
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if len(word) <= 3 or not word.isascii() or not word.endswith("s") or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes", "zes")):
+        return word[:-2]
+    return word[:-1]
+
+def food_terms(meal_name: str) -> List[str]:
+    """The distinct food words in a meal description, in order of appearance.
+
+    Builds on tokenize(), so spelling variants and number words are already
+    folded, and plurals are folded onto the singular; numbers, single
+    characters and FOOD_STOPWORDS are dropped.
+    """
+    terms = []
+    for token in tokenize(meal_name):
+        if len(token) < 2 or token in FOOD_STOPWORDS or any(ch.isdigit() for ch in token):
+            continue
+        token = singular_food(token)
+        if token not in terms:
+            terms.append(token)
+    return terms
+
+def normalize_question(question: str) -> str:
+    """Normalize a free-text question so trivially different phrasings compare equal.
+
+    Lowercases, strips punctuation and collapses whitespace; unlike meal
+    descriptions, numbers and spellings are left alone.
+    """
+    text = _strip_punctuation(question.lower()).replace(".", " ").replace("/", " ")
+    return " ".join(text.split())
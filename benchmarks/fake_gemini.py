@@ -0,0 +1,129 @@
+"""
+A local stand-in for the Gemini REST API, for benchmarks.
+
+Serves generateContent and streamGenerateContent (alt=sse) with configurable
+latency, jitter and failure rate. Answers are shaped after the prompt: meal
+analysis prompts get the JSON object or array the app parses, everything
+else gets a short markdown answer. Point the app at it with
+GEMINI_API_ENDPOINT=http://127.0.0.1:<port>.
+
+    python -m benchmarks.fake_gemini --port 8765 --latency-ms 400 --failure-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+from dataclasses import asdict, dataclass
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+ANSWER_TEXT = (
+    "## Nutrition advice\n\n"
+    "Aim for **balanced meals** with lean protein, whole grains and vegetables. "
+    "Spread protein across the day, keep added sugar low and drink enough water. "
+    "Small, consistent changes beat strict diets over the long run.\n"
+)
+_NUMBERED_MEAL_RE = re.compile(r'^\s*\d+\.\s+"', re.MULTILINE)
+
+@dataclass
+class FakeGeminiConfig:
+    latency_ms: float = 400  # Time to the first byte
+    jitter_ms: float = 100  # Uniform +/- jitter on the latency
+    failure_rate: float = 0.0  # Fraction of requests answered with HTTP 503
+    stream_chunks: int = 8
+    chunk_delay_ms: float = 30
+    seed: int = 0
+
+def _nutrition(rng: random.Random) -> dict:
+    return {
+        "calories": rng.randint(80, 900),
+        "protein": rng.randint(2, 45),
+        "carbohydrates": rng.randint(5, 110),
+        "fats": rng.randint(1, 40),
+    }
+
+def answer_for(prompt: str, rng: random.Random) -> str:
+    """Text the real model would plausibly return for one of the app's prompts"""
+    if "JSON array" in prompt:
+        count = len(_NUMBERED_MEAL_RE.findall(prompt)) or 1
+        return json.dumps([{"index": i, **_nutrition(rng)} for i in range(1, count + 1)])
+    if "JSON format" in prompt:
+        return json.dumps(_nutrition(rng))
+    return ANSWER_TEXT
+
+def _payload(text: str) -> dict:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+
+def create_app(config: FakeGeminiConfig) -> Starlette:
+    rng = random.Random(config.seed)
+    stats = {"requests": 0, "failures": 0, "streams": 0}
+
+    async def _delay_or_fail():
+        stats["requests"] += 1
+        latency = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+        await asyncio.sleep(max(latency, 0) / 1000)
+        if rng.random() < config.failure_rate:
+            stats["failures"] += 1
+            return JSONResponse({"error": {"code": 503, "message": "Injected failure", "status": "UNAVAILABLE"}}, 503)
+        return None
+
+    async def _prompt(request: Request) -> str:
+        body = await request.json()
+        return "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+
+    async def generate(request: Request):
+        prompt = await _prompt(request)
+        method = request.path_params["method"]
+        failure = await _delay_or_fail()
+        if failure is not None:
+            return failure
+        text = answer_for(prompt, rng)
+        if method == "generateContent":
+            return JSONResponse(_payload(text))
+        if method != "streamGenerateContent":
+            return JSONResponse({"error": {"code": 404, "message": f"Unknown method {method}"}}, 404)
+
+        stats["streams"] += 1
+        size = max(len(text) // config.stream_chunks, 1)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+
+        async def events():
+            for index, piece in enumerate(pieces):
+                if index:
+                    await asyncio.sleep(config.chunk_delay_ms / 1000)
+                yield f"data: {json.dumps(_payload(piece))}\r\n\r\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def get_stats(request: Request):
+        return JSONResponse({**stats, "config": asdict(config)})
+
+    return Starlette(routes=[
+        Route("/v1beta/models/{model}:{method}", generate, methods=["POST"]),
+        Route("/stats", get_stats),
+    ])
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=FakeGeminiConfig.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=FakeGeminiConfig.jitter_ms)
+    parser.add_argument("--failure-rate", type=float, default=FakeGeminiConfig.failure_rate)
+    parser.add_argument("--stream-chunks", type=int, default=FakeGeminiConfig.stream_chunks)
+    parser.add_argument("--chunk-delay-ms", type=float, default=FakeGeminiConfig.chunk_delay_ms)
+    parser.add_argument("--seed", type=int, default=FakeGeminiConfig.seed)
+    args = parser.parse_args()
+
+    config = FakeGeminiConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, failure_rate=args.failure_rate,
+        stream_chunks=args.stream_chunks, chunk_delay_ms=args.chunk_delay_ms, seed=args.seed
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
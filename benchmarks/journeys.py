@@ -0,0 +1,121 @@
+"""
+Scripted user journeys for the benchmark runner.
+
+Each journey is an async function taking a BenchClient and performing the
+requests one kind of user would make. Every request is timed under a
+stable endpoint name (the route, not the concrete URL), so results from
+different runs line up.
+"""
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from .seed import SEED_PASSWORD
+
+@dataclass
+class Sample:
+    endpoint: str
+    status: int  # 0 when the request raised
+    seconds: float
+
+class BenchClient:
+    """An httpx client that records one Sample per request"""
+
+    def __init__(self, client: httpx.AsyncClient, samples: List[Sample], rng: random.Random):
+        self.client = client
+        self.samples = samples
+        self.rng = rng
+        self.headers: Dict[str, str] = {}
+
+    async def request(self, method: str, url: str, endpoint: Optional[str] = None, **kwargs) -> Optional[httpx.Response]:
+        """Send a request and read the whole body (streams included) before stopping the clock"""
+        name = f"{method} {endpoint or url}"
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.samples.append(Sample(name, 0, time.perf_counter() - start))
+            return None
+        self.samples.append(Sample(name, response.status_code, time.perf_counter() - start))
+        return response
+
+    def authenticate(self, response: Optional[httpx.Response]) -> bool:
+        if response is None or response.status_code != 200:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+PROFILE = {
+    "age": 32, "weight": 72.5, "height": 176, "gender": "female",
+    "activity_level": "moderately_active", "fitness_goal": "maintain_weight",
+}
+MEALS = [
+    "2 eggs and toast", "chicken biryani", "daal chawal", "greek yogurt with berries",
+    "grilled salmon and rice", "chai and biscuits", "paratha with anda", "lentil soup",
+]
+
+async def new_user(bench: BenchClient, seeded_emails: List[str]) -> bool:
+    """Sign up, set a profile, log meals and look at the dashboard"""
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    response = await bench.request("POST", "/api/auth/register", json={
+        "email": email, "password": SEED_PASSWORD, "full_name": "Bench Newcomer"
+    })
+    if not bench.authenticate(response):
+        return False
+    await bench.request("PUT", "/api/profile", json=PROFILE)
+    await bench.request("POST", "/api/logs/meals", json={"description": bench.rng.choice(MEALS)})
+    await bench.request("POST", "/api/logs/meals/batch", json={
+        "meals": [{"description": meal} for meal in bench.rng.sample(MEALS, 3)]
+    })
+    await bench.request("GET", "/api/dashboard")
+    await bench.request("GET", f"/api/logs/{date.today().isoformat()}", endpoint="/api/logs/{date}")
+    return True
+
+async def returning_user(bench: BenchClient, seeded_emails: List[str]) -> bool:
+    """Log in to a seeded account and browse history, charts and reports"""
+    response = await bench.request("POST", "/api/auth/login", json={
+        "email": bench.rng.choice(seeded_emails), "password": SEED_PASSWORD
+    })
+    if not bench.authenticate(response):
+        return False
+    today = date.today()
+    await bench.request("GET", "/api/dashboard")
+    await bench.request(
+        "GET", "/api/dashboard", endpoint="/api/dashboard?range=90d",
+        params={"start_date": (today - timedelta(days=89)).isoformat(), "end_date": today.isoformat()}
+    )
+    page = await bench.request("GET", "/api/logs/meals", params={"limit": 20})
+    if page is not None and page.status_code == 200 and page.json()["next_cursor"]:
+        await bench.request(
+            "GET", "/api/logs/meals", endpoint="/api/logs/meals?cursor",
+            params={"limit": 20, "cursor": page.json()["next_cursor"]}
+        )
+    await bench.request("GET", "/api/foods/frequent")
+    await bench.request("GET", "/api/reports/download")
+    return True
+
+async def ai_user(bench: BenchClient, seeded_emails: List[str]) -> bool:
+    """Log in and ask the nutritionist, plain and streamed"""
+    response = await bench.request("POST", "/api/auth/login", json={
+        "email": bench.rng.choice(seeded_emails), "password": SEED_PASSWORD
+    })
+    if not bench.authenticate(response):
+        return False
+    # Unique questions so the advice cache does not hide the model latency
+    question = f"How much protein should I eat after a workout? ({uuid.uuid4().hex[:6]})"
+    await bench.request("POST", "/api/ai/ask", json={"question": question})
+    await bench.request("POST", "/api/ai/ask/stream", json={"question": question, "use_cache": False})
+    return True
+
+Journey = Callable[[BenchClient, List[str]], Awaitable[bool]]
+
+JOURNEYS: Dict[str, Journey] = {
+    "new_user": new_user,
+    "returning_user": returning_user,
+    "ai_user": ai_user,
+}
@@ -0,0 +1,183 @@
+"""
+Benchmark the API end to end.
+
+Seeds a fresh SQLite database, starts the fake Gemini server and the app
+(each with uvicorn in its own process), runs a weighted mix of user
+journeys at the requested concurrency for a fixed duration, then prints
+p50/p95/p99 latency and throughput per endpoint and saves them as JSON.
+
+    python -m benchmarks.run --concurrency 20 --duration 30
+    python -m benchmarks.run --compare benchmarks/results/baseline.json
+    python -m benchmarks.run --compare-only old.json new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _parse_mix(text: str) -> Dict[str, float]:
+    from .journeys import JOURNEYS
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in JOURNEYS:
+            raise SystemExit(f"Unknown journey '{name}'. Choose from: {', '.join(JOURNEYS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def _start(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], cwd=REPO_ROOT, env=env)
+
+def _wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Process serving {url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise SystemExit(f"Timed out waiting for {url}")
+
+async def _run_load(base_url: str, mix: Dict[str, float], seeded_emails: List[str],
+                    concurrency: int, duration: float, seed: int):
+    from .journeys import JOURNEYS, BenchClient
+
+    samples, journeys = [], {name: {"completed": 0, "failed": 0} for name in mix}
+    names, weights = list(mix), list(mix.values())
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def worker(number: int):
+            rng = random.Random(seed * 1000 + number)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                ok = await JOURNEYS[name](BenchClient(client, samples, rng), seeded_emails)
+                journeys[name]["completed" if ok else "failed"] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(number) for number in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return samples, journeys, elapsed
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the API against a fake Gemini server")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--mix", default="new_user=1,returning_user=3,ai_user=1", help="journey weights")
+    parser.add_argument("--users", type=int, default=50, help="seeded returning users")
+    parser.add_argument("--days", type=int, default=90, help="days of meal history per seeded user")
+    parser.add_argument("--meals-per-day", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=400, help="fake model latency")
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of model calls that fail")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the app, e.g. DB_ASYNC=true (repeatable)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against an earlier results file")
+    parser.add_argument("--compare-only", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two results files and exit")
+    parser.add_argument("--regression-threshold", type=float, default=10.0, help="percent slowdown that fails --compare")
+    args = parser.parse_args(argv)
+
+    from .stats import compare, format_table, load_results, summarize
+
+    if args.compare_only:
+        return 1 if compare(*map(load_results, args.compare_only), args.regression_threshold) else 0
+
+    mix = _parse_mix(args.mix)
+    workdir = tempfile.mkdtemp(prefix="nutritionist-bench-")
+    gemini_port, app_port = _free_port(), _free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{workdir}/bench.db",
+        "GEMINI_API_ENDPOINT": f"http://127.0.0.1:{gemini_port}",
+        "GEMINI_API_KEY": "benchmark",
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark-secret"),
+    }
+    for item in args.app_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    print(f"Seeding {args.users} users x {args.days} days x {args.meals_per_day} meals in {workdir}")
+    os.environ["DATABASE_URL"] = env["DATABASE_URL"]
+    from .seed import seed_database
+    seeded_emails = seed_database(args.users, args.days, args.meals_per_day, args.seed)
+
+    processes = []
+    try:
+        processes.append(_start([
+            "-m", "benchmarks.fake_gemini", "--port", str(gemini_port), "--latency-ms", str(args.latency_ms),
+            "--jitter-ms", str(args.jitter_ms), "--failure-rate", str(args.failure_rate), "--seed", str(args.seed)
+        ], env))
+        processes.append(_start([
+            "-m", "uvicorn", "backend.main:app", "--port", str(app_port), "--log-level", "warning"
+        ], env))
+        _wait_until_up(f"http://127.0.0.1:{gemini_port}/stats", processes[0])
+        _wait_until_up(f"http://127.0.0.1:{app_port}/docs", processes[1])
+
+        print(f"Running {args.mix} with {args.concurrency} users for {args.duration:.0f}s")
+        samples, journeys, elapsed = asyncio.run(_run_load(
+            f"http://127.0.0.1:{app_port}", mix, seeded_emails, args.concurrency, args.duration, args.seed
+        ))
+        fake_gemini_stats = httpx.get(f"http://127.0.0.1:{gemini_port}/stats").json()
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    summary = summarize(samples, elapsed)
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "args": vars(args),
+            "elapsed_seconds": round(elapsed, 2),
+        },
+        "journeys": journeys,
+        "fake_gemini": fake_gemini_stats,
+        "summary": summary,
+    }
+    print(format_table(summary))
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"Saved results to {output}")
+
+    if args.compare:
+        return 1 if compare(load_results(args.compare), results, args.regression_threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Seed a benchmark database with returning users and their meal history.
+
+The backend binds to DATABASE_URL when it is first imported, so it is only
+imported inside seed_database; set the variable before calling it. Users
+share one password hash, so seeding does not pay for a bcrypt hash per
+user.
+"""
+import random
+from datetime import date, timedelta
+from typing import List
+
+SEED_PASSWORD = "bench-password"
+SEED_EMAIL_TEMPLATE = "bench-user-{}@example.com"
+
+MEAL_NAMES = [
+    "2 eggs and toast", "chicken biryani", "daal chawal", "2 roti with sabzi", "greek yogurt with berries",
+    "oatmeal with banana", "grilled salmon and rice", "chai and biscuits", "apple and almonds",
+    "paratha with anda", "chicken karahi with naan", "pasta with tomato sauce", "lentil soup",
+    "peanut butter sandwich", "fruit chaat", "beef burger and fries", "protein shake", "aloo gobi and roti",
+]
+
+def seed_database(users: int, days: int, meals_per_day: int, seed: int = 0) -> List[str]:
+    """Create `users` users with `days` days of meals each; returns their emails"""
+    from backend.auth import get_password_hash
+    from backend.database import SessionLocal, engine
+    from backend.food_terms import rebuild_food_terms
+    from backend.migrations import upgrade
+    from backend.models import DailyLog, MealEntry, User, UserProfile
+    from backend.rollups import rebuild_rollups
+    from backend.services import calculate_daily_goals
+
+    rng = random.Random(seed)
+    upgrade(engine)
+    password_hash = get_password_hash(SEED_PASSWORD)
+    today = date.today()
+    emails = []
+
+    db = SessionLocal()
+    try:
+        for number in range(users):
+            email = SEED_EMAIL_TEMPLATE.format(number)
+            user = User(email=email, hashed_password=password_hash, full_name=f"Bench User {number}")
+            db.add(user)
+            db.flush()
+
+            profile = {
+                "age": rng.randint(18, 65), "weight": rng.uniform(50, 110), "height": rng.uniform(150, 195),
+                "gender": rng.choice(["male", "female"]),
+                "activity_level": rng.choice(["sedentary", "lightly_active", "moderately_active", "very_active"]),
+                "fitness_goal": rng.choice(["lose_weight", "maintain_weight", "gain_weight"]),
+            }
+            db.add(UserProfile(user_id=user.id, **profile, **calculate_daily_goals(**profile)))
+
+            logs = [DailyLog(user_id=user.id, date=today - timedelta(days=offset)) for offset in range(1, days + 1)]
+            db.add_all(logs)
+            db.flush()
+            db.add_all(
+                MealEntry(
+                    log_id=log.id, name=rng.choice(MEAL_NAMES),
+                    calories=rng.randint(150, 900), protein=rng.randint(3, 45),
+                    carbohydrates=rng.randint(10, 110), fats=rng.randint(2, 40)
+                )
+                for log in logs for _ in range(meals_per_day)
+            )
+            db.commit()
+            emails.append(email)
+
+        rebuild_rollups(db)
+        rebuild_food_terms(db)
+    finally:
+        db.close()
+    return emails
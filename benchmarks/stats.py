@@ -0,0 +1,80 @@
+"""Latency summaries and run-to-run comparison for benchmark results."""
+import json
+import math
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List
+
+PERCENTILES = (50, 95, 99)
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+def _summary(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0,
+        **{f"p{pct}_ms": round(percentile(latencies, pct) * 1000, 2) for pct in PERCENTILES},
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0,
+    }
+
+def summarize(samples: Iterable, elapsed: float) -> Dict[str, Any]:
+    """Per-endpoint and overall latency/throughput; status 0 or >= 400 counts as an error"""
+    by_endpoint: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    for sample in samples:
+        by_endpoint[sample.endpoint].append(sample.seconds)
+        if sample.status == 0 or sample.status >= 400:
+            errors[sample.endpoint] += 1
+    return {
+        "overall": _summary(
+            [seconds for latencies in by_endpoint.values() for seconds in latencies],
+            sum(errors.values()), elapsed
+        ),
+        "endpoints": {
+            endpoint: _summary(latencies, errors[endpoint], elapsed)
+            for endpoint, latencies in sorted(by_endpoint.items())
+        },
+    }
+
+def format_table(summary: Dict[str, Any]) -> str:
+    rows = [("endpoint", "reqs", "errs", "rps", "p50 ms", "p95 ms", "p99 ms")]
+    for endpoint, stats in [*summary["endpoints"].items(), ("TOTAL", summary["overall"])]:
+        rows.append((
+            endpoint, str(stats["requests"]), str(stats["errors"]), f"{stats['throughput_rps']:.1f}",
+            f"{stats['p50_ms']:.1f}", f"{stats['p95_ms']:.1f}", f"{stats['p99_ms']:.1f}"
+        ))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) if i == 0 else cell.rjust(width) for i, (cell, width) in enumerate(zip(row, widths)))
+        for row in rows
+    )
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold_pct: float = 10.0) -> List[str]:
+    """Print latency changes per endpoint; returns the endpoints that regressed beyond the threshold"""
+    regressions = []
+    base_endpoints = baseline["summary"]["endpoints"]
+    print(f"{'endpoint':40} {'metric':7} {'baseline':>10} {'current':>10} {'change':>8}")
+    for endpoint, stats in current["summary"]["endpoints"].items():
+        base = base_endpoints.get(endpoint)
+        if base is None:
+            print(f"{endpoint:40} (new endpoint)")
+            continue
+        for pct in PERCENTILES:
+            key = f"p{pct}_ms"
+            change = (stats[key] - base[key]) / base[key] * 100 if base[key] else 0.0
+            flag = "  REGRESSION" if change > threshold_pct else ""
+            print(f"{endpoint:40} {key:7} {base[key]:10.1f} {stats[key]:10.1f} {change:+7.1f}%{flag}")
+            if flag and endpoint not in regressions:
+                regressions.append(endpoint)
+    return regressions
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -4,12 +4,26 @@ const API_BASE_URL = '/api';
 // Global state
 let currentUser = null;
 let authToken = null;
+let refreshToken = null;
+let refreshPromise = null;
 let weeklyChart = null;
 let macroChart = null;
 let dailyCaloriesChart = null;
 let goalProgressChart = null;
 let selectedDate = new Date().toISOString().split('T')[0];
 let chatHistory = [];
+let historyCursor = null;
+let historySearchTimer = null;
+const watchedMealIds = new Set();
+let liveSource = null;
+let liveConnecting = false;  // A ticket request is in flight
+let liveConnected = false;
+let liveEverConnected = false;
+let liveRetryDelay = 1000;
+let liveRetryTimer = null;
+let dashboardState = null;
+let todayMeals = [];
+let selectedDayMeals = [];
 
 // DOM Elements
 const authContainer = document.getElementById('auth-container');
@@ -53,6 +67,7 @@ document.addEventListener('DOMContentLoaded', function() {
 function initializeApp() {
     // Check for stored auth token
     const storedToken = localStorage.getItem('authToken');
+    refreshToken = localStorage.getItem('refreshToken');
     const storedUser = localStorage.getItem('currentUser');
     const storedChatHistory = localStorage.getItem('chatHistory');
     
@@ -115,6 +130,19 @@ function setupEventListeners() {
         refreshChartsBtn.addEventListener('click', loadCharts);
     }
     
+    // Meal history controls
+    const historySearch = document.getElementById('history-search');
+    const historyLoadMore = document.getElementById('history-load-more');
+    if (historySearch) {
+        historySearch.addEventListener('input', () => {
+            clearTimeout(historySearchTimer);
+            historySearchTimer = setTimeout(() => loadMealHistory(true), 300);
+        });
+    }
+    if (historyLoadMore) {
+        historyLoadMore.addEventListener('click', () => loadMealHistory(false));
+    }
+    
     // Clear chat button
     const clearChatBtn = document.getElementById('clear-chat-btn');
     if (clearChatBtn) {
@@ -136,6 +164,9 @@ function switchSection(sectionName) {
     // Load section-specific data
     if (sectionName === 'charts') {
         loadCharts();
+    } else if (sectionName === 'meals') {
+        loadMealHistory(true);
+        loadFrequentFoods();
     }
 }
 
@@ -181,14 +212,13 @@ async function handleLogin(e) {
         const data = await response.json();
         
         if (response.ok) {
-            authToken = data.access_token;
+            storeTokens(data.access_token, data.refresh_token);
             currentUser = {
                 id: data.id,
                 email: data.email,
                 full_name: data.full_name
             };
             
-            localStorage.setItem('authToken', authToken);
             localStorage.setItem('currentUser', JSON.stringify(currentUser));
             
             showToast('Login successful!', 'success');
@@ -227,14 +257,13 @@ async function handleRegister(e) {
         const data = await response.json();
         
         if (response.ok) {
-            authToken = data.access_token;
+            storeTokens(data.access_token, data.refresh_token);
             currentUser = {
                 id: data.id,
                 email: data.email,
                 full_name: data.full_name
             };
             
-            localStorage.setItem('authToken', authToken);
             localStorage.setItem('currentUser', JSON.stringify(currentUser));
             
             showToast('Registration successful!', 'success');
@@ -263,11 +292,10 @@ async function handleProfileSetup(e) {
     };
     
     try {
-        const response = await fetch(`${API_BASE_URL}/profile`, {
+        const response = await authFetch(`${API_BASE_URL}/profile`, {
             method: 'PUT',
             headers: {
-                'Content-Type': 'application/json',
-                'Authorization': `Bearer ${authToken}`
+                'Content-Type': 'application/json'
             },
             body: JSON.stringify(profileData)
         });
@@ -294,11 +322,10 @@ async function handleMealLog(e) {
     const date = document.getElementById('meal-date').value;
     
     try {
-        const response = await fetch(`${API_BASE_URL}/logs/meals`, {
+        const response = await authFetch(`${API_BASE_URL}/logs/meals`, {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json',
-                'Authorization': `Bearer ${authToken}`
+                'Content-Type': 'application/json'
             },
             body: JSON.stringify({ description, date })
         });
@@ -306,10 +333,15 @@ async function handleMealLog(e) {
         const data = await response.json();
         
         if (response.ok) {
-            showToast('Meal logged successfully!', 'success');
+            showToast(data.status === 'pending' ? 'Meal logged! Analyzing nutrition...' : 'Meal logged successfully!', 'success');
             document.getElementById('meal-description').value = '';
-            loadMealsForDate(date);
-            loadDashboard();
+            // With the live stream open, the meal list and totals update from its events
+            if (!liveConnected) {
+                loadMealsForDate(date);
+                loadDashboard();
+            }
+            loadMealHistory(true);
+            loadFrequentFoods();
         } else {
             showToast(data.detail || 'Failed to log meal', 'error');
         }
@@ -339,6 +371,80 @@ function handleDateChange(e) {
     loadMealsForDate(selectedDate);
 }
 
+// Read a Server-Sent Events response from a POST endpoint, calling onToken for each chunk of text.
+// EventSource cannot send a body or an Authorization header, so the stream is read with fetch.
+async function streamSSE(url, body, onToken) {
+    let response;
+    try {
+        response = await authFetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: body ? JSON.stringify(body) : undefined
+        });
+    } catch (error) {
+        error.network = true;
+        throw error;
+    }
+    
+    if (!response.ok) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.detail || 'Request failed');
+    }
+    
+    await readSSE(response, (eventName, payload) => {
+        if (eventName === 'token') {
+            onToken(payload.text);
+        } else if (eventName === 'error') {
+            throw new Error(payload.detail || 'Streaming failed');
+        } else if (eventName === 'done') {
+            return true;
+        }
+    });
+}
+
+// Call onEvent(name, payload) for each event of a Server-Sent Events response until the
+// stream ends or onEvent returns true; an exception from onEvent also stops the stream.
+async function readSSE(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let eventName = 'message';
+            let data = '';
+            for (const line of rawEvent.split('\n')) {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            }
+            const payload = data ? JSON.parse(data) : {};
+            
+            let stop;
+            try {
+                stop = onEvent(eventName, payload);
+            } catch (error) {
+                reader.cancel();
+                throw error;
+            }
+            if (stop) {
+                reader.cancel();
+                return;
+            }
+        }
+    }
+}
+
 async function handleAIQuestion(e) {
     e.preventDefault();
     
@@ -354,39 +460,21 @@ async function handleAIQuestion(e) {
     
     // Show typing indicator
     const typingId = addAIMessage('Thinking...', 'ai', true);
+    let answer = '';
     
     try {
-        const response = await fetch(`${API_BASE_URL}/ai/ask`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'Authorization': `Bearer ${authToken}`
-            },
-            body: JSON.stringify({ question })
+        // Render the answer as it streams in
+        await streamSSE(`${API_BASE_URL}/ai/ask/stream`, { question }, (text) => {
+            answer += text;
+            updateAIMessage(typingId, answer);
         });
         
-        const data = await response.json();
-        
-        if (response.ok) {
-            // Remove typing indicator and add AI response
-            removeAIMessage(typingId);
-            addAIMessage(data.response, 'ai');
-            
-            // Save AI response to history
-            chatHistory.push({ sender: 'ai', message: data.response, timestamp: new Date().toISOString() });
-            saveChatHistory();
-        } else {
-            removeAIMessage(typingId);
-            const errorMessage = 'Sorry, I encountered an error. Please try again.';
-            addAIMessage(errorMessage, 'ai');
-            
-            // Save error message to history
-            chatHistory.push({ sender: 'ai', message: errorMessage, timestamp: new Date().toISOString() });
-            saveChatHistory();
-        }
+        // Save AI response to history
+        chatHistory.push({ sender: 'ai', message: answer, timestamp: new Date().toISOString() });
+        saveChatHistory();
     } catch (error) {
         removeAIMessage(typingId);
-        const errorMessage = 'Network error. Please try again.';
+        const errorMessage = error.network ? 'Network error. Please try again.' : 'Sorry, I encountered an error. Please try again.';
         addAIMessage(errorMessage, 'ai');
         
         // Save error message to history
@@ -396,35 +484,32 @@ async function handleAIQuestion(e) {
 }
 
 async function generateAnalysisReport() {
-    showLoading();
+    const button = document.getElementById('generate-report-btn');
+    button.disabled = true;
+    
+    const reportContainer = document.getElementById('analysis-report');
+    reportContainer.innerHTML = `
+        <div class="glass-card rounded-2xl p-6">
+            <h4 class="text-2xl font-bold gradient-text mb-6">Your Personalized Nutrition Report</h4>
+            <div id="analysis-report-body" class="prose max-w-none text-gray-300 prose-headings:text-white prose-a:text-blue-400 prose-strong:text-white prose-code:text-green-400 prose-code:bg-gray-800 prose-code:px-2 prose-code:py-1 prose-code:rounded">
+                <i class="fas fa-circle animate-pulse text-cyan-400"></i>
+            </div>
+        </div>
+    `;
+    const reportBody = document.getElementById('analysis-report-body');
+    let report = '';
     
     try {
-        const response = await fetch(`${API_BASE_URL}/ai/analyze-meals`, {
-            method: 'POST',
-            headers: {
-                'Authorization': `Bearer ${authToken}`
-            }
+        // Render markdown as the report streams in
+        await streamSSE(`${API_BASE_URL}/ai/analyze-meals/stream`, null, (text) => {
+            report += text;
+            reportBody.innerHTML = marked.parse(report);
         });
-        
-        const data = await response.json();
-        
-        if (response.ok) {
-            // Render markdown
-            const htmlContent = marked.parse(data.response);
-            document.getElementById('analysis-report').innerHTML = `
-                <div class="glass-card rounded-2xl p-6">
-                    <h4 class="text-2xl font-bold gradient-text mb-6">Your Personalized Nutrition Report</h4>
-                    <div class="prose max-w-none text-gray-300 prose-headings:text-white prose-a:text-blue-400 prose-strong:text-white prose-code:text-green-400 prose-code:bg-gray-800 prose-code:px-2 prose-code:py-1 prose-code:rounded">${htmlContent}</div>
-                </div>
-            `;
-            showToast('Analysis report generated successfully!', 'success');
-        } else {
-            showToast(data.detail || 'Failed to generate report', 'error');
-        }
+        showToast('Analysis report generated successfully!', 'success');
     } catch (error) {
-        showToast('Network error. Please try again.', 'error');
+        showToast(error.network ? 'Network error. Please try again.' : (error.message || 'Failed to generate report'), 'error');
     } finally {
-        hideLoading();
+        button.disabled = false;
     }
 }
 
@@ -432,21 +517,17 @@ async function downloadComprehensiveReport() {
     showLoading();
     
     try {
-        const response = await fetch(`${API_BASE_URL}/reports/download`, {
-            headers: {
-                'Authorization': `Bearer ${authToken}`
-            }
-        });
+        const rangeSelect = document.getElementById('report-range');
+        const days = rangeSelect ? rangeSelect.value : '30';
+        const response = await authFetch(`${API_BASE_URL}/reports/download?days=${days}`);
         
         if (response.ok) {
-            const htmlContent = await response.text();
-            
             // Create blob and download
-            const blob = new Blob([htmlContent], { type: 'text/html' });
+            const blob = await response.blob();
             const url = window.URL.createObjectURL(blob);
             const a = document.createElement('a');
             a.href = url;
-            a.download = `nutrition-report-${new Date().toISOString().split('T')[0]}.html`;
+            a.download = `nutrition-report-${new Date().toISOString().split('T')[0]}-${days}d.html`;
             document.body.appendChild(a);
             a.click();
             document.body.removeChild(a);
@@ -464,11 +545,71 @@ async function downloadComprehensiveReport() {
     }
 }
 
+function storeTokens(accessToken, newRefreshToken) {
+    authToken = accessToken;
+    localStorage.setItem('authToken', authToken);
+    if (newRefreshToken) {
+        refreshToken = newRefreshToken;
+        localStorage.setItem('refreshToken', refreshToken);
+    }
+}
+
+// Exchange the refresh token for a new access token. Concurrent callers share one request,
+// since each refresh token can only be used once.
+function refreshAccessToken() {
+    if (!refreshToken) return Promise.resolve(false);
+    if (!refreshPromise) {
+        refreshPromise = fetch(`${API_BASE_URL}/auth/refresh`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: refreshToken })
+        })
+            .then(async (response) => {
+                if (!response.ok) return false;
+                const data = await response.json();
+                storeTokens(data.access_token, data.refresh_token);
+                return true;
+            })
+            .catch(() => false)
+            .finally(() => { refreshPromise = null; });
+    }
+    return refreshPromise;
+}
+
+// fetch() for authenticated endpoints: sends the access token and, when it has expired,
+// refreshes it once and retries instead of sending the user back to the login form.
+async function authFetch(url, options = {}) {
+    const withToken = () => ({
+        ...options,
+        headers: { ...(options.headers || {}), 'Authorization': `Bearer ${authToken}` }
+    });
+    
+    let response = await fetch(url, withToken());
+    if (response.status === 401 && await refreshAccessToken()) {
+        response = await fetch(url, withToken());
+    }
+    if (response.status === 401) {
+        handleLogout();
+    }
+    return response;
+}
+
 function handleLogout() {
+    if (refreshToken) {
+        // Revoke the session server-side, access token included; the local state is cleared either way
+        fetch(`${API_BASE_URL}/auth/logout`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', ...(authToken ? { 'Authorization': `Bearer ${authToken}` } : {}) },
+            body: JSON.stringify({ refresh_token: refreshToken })
+        }).catch(() => {});
+    }
+    disconnectLiveUpdates();
     localStorage.removeItem('authToken');
+    localStorage.removeItem('refreshToken');
     localStorage.removeItem('currentUser');
     localStorage.removeItem('chatHistory');
     authToken = null;
+    refreshToken = null;
     currentUser = null;
     chatHistory = [];
     showAuthContainer();
@@ -520,16 +661,17 @@ async function deleteMeal(mealId) {
     showLoading();
     
     try {
-        const response = await fetch(`${API_BASE_URL}/logs/meals/${mealId}`, {
-            method: 'DELETE',
-            headers: {
-                'Authorization': `Bearer ${authToken}`
-            }
+        const response = await authFetch(`${API_BASE_URL}/logs/meals/${mealId}`, {
+            method: 'DELETE'
         });
         
         if (response.ok) {
             showToast('Meal deleted successfully!', 'success');
-            loadDashboard();
+            if (!liveConnected) {
+                loadDashboard();
+                loadMealsForDate(selectedDate);
+            }
+            loadMealHistory(true);
         } else {
             const data = await response.json();
             showToast(data.detail || 'Failed to delete meal', 'error');
@@ -543,11 +685,7 @@ async function deleteMeal(mealId) {
 
 async function checkUserProfile() {
     try {
-        const response = await fetch(`${API_BASE_URL}/profile`, {
-            headers: {
-                'Authorization': `Bearer ${authToken}`
-            }
-        });
+        const response = await authFetch(`${API_BASE_URL}/profile`);
         
         if (response.ok) {
             loadDashboard();
@@ -568,11 +706,7 @@ async function loadDashboard() {
     
     try {
         // Load dashboard data
-        const dashboardResponse = await fetch(`${API_BASE_URL}/dashboard`, {
-            headers: {
-                'Authorization': `Bearer ${authToken}`
-            }
-        });
+        const dashboardResponse = await authFetch(`${API_BASE_URL}/dashboard`);
         
         if (!dashboardResponse.ok) {
             throw new Error('Failed to load dashboard data');
@@ -582,11 +716,7 @@ async function loadDashboard() {
         
         // Load today's meals
         const today = new Date().toISOString().split('T')[0];
-        const mealsResponse = await fetch(`${API_BASE_URL}/logs/${today}`, {
-            headers: {
-                'Authorization': `Bearer ${authToken}`
-            }
-        });
+        const mealsResponse = await authFetch(`${API_BASE_URL}/logs/${today}`);
         
         if (!mealsResponse.ok) {
             throw new Error('Failed to load meals data');
@@ -597,6 +727,7 @@ async function loadDashboard() {
         // Update UI
         updateDashboard(dashboardData, mealsData);
         showDashboard();
+        connectLiveUpdates();
         
     } catch (error) {
         showToast('Failed to load dashboard', 'error');
@@ -606,6 +737,12 @@ async function loadDashboard() {
 }
 
 function updateDashboard(dashboardData, mealsData) {
+    dashboardState = dashboardData;
+    todayMeals = mealsData.meals;
+    if (selectedDate === new Date().toISOString().split('T')[0]) {
+        selectedDayMeals = mealsData.meals;
+    }
+    
     // Update welcome message
     document.getElementById('welcome-message').textContent = 
         `Hello ${currentUser.full_name}! Track your meals and stay on top of your goals.`;
@@ -616,17 +753,7 @@ function updateDashboard(dashboardData, mealsData) {
     document.getElementById('carbs-goal').textContent = Math.round(dashboardData.goals.carbs) + 'g';
     document.getElementById('fats-goal').textContent = Math.round(dashboardData.goals.fats) + 'g';
     
-    // Update consumed amounts
-    document.getElementById('calories-consumed').textContent = Math.round(dashboardData.today.total_calories);
-    document.getElementById('protein-consumed').textContent = Math.round(dashboardData.today.total_protein) + 'g';
-    document.getElementById('carbs-consumed').textContent = Math.round(dashboardData.today.total_carbohydrates) + 'g';
-    document.getElementById('fats-consumed').textContent = Math.round(dashboardData.today.total_fats) + 'g';
-    
-    // Update progress bars
-    updateProgressBar('calories-progress', dashboardData.today.total_calories, dashboardData.goals.calories);
-    updateProgressBar('protein-progress', dashboardData.today.total_protein, dashboardData.goals.protein);
-    updateProgressBar('carbs-progress', dashboardData.today.total_carbohydrates, dashboardData.goals.carbs);
-    updateProgressBar('fats-progress', dashboardData.today.total_fats, dashboardData.goals.fats);
+    updateTodayTotals(dashboardData.today, dashboardData.goals);
     
     // Update meals list
     updateMealsList(mealsData.meals);
@@ -636,6 +763,20 @@ function updateDashboard(dashboardData, mealsData) {
     updateWeeklyChart(dashboardData.weekly_trends);
 }
 
+function updateTodayTotals(today, goals) {
+    // Update consumed amounts
+    document.getElementById('calories-consumed').textContent = Math.round(today.total_calories);
+    document.getElementById('protein-consumed').textContent = Math.round(today.total_protein) + 'g';
+    document.getElementById('carbs-consumed').textContent = Math.round(today.total_carbohydrates) + 'g';
+    document.getElementById('fats-consumed').textContent = Math.round(today.total_fats) + 'g';
+    
+    // Update progress bars
+    updateProgressBar('calories-progress', today.total_calories, goals.calories);
+    updateProgressBar('protein-progress', today.total_protein, goals.protein);
+    updateProgressBar('carbs-progress', today.total_carbohydrates, goals.carbs);
+    updateProgressBar('fats-progress', today.total_fats, goals.fats);
+}
+
 function updateProgressBar(elementId, current, goal) {
     const progressBar = document.getElementById(elementId);
     const percentage = Math.min((current / goal) * 100, 100);
@@ -669,7 +810,11 @@ function updateMealsList(meals) {
         <div class="glass-card rounded-xl p-4 border border-gray-600 hover:border-gray-500 transition-all duration-300">
             <div class="flex justify-between items-start">
                 <div class="flex-1">
-                    <h5 class="font-medium text-white text-lg">${meal.name}</h5>
+                    <h5 class="font-medium text-white text-lg">${escapeHtml(meal.name)}</h5>
+                    ${meal.status === 'pending' ? `
+                    <p class="text-sm text-gray-400 mt-2">
+                        <i class="fas fa-spinner fa-spin mr-2"></i>Analyzing nutrition...
+                    </p>` : `
                     <p class="text-sm text-gray-300 mt-2">
                         <span class="inline-flex items-center px-2 py-1 rounded-full text-xs font-medium bg-gradient-to-r from-red-500 to-pink-500 text-white mr-2">
                             ${Math.round(meal.calories)} cal
@@ -683,7 +828,7 @@ function updateMealsList(meals) {
                         <span class="inline-flex items-center px-2 py-1 rounded-full text-xs font-medium bg-gradient-to-r from-yellow-500 to-orange-500 text-white">
                             ${Math.round(meal.fats)}g fat
                         </span>
-                    </p>
+                    </p>`}
                 </div>
                 <div class="flex items-center space-x-3">
                     <div class="text-right text-sm text-gray-400">
@@ -716,7 +861,7 @@ function updateMealsSummary(meals) {
     mealsSummary.innerHTML = meals.map(meal => `
         <div class="flex justify-between items-center py-3 border-b border-gray-600 hover:border-gray-500 transition-colors">
             <div class="flex-1">
-                <span class="font-medium text-white text-lg">${meal.name}</span>
+                <span class="font-medium text-white text-lg">${escapeHtml(meal.name)}</span>
                 <span class="inline-flex items-center px-2 py-1 rounded-full text-xs font-medium bg-gradient-to-r from-red-500 to-pink-500 text-white ml-3">${Math.round(meal.calories)} cal</span>
             </div>
             <span class="text-sm text-gray-400">
@@ -728,21 +873,278 @@ function updateMealsSummary(meals) {
 
 async function loadMealsForDate(date) {
     try {
-        const response = await fetch(`${API_BASE_URL}/logs/${date}`, {
-            headers: {
-                'Authorization': `Bearer ${authToken}`
-            }
-        });
+        const response = await authFetch(`${API_BASE_URL}/logs/${date}`);
         
         if (response.ok) {
             const data = await response.json();
+            selectedDayMeals = data.meals;
             updateMealsList(data.meals);
+            
+            const pendingIds = data.meals
+                .filter(meal => meal.status === 'pending' && !watchedMealIds.has(meal.id))
+                .map(meal => meal.id);
+            if (pendingIds.length) {
+                watchPendingMeals(pendingIds);
+            }
         }
     } catch (error) {
         console.error('Error loading meals for date:', error);
     }
 }
 
+// Meals the server is still analyzing in the background come back "pending"; one
+// analysis event stream reports them as they complete, then the views showing
+// nutrients are refreshed. Meals the live stream delivered first need no refresh.
+async function watchPendingMeals(mealIds) {
+    mealIds.forEach(id => watchedMealIds.add(id));
+    let refresh = false;
+    
+    try {
+        const response = await authFetch(`${API_BASE_URL}/logs/meals/analysis/events?ids=${mealIds.join(',')}`);
+        if (response.ok) {
+            await readSSE(response, (eventName, payload) => {
+                if (eventName === 'meal' || eventName === 'deleted') {
+                    refresh = refresh || watchedMealIds.has(payload.id);
+                    watchedMealIds.delete(payload.id);
+                } else if (eventName === 'timeout') {
+                    // Reloading the day starts a new watch for meals that are still pending
+                    refresh = true;
+                    return true;
+                } else if (eventName === 'done') {
+                    return true;
+                }
+            });
+        }
+    } catch (error) {
+        console.error('Error watching pending meals:', error);
+    } finally {
+        mealIds.forEach(id => watchedMealIds.delete(id));
+    }
+    
+    if (refresh) {
+        loadMealsForDate(selectedDate);
+        loadDashboard();
+        loadMealHistory(true);
+    }
+}
+
+// Live updates: the server pushes a delta after every meal write (GET /api/live/events),
+// so lists, totals and the weekly chart are patched in place instead of refetched.
+// EventSource cannot send headers, so each connection is opened with a single-use ticket
+// from POST /api/live/ticket instead of putting the access token in the URL.
+async function connectLiveUpdates() {
+    if (liveSource || liveConnecting || liveRetryTimer || !authToken || typeof EventSource === 'undefined') {
+        return;
+    }
+    
+    liveConnecting = true;
+    let response = null;
+    try {
+        response = await authFetch(`${API_BASE_URL}/live/ticket`, { method: 'POST' });
+    } catch (error) {
+        response = null;
+    }
+    if (!liveConnecting) {
+        return;  // Disconnected (e.g. logged out) while the ticket was on its way
+    }
+    liveConnecting = false;
+    if (response && response.status === 404) {
+        return;  // Live updates are turned off on this server
+    }
+    if (!response || !response.ok) {
+        if (currentUser) {
+            reconnectLiveUpdates(liveRetryDelay);
+            liveRetryDelay = Math.min(liveRetryDelay * 2, 60000);
+        }
+        return;
+    }
+    const { ticket } = await response.json();
+    
+    liveSource = new EventSource(`${API_BASE_URL}/live/events?ticket=${encodeURIComponent(ticket)}`);
+    liveSource.addEventListener('ready', () => {
+        liveConnected = true;
+        liveRetryDelay = 1000;
+        // Events sent while we were disconnected are lost; catch up once
+        if (liveEverConnected) {
+            loadDashboard();
+            loadMealsForDate(selectedDate);
+        }
+        liveEverConnected = true;
+    });
+    liveSource.addEventListener('meal_added', event => {
+        const delta = JSON.parse(event.data);
+        applyMealDelta(delta);
+        // Analysis workers running in another process cannot reach this stream; the analysis events cover them
+        if (delta.meal.status === 'pending' && !watchedMealIds.has(delta.meal.id)) {
+            watchPendingMeals([delta.meal.id]);
+        }
+    });
+    liveSource.addEventListener('meal_updated', event => {
+        const delta = JSON.parse(event.data);
+        watchedMealIds.delete(delta.meal.id);
+        applyMealDelta(delta);
+        loadMealHistory(true);
+    });
+    liveSource.addEventListener('meal_deleted', event => applyMealDelta(JSON.parse(event.data)));
+    liveSource.addEventListener('resync', () => {
+        loadDashboard();
+        loadMealsForDate(selectedDate);
+    });
+    liveSource.addEventListener('expired', () => reconnectLiveUpdates(0));
+    liveSource.onerror = () => {
+        // The browser's own retry would reuse the spent ticket, so reconnect with a new one
+        reconnectLiveUpdates(liveRetryDelay);
+        liveRetryDelay = Math.min(liveRetryDelay * 2, 60000);
+    };
+}
+
+function reconnectLiveUpdates(delay) {
+    disconnectLiveUpdates();
+    liveRetryTimer = setTimeout(() => {
+        liveRetryTimer = null;
+        // authFetch refreshes an expired access token while getting the ticket
+        if (currentUser) {
+            connectLiveUpdates();
+        }
+    }, delay);
+}
+
+function disconnectLiveUpdates() {
+    if (liveSource) {
+        liveSource.close();
+        liveSource = null;
+    }
+    if (liveRetryTimer) {
+        clearTimeout(liveRetryTimer);
+        liveRetryTimer = null;
+    }
+    liveConnecting = false;
+    liveConnected = false;
+}
+
+// Replace (or, without a meal, remove) one meal in a day's list, keeping the order they were logged in
+function replaceMeal(meals, mealId, meal) {
+    const others = meals.filter(existing => existing.id !== mealId);
+    return meal ? [...others, meal].sort((a, b) => new Date(a.created_at) - new Date(b.created_at) || a.id - b.id) : others;
+}
+
+// Deltas carry the changed meal (or, for deletions, only its id) and the new totals of its day
+function applyMealDelta(delta) {
+    const meal = delta.meal || null;
+    const mealId = meal ? meal.id : delta.id;
+    const today = new Date().toISOString().split('T')[0];
+    
+    if (delta.date === selectedDate) {
+        selectedDayMeals = replaceMeal(selectedDayMeals, mealId, meal);
+        updateMealsList(selectedDayMeals);
+    }
+    if (delta.date !== today || !dashboardState) {
+        return;
+    }
+    
+    todayMeals = replaceMeal(todayMeals, mealId, meal);
+    updateMealsSummary(todayMeals);
+    dashboardState.today = delta.totals;
+    updateTodayTotals(delta.totals, dashboardState.goals);
+    
+    // Patch today's point of the weekly chart rather than rebuilding it
+    const index = dashboardState.weekly_trends.findIndex(day => day.date === delta.date);
+    if (index !== -1) {
+        dashboardState.weekly_trends[index] = {
+            date: delta.date,
+            calories: delta.totals.total_calories,
+            protein: delta.totals.total_protein,
+            carbs: delta.totals.total_carbohydrates,
+            fats: delta.totals.total_fats
+        };
+        if (weeklyChart) {
+            weeklyChart.data.datasets[0].data[index] = delta.totals.total_calories;
+            weeklyChart.update('none');
+        }
+    }
+}
+
+// Frequent foods come from the server-side food term index; clicking one fills the meal box
+async function loadFrequentFoods() {
+    const container = document.getElementById('frequent-foods');
+    if (!container) {
+        return;
+    }
+    
+    try {
+        const response = await authFetch(`${API_BASE_URL}/foods/frequent?limit=8`);
+        if (!response.ok) {
+            return;
+        }
+        const foods = await response.json();
+        container.innerHTML = foods.map(food => `
+            <button type="button" class="frequent-food inline-flex items-center px-3 py-1 rounded-full text-sm glass border border-gray-600 text-gray-200 hover:border-cyan-400 transition-colors"
+                    data-term="${escapeHtml(food.term)}" title="Logged ${food.count} times">
+                ${escapeHtml(food.term)}
+            </button>
+        `).join('');
+        container.querySelectorAll('.frequent-food').forEach(button => {
+            button.addEventListener('click', () => {
+                const input = document.getElementById('meal-description');
+                input.value = input.value ? `${input.value} and ${button.dataset.term}` : button.dataset.term;
+                input.focus();
+            });
+        });
+    } catch (error) {
+        console.error('Error loading frequent foods:', error);
+    }
+}
+
+// Meal history is paged with the cursor the API returns, so each "Load More" costs one request
+async function loadMealHistory(reset = true) {
+    const historyList = document.getElementById('history-list');
+    const loadMoreBtn = document.getElementById('history-load-more');
+    if (!historyList) {
+        return;
+    }
+    if (reset) {
+        historyCursor = null;
+    }
+    
+    const params = new URLSearchParams({ limit: 20 });
+    const search = document.getElementById('history-search').value.trim();
+    if (search) {
+        params.set('q', search);
+    }
+    if (historyCursor) {
+        params.set('cursor', historyCursor);
+    }
+    
+    try {
+        const response = await authFetch(`${API_BASE_URL}/logs/meals?${params}`);
+        if (!response.ok) {
+            return;
+        }
+        const page = await response.json();
+        const rows = page.meals.map(meal => `
+            <div class="flex justify-between items-center py-3 border-b border-gray-600 hover:border-gray-500 transition-colors">
+                <div class="flex-1">
+                    <span class="font-medium text-white">${escapeHtml(meal.name)}</span>
+                    ${meal.status === 'pending' ? `<span class="text-xs text-gray-400 ml-3"><i class="fas fa-spinner fa-spin mr-1"></i>Analyzing...</span>` : `<span class="inline-flex items-center px-2 py-1 rounded-full text-xs font-medium bg-gradient-to-r from-red-500 to-pink-500 text-white ml-3">${Math.round(meal.calories)} cal</span>`}
+                </div>
+                <span class="text-sm text-gray-400">
+                    ${new Date(meal.date + 'T00:00:00').toLocaleDateString('en-US', { month: 'short', day: 'numeric', year: 'numeric' })}
+                </span>
+            </div>
+        `).join('');
+        
+        if (reset) {
+            historyList.innerHTML = rows || '<p class="text-center text-gray-500 py-4">No meals found</p>';
+        } else {
+            historyList.insertAdjacentHTML('beforeend', rows);
+        }
+        historyCursor = page.next_cursor;
+        loadMoreBtn.classList.toggle('hidden', !page.has_more);
+    } catch (error) {
+        console.error('Error loading meal history:', error);
+    }
+}
+
 async function loadCharts() {
     const period = document.getElementById('chart-period').value;
     
@@ -752,11 +1154,7 @@ async function loadCharts() {
         const startDate = new Date();
         startDate.setDate(endDate.getDate() - parseInt(period));
         
-        const response = await fetch(`${API_BASE_URL}/dashboard?start_date=${startDate.toISOString().split('T')[0]}&end_date=${endDate.toISOString().split('T')[0]}`, {
-            headers: {
-                'Authorization': `Bearer ${authToken}`
-            }
-        });
+        const response = await authFetch(`${API_BASE_URL}/dashboard?start_date=${startDate.toISOString().split('T')[0]}&end_date=${endDate.toISOString().split('T')[0]}`);
         
         if (response.ok) {
             const data = await response.json();
@@ -837,21 +1235,26 @@ function updateWeeklyChart(weeklyData) {
 
 function updateAllCharts(data) {
     updateWeeklyChart(data.weekly_trends || []);
-    updateDailyCaloriesChart(data.daily_data || []);
+    updateDailyCaloriesChart(data.daily_data || [], data.analytics ? data.analytics.bucket : 'day');
     updateMacroChart(data.macro_data || {});
     updateGoalProgressChart(data.goal_progress || {});
 }
 
-function updateDailyCaloriesChart(dailyData) {
+function updateDailyCaloriesChart(dailyData, bucket = 'day') {
     const ctx = document.getElementById('daily-calories-chart').getContext('2d');
     
     if (dailyCaloriesChart) {
         dailyCaloriesChart.destroy();
     }
     
+    // Long ranges come back as weekly or monthly averages
     const labels = dailyData.map(day => {
         const date = new Date(day.date);
-        return date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' });
+        if (bucket === 'month') {
+            return date.toLocaleDateString('en-US', { month: 'short', year: 'numeric', timeZone: 'UTC' });
+        }
+        const label = date.toLocaleDateString('en-US', { month: 'short', day: 'numeric', timeZone: 'UTC' });
+        return bucket === 'week' ? `Wk of ${label}` : label;
     });
     
     dailyCaloriesChart = new Chart(ctx, {
@@ -900,6 +1303,42 @@ function updateDailyCaloriesChart(dailyData) {
     });
 }
 
+function updateMacroChart(macroData) {
+    const ctx = document.getElementById('macro-chart').getContext('2d');
+    
+    if (macroChart) {
+        macroChart.destroy();
+    }
+    
+    macroChart = new Chart(ctx, {
+        type: 'doughnut',
+        data: {
+            labels: ['Protein (g)', 'Carbs (g)', 'Fats (g)'],
+            datasets: [{
+                data: [macroData.protein || 0, macroData.carbs || 0, macroData.fats || 0],
+                backgroundColor: ['rgba(0, 245, 255, 0.8)', 'rgba(168, 85, 247, 0.8)', 'rgba(250, 204, 21, 0.8)'],
+                borderWidth: 0,
+                cutout: '60%'
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: true,
+            aspectRatio: 1,
+            plugins: {
+                legend: {
+                    position: 'bottom',
+                    labels: {
+                        color: '#ffffff',
+                        usePointStyle: true,
+                        pointStyle: 'circle'
+                    }
+                }
+            }
+        }
+    });
+}
+
 function updateGoalProgressChart(goalData) {
     const ctx = document.getElementById('goal-progress-chart').getContext('2d');
     
@@ -964,6 +1403,17 @@ function addAIMessage(message, sender, isTyping = false) {
     return messageId;
 }
 
+function updateAIMessage(messageId, message) {
+    const messageDiv = document.getElementById(messageId);
+    if (!messageDiv) return;
+    
+    const content = messageDiv.querySelector('.ai-chat-content');
+    content.innerHTML = marked.parse(message);
+    
+    const aiChat = document.getElementById('ai-chat');
+    aiChat.scrollTop = aiChat.scrollHeight;
+}
+
 function removeAIMessage(messageId) {
     const message = document.getElementById(messageId);
     if (message) {
@@ -1012,6 +1462,13 @@ function hideLoading() {
     loadingOverlay.classList.add('hidden');
 }
 
+// Meal names and food terms are stored user input: escape anything interpolated into HTML templates
+const HTML_ESCAPES = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' };
+
+function escapeHtml(value) {
+    return String(value).replace(/[&<>"']/g, ch => HTML_ESCAPES[ch]);
+}
+
 function showToast(message, type = 'info') {
     const toast = document.createElement('div');
     const bgColor = type === 'success' ? 'bg-gradient-to-r from-green-500 to-teal-500' : 
@@ -1021,7 +1478,7 @@ function showToast(message, type = 'info') {
     toast.innerHTML = `
         <div class="flex items-center">
             <i class="fas ${type === 'success' ? 'fa-check-circle' : type === 'error' ? 'fa-exclamation-circle' : 'fa-info-circle'} mr-2"></i>
-            <span>${message}</span>
+            <span>${escapeHtml(message)}</span>
         </div>
     `;
     
@@ -49,6 +49,14 @@ def main():
         print("🔑 Don't forget to add your Gemini API key!")
         return
     
+    # Bring the database schema up to date (a separate step so the app never migrates on import)
+    print("🗄️  Applying database migrations...")
+    try:
+        subprocess.run([str(python_path), "-m", "backend.migrations", "upgrade"], cwd=backend_dir.parent, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Error applying migrations: {e}")
+        return 1
+    
     # Start the server
     print("🌐 Starting FastAPI server...")
     print("📍 Server will be available at: http://localhost:8000")
@@ -57,7 +65,10 @@ def main():
     print("-" * 50)
     
     try:
-        subprocess.run([str(python_path), "main.py"], check=True)
+        subprocess.run(
+            [str(python_path), "-m", "uvicorn", "backend.main:app", "--host", "0.0.0.0", "--port", "8000"],
+            cwd=backend_dir.parent, check=True
+        )
     except KeyboardInterrupt:
         print("\n👋 Server stopped by user")
     except subprocess.CalledProcessError as e:
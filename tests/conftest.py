@@ -0,0 +1,55 @@
+import os
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+# Settings are read when the backend modules are imported, so they go first:
+# one in-memory database, and model calls disabled (every meal takes the local estimator)
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["DB_ASYNC"] = "false"
+os.environ["LLM_PROVIDER"] = "disabled"
+os.environ["MEAL_ANALYSIS_ASYNC"] = "false"
+os.environ["SQL_PROFILE"] = "false"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient
+
+from backend.database import engine
+from backend.main import app
+from backend.migrations import upgrade
+
+MEALS = ["2 roti with daal", "4 bananas", "1 cup chawal with chicken curry", "mystery stew"]
+
+@pytest.fixture(scope="session")
+def client():
+    upgrade(engine)
+    with TestClient(app) as client:
+        yield client
+
+def register(client, email: str) -> dict:
+    """Sign up a user with a complete profile and return their auth headers"""
+    response = client.post("/api/auth/register", json={"email": email, "password": "pw-123456", "full_name": "Test User"})
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = client.put("/api/profile", headers=headers, json={
+        "age": 30, "weight": 70, "height": 175, "gender": "male",
+        "activity_level": "sedentary", "fitness_goal": "lose_weight"
+    })
+    assert response.status_code == 200, response.text
+    return headers
+
+def log_meals(client, headers: dict, days: int, per_day: int = len(MEALS)) -> None:
+    """Log `per_day` meals on each of the last `days` days, today included"""
+    today = date.today()
+    meals = [
+        {"description": MEALS[index % len(MEALS)], "date": (today - timedelta(days=offset)).isoformat()}
+        for offset in range(days)
+        for index in range(per_day)
+    ]
+    for start in range(0, len(meals), 100):
+        response = client.post("/api/logs/meals/batch", headers=headers, json={"meals": meals[start:start + 100]})
+        assert response.status_code == 200, response.text
+        assert response.json()["failed"] == 0, response.text
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+from backend.auth import REFRESH_TOKEN_REUSE_GRACE_SECONDS, hash_refresh_token
+from backend.cache import auth_cache
+from backend.database import SessionLocal
+from backend.models import RefreshToken
+
+def _signup(client, email: str) -> dict:
+    response = client.post("/api/auth/register", json={"email": email, "password": "pw-123456", "full_name": "Test User"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def _headers(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+def _refresh(client, refresh_token: str):
+    return client.post("/api/auth/refresh", json={"refresh_token": refresh_token})
+
+def _age_rotation(refresh_token: str) -> None:
+    """Move a token's rotation back past the reuse grace window"""
+    db = SessionLocal()
+    try:
+        db.query(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(refresh_token)).update(
+            {RefreshToken.revoked_at: datetime.utcnow() - timedelta(seconds=REFRESH_TOKEN_REUSE_GRACE_SECONDS + 1)}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def test_logout_ends_the_access_token(client):
+    tokens = _signup(client, "logout@example.com")
+    assert client.get("/api/cache/stats", headers=_headers(tokens)).status_code == 200
+
+    response = client.post("/api/auth/logout", headers=_headers(tokens), json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    assert client.get("/api/cache/stats", headers=_headers(tokens)).status_code == 401
+
+def test_revoked_session_ends_access_tokens_cached_elsewhere(client):
+    tokens = _signup(client, "reuse@example.com")
+    assert client.get("/api/cache/stats", headers=_headers(tokens)).status_code == 200
+    rotated = _refresh(client, tokens["refresh_token"]).json()
+
+    # Replaying the rotated refresh token after the grace window revokes the whole login
+    _age_rotation(tokens["refresh_token"])
+    assert _refresh(client, tokens["refresh_token"]).status_code == 401
+    auth_cache.clear()  # As if the tokens had been cached by another worker whose TTL ran out
+    assert client.get("/api/cache/stats", headers=_headers(tokens)).status_code == 401
+    assert client.get("/api/cache/stats", headers=_headers(rotated)).status_code == 401
+
+def test_other_logins_keep_working_after_logout(client):
+    first = _signup(client, "devices@example.com")
+    response = client.post("/api/auth/login", json={"email": "devices@example.com", "password": "pw-123456"})
+    assert response.status_code == 200, response.text
+    second = response.json()
+
+    client.post("/api/auth/logout", headers=_headers(first), json={"refresh_token": first["refresh_token"]})
+    assert client.get("/api/cache/stats", headers=_headers(first)).status_code == 401
+    assert client.get("/api/cache/stats", headers=_headers(second)).status_code == 200
+
+def test_refresh_rotates_to_a_new_single_use_token(client):
+    tokens = _signup(client, "rotate@example.com")
+    response = _refresh(client, tokens["refresh_token"])
+    assert response.status_code == 200, response.text
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert client.get("/api/cache/stats", headers=_headers(rotated)).status_code == 200
+    assert _refresh(client, rotated["refresh_token"]).status_code == 200
+
+def test_tabs_refreshing_together_share_the_successor(client):
+    tokens = _signup(client, "tabs@example.com")
+    first = _refresh(client, tokens["refresh_token"])
+    second = _refresh(client, tokens["refresh_token"])
+    assert first.status_code == second.status_code == 200, second.text
+    assert first.json()["refresh_token"] == second.json()["refresh_token"]
+
+    # The login survives, and the shared successor still rotates normally
+    assert client.get("/api/cache/stats", headers=_headers(second.json())).status_code == 200
+    assert _refresh(client, second.json()["refresh_token"]).status_code == 200
+
+def test_replay_after_the_successor_was_used_is_reuse(client):
+    tokens = _signup(client, "replay@example.com")
+    rotated = _refresh(client, tokens["refresh_token"]).json()
+    newest = _refresh(client, rotated["refresh_token"]).json()
+
+    # Within the grace window, but the successor it would get back is already spent
+    assert _refresh(client, tokens["refresh_token"]).status_code == 401
+    assert _refresh(client, newest["refresh_token"]).status_code == 401
+
+def test_logged_out_token_gets_no_successor(client):
+    tokens = _signup(client, "graceful-logout@example.com")
+    rotated = _refresh(client, tokens["refresh_token"]).json()
+    client.post("/api/auth/logout", headers=_headers(rotated), json={"refresh_token": rotated["refresh_token"]})
+    assert _refresh(client, tokens["refresh_token"]).status_code == 401
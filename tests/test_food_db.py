@@ -0,0 +1,57 @@
+import pytest
+
+from backend.food_db import FOOD_DB_MAX_ITEM_GRAMS, resolve_meal
+from backend.text_utils import normalize_meal_description
+
+def _parsed(description: str):
+    return [(item.food.name, round(item.quantity, 2), item.unit) for item in resolve_meal(description).items]
+
+@pytest.mark.parametrize("description, expected", [
+    ("2 roti with daal", [("roti", 2.0, None), ("daal", 1.0, None)]),
+    ("4 bananas", [("banana", 4.0, None)]),
+    ("half plate biryani", [("biryani", 0.5, "plate")]),
+    ("2 cups chawal", [("rice", 2.0, "cup")]),
+    ("chawal 2 plate", [("rice", 2.0, "plate")]),
+    ("do roti", [("roti", 2.0, None)]),
+])
+def test_counts_before_the_food_or_with_a_unit_are_confident(description, expected):
+    assert _parsed(description) == expected
+    assert resolve_meal(description).is_confident
+
+@pytest.mark.parametrize("description, expected", [
+    ("chicken 65", [("chicken", 1.0, None)]),
+    ("chicken 65 with rice", [("chicken", 1.0, None), ("rice", 1.0, None)]),
+    ("roti 2", [("roti", 1.0, None)]),
+])
+def test_bare_number_after_a_food_is_not_a_count(description, expected):
+    assert _parsed(description) == expected
+    assert not resolve_meal(description).is_confident
+
+def test_implausible_quantity_is_clamped_and_not_confident():
+    resolution = resolve_meal("65 bananas")
+    assert resolution.items[0].grams == pytest.approx(FOOD_DB_MAX_ITEM_GRAMS)
+    assert not resolution.is_confident
+
+@pytest.mark.parametrize("description", ["chicken burger", "butter chicken", "banana bread", "mango lassi", "daal chawal"])
+def test_adjacent_foods_are_one_dish_and_not_confident(description):
+    resolution = resolve_meal(description)
+    assert len(resolution.items) == 2
+    assert not resolution.is_confident
+
+@pytest.mark.parametrize("description", ["roti, daal", "roti and daal", "roti with daal", "roti + daal"])
+def test_foods_separated_by_a_connector_are_confident(description):
+    assert _parsed(description) == [("roti", 1.0, None), ("daal", 1.0, None)]
+    assert resolve_meal(description).is_confident
+
+def test_multi_word_synonym_is_one_food():
+    assert _parsed("chicken tikka") == [("chicken", 1.0, None)]
+    assert resolve_meal("chicken tikka").is_confident
+
+@pytest.mark.parametrize("description, expected", [
+    ("pao bhaji", "pao bhaji"),
+    ("pav bhaji", "pav bhaji"),
+    ("pao kilo chawal", "0.25 kilo chawal"),
+    ("1 pao kg daal", "1 0.25 kg daal"),
+])
+def test_pao_is_a_quarter_only_before_a_weight_unit(description, expected):
+    assert normalize_meal_description(description) == expected
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+from backend.database import SessionLocal
+from backend.live_updates import redeem_stream_ticket
+from backend.models import LiveStreamTicket
+from conftest import register
+
+def test_ticket_opens_one_stream_only(client):
+    headers = register(client, "ticket@example.com")
+    response = client.post("/api/live/ticket", headers=headers)
+    assert response.status_code == 200, response.text
+    ticket = response.json()["ticket"]
+
+    db = SessionLocal()
+    try:
+        claimed = redeem_stream_ticket(db, ticket)
+        assert claimed is not None
+        _, session_expires_at = claimed
+        assert session_expires_at > datetime.utcnow()
+        assert redeem_stream_ticket(db, ticket) is None
+    finally:
+        db.close()
+
+def test_expired_ticket_is_rejected(client):
+    headers = register(client, "late@example.com")
+    ticket = client.post("/api/live/ticket", headers=headers).json()["ticket"]
+    db = SessionLocal()
+    try:
+        db.query(LiveStreamTicket).update({LiveStreamTicket.expires_at: datetime.utcnow() - timedelta(seconds=1)})
+        db.commit()
+        assert redeem_stream_ticket(db, ticket) is None
+    finally:
+        db.close()
+
+def test_ticket_requires_an_access_token(client):
+    assert client.post("/api/live/ticket").status_code == 403
+    assert client.get("/api/live/events", params={"ticket": "not-a-ticket"}).status_code == 401
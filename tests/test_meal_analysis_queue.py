@@ -0,0 +1,98 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from backend.database import SessionLocal
+from backend.meal_analysis import MEAL_ANALYSIS_LEASE_SECONDS, MEAL_ANALYSIS_MAX_ATTEMPTS, claim_jobs, finish_jobs
+from backend.models import MEAL_COMPLETE, MEAL_PENDING, MealAnalysisJob, MealEntry, User
+from backend.rollups import find_drift
+from backend.services import save_meal_entry
+from conftest import register
+
+ANSWER = {"calories": 350.0, "protein": 12.0, "carbohydrates": 40.0, "fats": 15.0}
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def pending_meal(client, db):
+    """A meal stored pending, with its job; the only due job in the queue"""
+    register(client, f"queue-{datetime.utcnow().timestamp()}@example.com")
+    user = db.query(User).order_by(User.id.desc()).first()
+    meal = save_meal_entry(db, user.id, date.today(), "mystery stew", None)
+    meal_id = meal.id
+    yield meal_id
+    db.query(MealAnalysisJob).filter(MealAnalysisJob.meal_id == meal_id).delete()
+    db.commit()
+
+def _job(db, meal_id: int):
+    db.expire_all()
+    return db.query(MealAnalysisJob).filter(MealAnalysisJob.meal_id == meal_id).first()
+
+def _meal(db, meal_id: int) -> MealEntry:
+    db.expire_all()
+    return db.get(MealEntry, meal_id)
+
+def test_unanswered_job_is_released_with_backoff(db, pending_meal):
+    jobs = claim_jobs("worker-a", 10)
+    assert [job.meal_id for job in jobs] == [pending_meal]
+    assert finish_jobs(jobs, [None]) == []
+
+    job = _job(db, pending_meal)
+    assert job.attempts == 1
+    assert job.claim_token is None
+    assert job.available_at > datetime.utcnow()
+    assert claim_jobs("worker-a", 10) == []  # Not due again until the backoff passes
+    assert _meal(db, pending_meal).status == MEAL_PENDING
+
+def test_answered_job_completes_the_meal_and_its_rollup(db, pending_meal):
+    jobs = claim_jobs("worker-a", 10)
+    meals = finish_jobs(jobs, [ANSWER])
+    assert [meal.id for meal in meals] == [pending_meal]
+
+    meal = _meal(db, pending_meal)
+    assert meal.status == MEAL_COMPLETE
+    assert meal.calories == ANSWER["calories"]
+    assert _job(db, pending_meal) is None
+    assert find_drift(db) == []
+
+def test_last_attempt_falls_back_to_the_local_estimate(db, pending_meal):
+    db.query(MealAnalysisJob).filter(MealAnalysisJob.meal_id == pending_meal).update(
+        {MealAnalysisJob.attempts: MEAL_ANALYSIS_MAX_ATTEMPTS - 1}
+    )
+    db.commit()
+    jobs = claim_jobs("worker-a", 10)
+    assert jobs[0].attempts == MEAL_ANALYSIS_MAX_ATTEMPTS
+
+    assert [meal.id for meal in finish_jobs(jobs, [None])] == [pending_meal]
+    assert _meal(db, pending_meal).status == MEAL_COMPLETE
+    assert _job(db, pending_meal) is None
+    assert find_drift(db) == []
+
+def test_expired_lease_is_taken_over_and_completed_once(db, pending_meal):
+    stale = claim_jobs("worker-a", 10)
+    assert claim_jobs("worker-b", 10) == []  # Held by a live lease
+
+    db.query(MealAnalysisJob).filter(MealAnalysisJob.meal_id == pending_meal).update(
+        {MealAnalysisJob.claimed_at: datetime.utcnow() - timedelta(seconds=MEAL_ANALYSIS_LEASE_SECONDS + 1)}
+    )
+    db.commit()
+    taken = claim_jobs("worker-b", 10)
+    assert [job.meal_id for job in taken] == [pending_meal]
+    assert taken[0].attempts == 2
+
+    # The first worker comes back late: its claim is gone, so it changes nothing
+    assert finish_jobs(stale, [ANSWER]) == []
+    assert finish_jobs(stale, [None]) == []
+    assert _meal(db, pending_meal).status == MEAL_PENDING
+    assert _job(db, pending_meal).claim_token == taken[0].claim_token
+
+    assert [meal.id for meal in finish_jobs(taken, [ANSWER])] == [pending_meal]
+    meal = _meal(db, pending_meal)
+    assert meal.status == MEAL_COMPLETE
+    assert find_drift(db) == []
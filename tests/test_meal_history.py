@@ -0,0 +1,71 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from backend.meal_history import MEAL_HISTORY_MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from conftest import MEALS, log_meals, register
+
+TODAY = date.today()
+
+@pytest.fixture(scope="module")
+def headers(client):
+    """A user with four meals on each of the last five days, most logged in the same second"""
+    headers = register(client, "history@example.com")
+    log_meals(client, headers, days=5)
+    return headers
+
+def _pages(client, headers: dict, **params):
+    """Every page of the history, following next_cursor to the end"""
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/api/logs/meals", headers=headers, params=query)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        pages.append(page)
+        if not page["has_more"]:
+            assert page["next_cursor"] is None
+            return pages
+        cursor = page["next_cursor"]
+
+def _sort_key(meal: dict):
+    return meal["date"], meal["created_at"], meal["id"]
+
+def test_cursor_round_trips():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 250)
+    assert decode_cursor(encode_cursor(TODAY, created_at, 42)) == (TODAY, created_at, 42)
+
+def test_pages_cover_every_meal_once_newest_first(client, headers):
+    pages = _pages(client, headers, limit=3)
+    meals = [meal for page in pages for meal in page["meals"]]
+    assert len(meals) == 5 * len(MEALS)
+    assert len({meal["id"] for meal in meals}) == len(meals)
+    assert meals == sorted(meals, key=_sort_key, reverse=True)
+    assert all(len(page["meals"]) == 3 for page in pages[:-1])
+
+def test_meals_logged_meanwhile_do_not_shift_later_pages(client, headers):
+    first = client.get("/api/logs/meals", headers=headers, params={"limit": 5}).json()
+    response = client.post("/api/logs/meals", headers=headers, json={"description": "4 bananas", "date": TODAY.isoformat()})
+    assert response.status_code == 200, response.text
+    new_id = response.json()["id"]
+
+    rest = _pages(client, headers, limit=5, cursor=first["next_cursor"])
+    seen = [meal["id"] for meal in first["meals"]] + [meal["id"] for page in rest for meal in page["meals"]]
+    assert new_id not in seen
+    assert len(seen) == len(set(seen))
+    client.delete(f"/api/logs/meals/{new_id}", headers=headers)
+
+def test_cursor_pages_respect_filters(client, headers):
+    start = (TODAY - timedelta(days=1)).isoformat()
+    meals = [meal for page in _pages(client, headers, limit=2, start_date=start, q="roti") for meal in page["meals"]]
+    assert len(meals) == 2
+    assert all(meal["date"] >= start and "roti" in meal["name"] for meal in meals)
+
+@pytest.mark.parametrize("params", [
+    {"cursor": "not-a-cursor"},
+    {"limit": 0},
+    {"limit": MEAL_HISTORY_MAX_PAGE_SIZE + 1},
+    {"start_date": "yesterday"},
+])
+def test_invalid_parameters_are_rejected(client, headers, params):
+    assert client.get("/api/logs/meals", headers=headers, params=params).status_code == 400
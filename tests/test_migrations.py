@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from backend.migrations import applied_revisions, downgrade, load_migrations, upgrade
+
+@pytest.fixture
+def engine():
+    """A fresh database of its own, so migrations can be run step by step"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    yield engine
+    engine.dispose()
+
+def _insert(conn, table: str, **values) -> int:
+    columns = ", ".join(values)
+    params = ", ".join(f":{name}" for name in values)
+    return conn.execute(text(f"INSERT INTO {table} ({columns}) VALUES ({params})"), values).lastrowid
+
+def _meal(conn, log_id: int, name: str, calories: float) -> int:
+    return _insert(conn, "meal_entries", log_id=log_id, name=name, calories=calories, protein=0, carbohydrates=0, fats=0)
+
+def test_duplicate_days_are_merged_into_the_oldest_log(engine):
+    upgrade(engine, "0001")
+    today, yesterday = date.today(), date(2024, 1, 1)
+    with engine.begin() as conn:
+        user_id = _insert(conn, "users", email="old@example.com", hashed_password="x", full_name="Old User")
+        keep = _insert(conn, "daily_logs", user_id=user_id, date=today)
+        duplicate = _insert(conn, "daily_logs", user_id=user_id, date=today)
+        other_day = _insert(conn, "daily_logs", user_id=user_id, date=yesterday)
+        meals = [_meal(conn, keep, "2 eggs", 150), _meal(conn, duplicate, "dal chawal", 400), _meal(conn, other_day, "4 bananas", 420)]
+        for log_id, calories in ((keep, 150), (duplicate, 400), (other_day, 420)):
+            _insert(conn, "daily_log_totals", log_id=log_id, calories=calories, protein=0, carbohydrates=0, fats=0, meal_count=1)
+
+    upgrade(engine)
+
+    with engine.connect() as conn:
+        logs = conn.execute(text("SELECT id, date FROM daily_logs ORDER BY id")).all()
+        assert [log_id for log_id, _ in logs] == [keep, other_day]
+        meal_logs = dict(conn.execute(text("SELECT id, log_id FROM meal_entries")).all())
+        assert meal_logs == {meals[0]: keep, meals[1]: keep, meals[2]: other_day}
+        # The merged day's rollup is dropped to be recomputed; untouched days keep theirs
+        totals = conn.execute(text("SELECT log_id FROM daily_log_totals")).scalars().all()
+        assert totals == [other_day]
+
+        terms = dict(conn.execute(text("SELECT term, count FROM user_food_terms WHERE user_id = :user_id"), {"user_id": user_id}).all())
+        assert terms == {"egg": 1, "daal": 1, "chawal": 1, "banana": 1}
+
+def test_every_migration_downgrades_and_upgrades_again(engine):
+    upgrade(engine)
+    assert applied_revisions(engine) == [migration.revision for migration in load_migrations()]
+    downgrade(engine, "base")
+    assert applied_revisions(engine) == []
+    upgrade(engine)
+    assert applied_revisions(engine) == [migration.revision for migration in load_migrations()]
@@ -0,0 +1,65 @@
+"""Query budgets for the hot read routes.
+
+Each route must stay within a fixed number of statements, and that number
+must not grow with the amount of history a user has: a route that issues a
+query per day or per meal (an N+1) fails here before it reaches production.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from backend.database import assert_max_queries, profile_queries
+from conftest import log_meals, register
+
+TODAY = date.today()
+MONTH_AGO = TODAY - timedelta(days=29)
+
+# (route, method, path, statement budget, max repeats of one statement shape)
+ROUTES = [
+    ("dashboard", "get", "/api/dashboard", 3, 1),
+    ("dashboard range", "get", f"/api/dashboard?start_date={MONTH_AGO}&end_date={TODAY}", 4, 2),
+    ("daily log", "get", f"/api/logs/{TODAY}", 3, 1),
+    ("meal history", "get", "/api/logs/meals?limit=20", 2, 1),
+    ("meal history search", "get", "/api/logs/meals?q=roti&limit=20", 2, 1),
+    ("report download", "get", "/api/reports/download", 3, 1),
+    ("report download 90 days", "get", "/api/reports/download?days=90", 3, 1),
+    ("meal analysis report", "post", "/api/ai/analyze-meals", 3, 1),
+]
+
+@pytest.fixture(scope="module")
+def users(client):
+    """A user with two days of meals and one with forty"""
+    light = register(client, "light@example.com")
+    log_meals(client, light, days=2)
+    heavy = register(client, "heavy@example.com")
+    log_meals(client, heavy, days=40)
+    return light, heavy
+
+def _request(client, method: str, path: str, headers: dict):
+    response = getattr(client, method)(path, headers=headers)
+    assert response.status_code == 200, response.text
+    return response
+
+@pytest.mark.parametrize("method, path, budget, max_repeats", [route[1:] for route in ROUTES], ids=[route[0] for route in ROUTES])
+def test_route_stays_within_query_budget(client, users, method, path, budget, max_repeats):
+    _, heavy = users
+    with assert_max_queries(budget, max_repeats=max_repeats):
+        _request(client, method, path, heavy)
+
+@pytest.mark.parametrize("method, path", [route[1:3] for route in ROUTES], ids=[route[0] for route in ROUTES])
+def test_query_count_does_not_grow_with_history(client, users, method, path):
+    counts = []
+    for headers in users:
+        _request(client, method, path, headers)  # Warm the per-process caches for this user
+        with profile_queries() as profile:
+            _request(client, method, path, headers)
+        counts.append(profile.count)
+    assert counts[0] == counts[1], f"light user ran {counts[0]} queries, heavy user ran {counts[1]}"
+
+def test_meal_history_next_page_stays_within_query_budget(client, users):
+    _, heavy = users
+    next_cursor = _request(client, "get", "/api/logs/meals?limit=20", heavy).json()["next_cursor"]
+    assert next_cursor
+    with assert_max_queries(2, max_repeats=1):
+        page = _request(client, "get", f"/api/logs/meals?limit=20&cursor={next_cursor}", heavy).json()
+    assert len(page["meals"]) == 20
@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+
+from backend.database import SessionLocal
+from backend.models import DailyLogTotals
+from backend.rollups import _insert_missing, find_drift
+from conftest import log_meals, register
+
+TODAY = date.today().isoformat()
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def _day(client, headers: dict) -> dict:
+    response = client.get(f"/api/logs/{TODAY}", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def _assert_totals_match_meals(day: dict) -> None:
+    for field in ("calories", "protein", "carbohydrates", "fats"):
+        assert day[f"total_{field}"] == pytest.approx(sum(meal[field] for meal in day["meals"]))
+
+def test_rollups_follow_logged_and_deleted_meals(client, db):
+    headers = register(client, "rollups@example.com")
+    log_meals(client, headers, days=3)
+    response = client.post("/api/logs/meals", headers=headers, json={"description": "2 roti with daal", "date": TODAY})
+    assert response.status_code == 200, response.text
+    _assert_totals_match_meals(_day(client, headers))
+
+    for meal in _day(client, headers)["meals"][:2]:
+        assert client.delete(f"/api/logs/meals/{meal['id']}", headers=headers).status_code == 200
+    day = _day(client, headers)
+    assert len(day["meals"]) == 3
+    _assert_totals_match_meals(day)
+    assert find_drift(db) == []
+
+def test_missing_rollup_is_recomputed_from_meals(client, db):
+    headers = register(client, "missing-rollup@example.com")
+    log_meals(client, headers, days=1, per_day=2)
+    log_id = _day(client, headers)["meals"][0]["log_id"]
+    db.query(DailyLogTotals).filter(DailyLogTotals.log_id == log_id).delete()
+    db.commit()
+
+    response = client.post("/api/logs/meals", headers=headers, json={"description": "4 bananas", "date": TODAY})
+    assert response.status_code == 200, response.text
+    day = _day(client, headers)
+    assert len(day["meals"]) == 3
+    _assert_totals_match_meals(day)
+
+def test_writer_that_loses_the_insert_race_adds_only_its_delta(client, db):
+    headers = register(client, "rollup-race@example.com")
+    log_meals(client, headers, days=1, per_day=1)
+    log_id = _day(client, headers)["meals"][0]["log_id"]
+    before = db.get(DailyLogTotals, log_id)
+    calories, meal_count = before.calories, before.meal_count
+    db.expunge(before)
+
+    # The row exists, as if a concurrent writer had just inserted it: the upsert must not fail or recount
+    _insert_missing(db, {log_id: {"calories": 100.0, "protein": 0, "carbohydrates": 0, "fats": 0, "meal_count": 1}})
+    db.commit()
+    after = db.get(DailyLogTotals, log_id)
+    assert after.calories == pytest.approx(calories + 100)
+    assert after.meal_count == meal_count + 1